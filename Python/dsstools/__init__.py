@@ -0,0 +1,30 @@
+"""Helpers for scaling up the analyses taught in the Python workshops.
+
+The workshop notebooks (``PythonIntro``, ``PythonWebScrape``) stay
+deliberately simple. The modules here implement the same steps in a form
+that holds up on larger corpora and longer crawls:
+
+* ``dsstools.text`` -- tokenizing and counting words in plain-text corpora.
+* ``dsstools.scrape`` -- fetching, extracting and storing data from web
+  pages and JSON APIs.
+
+The workshop steps can also be run from a shell::
+
+    python -m dsstools.text.workflow --profile
+    python -m dsstools.scrape.workflow collections --out records_final.csv
+    python -m dsstools.scrape.jobs nightly.yaml
+    python -m dsstools.text.bench --sizes 1M 100M
+
+Heavy libraries (NumPy, lxml, requests) are imported only by the steps
+that use them, so short runs start quickly. A few features need optional
+packages, installed with pip when wanted:
+
+* ``orjson`` -- faster JSON decoding in ``dsstools.scrape.fastjson``.
+* ``zstandard`` -- reading ``.zst`` corpora with ``dsstools.text.open_text``.
+* ``playwright`` -- rendering JavaScript pages with ``BrowserPool``.
+* ``pyyaml`` -- YAML job specs for ``dsstools.scrape.jobs``.
+
+Run code from the ``Python`` directory (or put it on ``sys.path``) so that
+``import dsstools`` works. The tests run from anywhere with
+``python3 -m pytest Python/tests``.
+"""
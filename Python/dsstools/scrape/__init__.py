@@ -0,0 +1,112 @@
+"""Web scraping helpers for the PythonWebScrape workflow.
+
+Names are imported from their submodules on first use, so
+``import dsstools.scrape`` does not load lxml or requests until a helper
+that needs them is used.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from dsstools.scrape.browser import BrowserPool, serve_directory
+    from dsstools.scrape.coalesce import CoalescingSession, InFlight, request_key
+    from dsstools.scrape.content import declared_encoding, html_tree, parse_html
+    from dsstools.scrape.dedup import DeltaWriter, RecordIndex, record_hash
+    from dsstools.scrape.extract import TableExtractor, extract_table
+    from dsstools.scrape.frontier import (
+        Frontier,
+        MemoryBackend,
+        SQLiteBackend,
+        connect_frontier,
+        run_worker,
+        serve_frontier,
+    )
+    from dsstools.scrape.jobs import JobRunner, load_spec
+    from dsstools.scrape.pipeline import Pipeline
+    from dsstools.scrape.planner import CrawlPlanner, OffsetPagination, PagePagination, json_fetcher
+    from dsstools.scrape.records import RecordBatchBuilder
+    from dsstools.scrape.sinks import SQLiteSink, quote_identifier
+    from dsstools.scrape.stream import StreamSelector
+
+# Public names and the submodules that define them.
+_EXPORTS = {
+    "BrowserPool": ".browser",
+    "CoalescingSession": ".coalesce",
+    "CrawlPlanner": ".planner",
+    "DeltaWriter": ".dedup",
+    "Frontier": ".frontier",
+    "InFlight": ".coalesce",
+    "JobRunner": ".jobs",
+    "MemoryBackend": ".frontier",
+    "OffsetPagination": ".planner",
+    "PagePagination": ".planner",
+    "Pipeline": ".pipeline",
+    "RecordBatchBuilder": ".records",
+    "RecordIndex": ".dedup",
+    "SQLiteBackend": ".frontier",
+    "SQLiteSink": ".sinks",
+    "StreamSelector": ".stream",
+    "TableExtractor": ".extract",
+    "connect_frontier": ".frontier",
+    "declared_encoding": ".content",
+    "extract_table": ".extract",
+    "html_tree": ".content",
+    "json_fetcher": ".planner",
+    "load_spec": ".jobs",
+    "parse_html": ".content",
+    "quote_identifier": ".sinks",
+    "record_hash": ".dedup",
+    "request_key": ".coalesce",
+    "run_worker": ".frontier",
+    "serve_directory": ".browser",
+    "serve_frontier": ".frontier",
+}
+
+__all__ = [
+    "BrowserPool",
+    "CoalescingSession",
+    "CrawlPlanner",
+    "DeltaWriter",
+    "Frontier",
+    "InFlight",
+    "JobRunner",
+    "MemoryBackend",
+    "OffsetPagination",
+    "PagePagination",
+    "Pipeline",
+    "RecordBatchBuilder",
+    "RecordIndex",
+    "SQLiteBackend",
+    "SQLiteSink",
+    "StreamSelector",
+    "TableExtractor",
+    "connect_frontier",
+    "declared_encoding",
+    "extract_table",
+    "html_tree",
+    "json_fetcher",
+    "load_spec",
+    "parse_html",
+    "quote_identifier",
+    "record_hash",
+    "request_key",
+    "run_worker",
+    "serve_directory",
+    "serve_frontier",
+]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,250 @@
+"""Render JavaScript pages with a pool of warm headless browsers.
+
+The workshop's third approach to scraping, automating a browser, is
+needed for pages that build their content in JavaScript, like the
+collections page whose "Load More" button fetches more items with XHR.
+Starting a browser costs about a second, far more than rendering a page,
+so :class:`BrowserPool` starts a few headless browsers once and reuses
+their contexts and pages for every URL. Images, fonts and media are not
+downloaded. The rendered HTML goes through the same ``html.fromstring``
+and XPath code as pages fetched with ``requests``::
+
+    with BrowserPool(size=4) as pool:
+        tree = pool.render_tree(collections_url, click="text=Load More", clicks=3)
+        tree.xpath('//*[@id="collections"]//h3/text()')
+
+        for page in pool.map(exhibit_urls):      # rendered in parallel
+            tree = html.fromstring(page.html)
+
+For tests, :func:`serve_directory` serves saved pages from a local
+directory::
+
+    with serve_directory("pages") as base_url, BrowserPool(size=1) as pool:
+        pool.render(base_url + "collections.html")
+
+The pool needs the optional ``playwright`` package and a browser
+(``python -m playwright install chromium``). Each browser runs in its
+own thread, because Playwright objects may only be used from the thread
+that created them.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import http.server
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Iterable, Iterator, NamedTuple
+
+BLOCKED_RESOURCES = ("image", "font", "media")
+
+
+class RenderedPage(NamedTuple):
+    url: str          # after redirects
+    status: int | None
+    html: str
+
+
+def _sync_playwright():
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        raise ImportError("BrowserPool needs the playwright package "
+                          "(pip install playwright; python -m playwright install chromium)"
+                          ) from None
+    return sync_playwright
+
+
+class BrowserPool:
+    """Headless browsers that render URLs in parallel, reusing their pages.
+
+    Parameters
+    ----------
+    size : int
+        Number of browsers (each renders one page at a time).
+    browser : {"chromium", "firefox", "webkit"}
+        Browser engine to launch.
+    block : sequence of str
+        Playwright resource types not to download.
+    timeout : float
+        Seconds to wait for navigation, selectors and clicks.
+    wait_until : str
+        When navigation is done: ``"load"``, ``"domcontentloaded"`` or
+        ``"networkidle"``.
+    pages_per_context : int
+        Renders before a browser's context (cookies, cache, memory) is
+        replaced by a fresh one.
+    launch_options, context_options : dict, optional
+        Passed to Playwright's ``launch`` and ``new_context``.
+    """
+
+    def __init__(self, size: int = 2, browser: str = "chromium",
+                 block: Iterable[str] = BLOCKED_RESOURCES, timeout: float = 30.0,
+                 wait_until: str = "load", pages_per_context: int = 200,
+                 launch_options: dict | None = None, context_options: dict | None = None):
+        sync_playwright = _sync_playwright()
+        self.size = size
+        self.browser = browser
+        self.block = frozenset(block)
+        self.timeout = timeout
+        self.wait_until = wait_until
+        self.pages_per_context = pages_per_context
+        self.launch_options = {"headless": True, **(launch_options or {})}
+        self.context_options = dict(context_options or {})
+        self._jobs: queue.Queue = queue.Queue()
+        self._closed = False
+        ready = [Future() for _ in range(size)]
+        self._threads = [threading.Thread(target=self._work, args=(sync_playwright, started),
+                                          name=f"browser {i}", daemon=True)
+                         for i, started in enumerate(ready)]
+        for thread in self._threads:
+            thread.start()
+        try:
+            for started in ready:
+                started.result()
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "BrowserPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _new_page(self, browser):
+        context = browser.new_context(**self.context_options)
+        context.set_default_timeout(self.timeout * 1000)
+        if self.block:
+            block = self.block
+
+            def route(route):
+                if route.request.resource_type in block:
+                    route.abort()
+                else:
+                    route.continue_()
+            context.route("**/*", route)
+        return context, context.new_page()
+
+    def _render(self, page, url: str, wait_for: str | None = None, click: str | None = None,
+                clicks: int = 1, wait_until: str | None = None) -> RenderedPage:
+        response = page.goto(url, wait_until=wait_until or self.wait_until)
+        if wait_for:
+            page.wait_for_selector(wait_for)
+        if click:
+            for _ in range(clicks):
+                button = page.locator(click).first
+                if not button.is_visible():  # nothing more to load
+                    break
+                button.click()
+                page.wait_for_load_state("networkidle")
+        return RenderedPage(page.url, response.status if response is not None else None,
+                            page.content())
+
+    def _work(self, sync_playwright, started: Future) -> None:
+        try:
+            with sync_playwright() as playwright:
+                browser = getattr(playwright, self.browser).launch(**self.launch_options)
+                started.set_result(None)
+                context = page = None
+                used = 0
+                while True:
+                    job = self._jobs.get()
+                    if job is None:
+                        break
+                    future, url, options = job
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        if page is None or used >= self.pages_per_context:
+                            if context is not None:
+                                context.close()
+                            context, page = self._new_page(browser)
+                            used = 0
+                        used += 1
+                        future.set_result(self._render(page, url, **options))
+                    except BaseException as exc:
+                        future.set_exception(exc)
+                        # Start the next page from a clean context.
+                        with contextlib.suppress(Exception):
+                            context.close()
+                        context = page = None
+                if context is not None:
+                    context.close()
+                browser.close()
+        except BaseException as exc:
+            if not started.done():
+                started.set_exception(exc)
+            else:
+                raise
+
+    def submit(self, url: str, **options: Any) -> Future:
+        """Queue ``url`` for rendering; the future's result is a :class:`RenderedPage`.
+
+        Options are ``wait_for`` (a selector to wait for), ``click`` (a
+        selector, e.g. ``"text=Load More"``), ``clicks`` (how often to click
+        it, stopping early once it disappears) and ``wait_until``.
+        """
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        future: Future = Future()
+        self._jobs.put((future, url, options))
+        return future
+
+    def render(self, url: str, **options: Any) -> RenderedPage:
+        """Render one URL; see :meth:`submit` for the options."""
+        return self.submit(url, **options).result()
+
+    def render_tree(self, url: str, **options: Any):
+        """Render one URL and parse it like ``html.fromstring(response.text)``."""
+        from lxml import html
+
+        page = self.render(url, **options)
+        return html.fromstring(page.html, base_url=page.url)
+
+    def map(self, urls: Iterable[str], **options: Any) -> Iterator[RenderedPage]:
+        """Render ``urls`` on all browsers and yield the pages in order."""
+        futures = [self.submit(url, **options) for url in urls]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self) -> None:
+        """Finish queued renders and shut the browsers down."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve_directory(path=".", host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Serve the files in ``path`` over HTTP and yield the base URL.
+
+    ``port=0`` picks a free port. The server runs in a background thread
+    and stops when the ``with`` block ends.
+    """
+    handler = functools.partial(_QuietHandler, directory=os.fspath(path))
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True, name="static server")
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
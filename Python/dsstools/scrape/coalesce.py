@@ -0,0 +1,196 @@
+"""Share one network request among identical requests that overlap in time.
+
+In the workshop the same resource is often fetched twice: ``collection_url``
+with ``offset=0`` for ``collections1`` and again as the first page of the
+loop, or each ``exhibit_url`` in both the loop and the list-comprehension
+version. When such requests run concurrently (in a
+:class:`~dsstools.scrape.pipeline.Pipeline`, a ``ThreadPoolExecutor`` or
+several crawl workers), :class:`CoalescingSession` sends only the first
+one. The others wait for it and get the same response. Nothing is kept
+after the response arrives, so this is not a cache. A request made later
+goes to the server again::
+
+    session = CoalescingSession()          # wraps requests.Session()
+    with ThreadPoolExecutor(8) as pool:
+        pages = list(pool.map(lambda offset: session.get(
+            collection_url, params={"offset": offset, "load_amount": 10}), offsets))
+    session.requests, session.coalesced    # sent vs. shared
+
+    fetch = json_fetcher(collection_url, session=session)   # works anywhere a session does
+
+Requests are the same if they have the same method, URL and query
+parameters after normalization (see :func:`request_key`) and the same
+headers. ``params={"offset": 0}`` and ``"?offset=0"`` are the same
+request; so must be the ``timeout``. Only ``GET`` and ``HEAD`` requests
+are shared, and only without a body, ``stream=True`` or per-request
+``auth``, ``cookies``, ``verify``, ``cert`` or ``proxies`` (set those on
+the session instead). :class:`InFlight` does the same for any function,
+e.g. a fetch function passed to ``run_worker``.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Mapping
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# Requests with any of these are sent on their own: a body, or settings
+# (credentials, TLS, proxies) that could change the response.
+_UNSHAREABLE = ("data", "json", "files", "auth", "cookies", "verify", "cert", "proxies")
+
+
+def _param_items(params) -> list[tuple[str, str]]:
+    if params is None:
+        return []
+    if isinstance(params, (str, bytes)):
+        text = params.decode() if isinstance(params, bytes) else params
+        return parse_qsl(text, keep_blank_values=True)
+    items = params.items() if isinstance(params, Mapping) else params
+    out = []
+    for key, value in items:
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for item in values:
+            if item is not None:  # requests leaves out None values
+                out.append((str(key), item.decode() if isinstance(item, bytes) else str(item)))
+    return out
+
+
+def request_key(url: str, params=None, method: str = "GET") -> tuple:
+    """A hashable key that is equal for requests that fetch the same resource.
+
+    The scheme and host are lower-cased, default ports and the fragment are
+    dropped, and the query string of ``url`` is merged with ``params`` and
+    sorted, with values as strings (so ``0`` and ``"0"`` are the same).
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port is not None and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(parse_qsl(parts.query, keep_blank_values=True) + _param_items(params))
+    return (method.upper(), urlunsplit((scheme, host, parts.path or "/", "", "")), tuple(query))
+
+
+class InFlight:
+    """Registry of calls in progress; a call with a key that is already running waits for it.
+
+    >>> inflight = InFlight()
+    >>> inflight.call(request_key(url, params), fetch, url, params)
+
+    Exceptions are shared too: every waiting caller gets the leader's error.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict[Hashable, Future] = {}
+        self.calls = 0      # calls that ran
+        self.coalesced = 0  # calls that waited for another
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def call(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``func(*args, **kwargs)``, or wait for the running call with ``key``."""
+        return self._call(key, func, args, kwargs)[0]
+
+    def _call(self, key, func, args, kwargs) -> tuple[Any, bool]:
+        with self._lock:
+            future = self._pending.get(key)
+            leader = future is None
+            if leader:
+                future = self._pending[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), True
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._pending[key]
+
+    def wrap(self, func: Callable[..., Any], key: Callable[..., Hashable]) -> Callable[..., Any]:
+        """``func`` with concurrent calls that have the same ``key(*args, **kwargs)`` shared."""
+
+        def coalesced(*args, **kwargs):
+            return self.call(key(*args, **kwargs), func, *args, **kwargs)
+        return coalesced
+
+
+class CoalescingSession:
+    """A ``requests.Session`` whose identical concurrent GETs share one request.
+
+    Parameters
+    ----------
+    session : requests.Session, optional
+        The session that sends the requests; a new one by default. Other
+        attributes (``headers``, ``mount``, ``close``...) are passed through.
+    methods : collection of str
+        HTTP methods that may be shared.
+
+    Callers that waited get a shallow copy of the response the first caller
+    got, with the body already read.
+    """
+
+    def __init__(self, session=None, methods=("GET", "HEAD")):
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+        self.methods = frozenset(method.upper() for method in methods)
+        self._inflight = InFlight()
+
+    def __getattr__(self, name: str):
+        return getattr(self.session, name)
+
+    def __enter__(self) -> "CoalescingSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.session.close()
+
+    @property
+    def requests(self) -> int:
+        """Requests sent through :meth:`request` that could have been shared."""
+        return self._inflight.calls
+
+    @property
+    def coalesced(self) -> int:
+        """Requests answered with another request's response."""
+        return self._inflight.coalesced
+
+    def _send(self, method: str, url: str, **kwargs):
+        response = self.session.request(method, url, **kwargs)
+        response.content  # read the body once, before the response is shared
+        return response
+
+    def request(self, method: str, url: str, params=None, headers=None, **kwargs):
+        shareable = (method.upper() in self.methods and not kwargs.get("stream")
+                     and not any(kwargs.get(name) is not None for name in _UNSHAREABLE))
+        if not shareable:
+            return self.session.request(method, url, params=params, headers=headers, **kwargs)
+        key = request_key(url, params, method) + (
+            tuple(sorted((k.lower(), v) for k, v in (headers or {}).items())),
+            kwargs.get("allow_redirects", True),
+            repr(kwargs.get("timeout")),  # a number or (connect, read) tuple
+        )
+        response, shared = self._inflight._call(
+            key, self._send, (method, url), dict(kwargs, params=params, headers=headers))
+        return copy.copy(response) if shared else response
+
+    def get(self, url: str, params=None, **kwargs):
+        return self.request("GET", url, params=params, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
@@ -0,0 +1,111 @@
+"""Parse response bodies as bytes, with the charset the server declared.
+
+The workshop parses pages with ``html.fromstring(events.text)``. Reading
+``.text`` makes ``requests`` choose an encoding, which for responses
+without a charset means running charset detection over the whole body.
+It then decodes the whole body into a ``str``, and lxml encodes that
+again for libxml2. Handing the parser ``response.content`` (or a
+memoryview of it) together with the charset from the ``Content-Type``
+header skips the detection and both copies. libxml2 decodes while it
+parses::
+
+    tree = html_tree(events)                       # html.fromstring(events.text)
+    tree = parse_html(body, "iso-8859-1")          # bytes or memoryview
+    records = fastjson.from_response(page, ("records",))   # also uses the charset
+
+When the server declares no charset, the parser finds the encoding
+itself: lxml reads ``<meta charset>`` and JSON is UTF-8.
+"""
+
+from __future__ import annotations
+
+import codecs
+import functools
+import threading
+from typing import Mapping
+
+_parsers = threading.local()  # lxml parsers must not be shared between threads
+
+
+def _charset(content_type: str) -> str | None:
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            return value.strip().strip("\"'").lower() or None
+    return None
+
+
+def declared_encoding(response_or_headers) -> str | None:
+    """The charset in the ``Content-Type`` header, or None if none is declared.
+
+    Accepts a response or its headers. Unknown charsets count as not
+    declared. Unlike ``response.encoding``, ``text/*`` without a charset
+    is not taken to be ISO-8859-1, so the parser can use the page's own
+    ``<meta charset>``.
+    """
+    headers = getattr(response_or_headers, "headers", response_or_headers)
+    if not isinstance(headers, Mapping):
+        return None
+    charset = _charset(headers.get("content-type") or headers.get("Content-Type") or "")
+    if charset is None:
+        return None
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        return None
+    return charset
+
+
+@functools.lru_cache(maxsize=64)
+def lxml_encoding(encoding: str | None) -> str | None:
+    """``encoding`` as a name libxml2 accepts, or None to let it detect one.
+
+    libxml2 does not know every Python alias (``"latin-1"``, ``"utf_8"``),
+    so the Python codec name is tried if the given name fails.
+    """
+    if encoding is None:
+        return None
+    from lxml import etree
+
+    names = [encoding]
+    try:
+        names.append(codecs.lookup(encoding).name)
+    except LookupError:
+        pass
+    for name in names:
+        try:
+            etree.HTMLParser(encoding=name)
+        except LookupError:
+            continue
+        return name
+    return None
+
+
+def _html_parser(encoding: str | None):
+    cache = getattr(_parsers, "html", None)
+    if cache is None:
+        cache = _parsers.html = {}
+    parser = cache.get(encoding)
+    if parser is None:
+        from lxml import html
+        parser = cache[encoding] = html.HTMLParser(encoding=encoding)
+    return parser
+
+
+def parse_html(data, encoding: str | None = None, base_url: str | None = None):
+    """Parse a whole HTML page like ``html.fromstring``, from bytes if possible.
+
+    ``data`` may be bytes, a memoryview or a ``str``. ``encoding`` is the
+    declared charset of byte input; without it lxml detects the encoding.
+    """
+    from lxml import html
+
+    if isinstance(data, str):
+        return html.document_fromstring(data, base_url=base_url)
+    parser = _html_parser(lxml_encoding(encoding))
+    return html.document_fromstring(data, parser=parser, base_url=base_url)
+
+
+def html_tree(response):
+    """``html.fromstring(response.text)``, parsed from ``response.content``."""
+    return parse_html(response.content, declared_encoding(response), base_url=response.url)
@@ -0,0 +1,180 @@
+"""Skip records that have not changed since the last crawl.
+
+Every run of the collections or exhibitions crawl rewrites
+``records_final.csv`` in full, and overlapping offsets can return the same
+record twice. :class:`RecordIndex` keeps, in a local SQLite file, a content
+hash for every record id it has seen. :meth:`RecordIndex.changes` passes
+through only records that are new or whose content changed, and
+:class:`DeltaWriter` writes those to a delta file::
+
+    with RecordIndex("collection_index.sqlite") as index, \\
+            DeltaWriter("records_delta.jsonl") as delta:
+        for offset in range(0, 50, 10):
+            ...
+            delta.write(index.changes(current_request.json()["records"]))
+    print(delta.counts)     # {'new': ..., 'changed': ...}
+
+The index is only committed when the ``with`` block exits without an
+error, so a failed crawl can simply be run again.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Iterable, Iterator, Mapping
+
+from dsstools.scrape.sinks import quote_identifier
+
+NEW = "new"
+CHANGED = "changed"
+
+# SQLite limits the number of "?" parameters in one statement.
+_MAX_PARAMS = 900
+
+
+def record_hash(record: Mapping[str, Any]) -> str:
+    """Hash of a record's content, independent of key order."""
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"),
+                           ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class RecordIndex:
+    """Record ids and content hashes from previous crawls, in SQLite.
+
+    Parameters
+    ----------
+    path : str or path-like
+        SQLite database file (created if missing).
+    key : str
+        Field that identifies a record, e.g. ``"id"`` or ``"objectid"``.
+    table : str
+        Table name, so one file can index several endpoints.
+    """
+
+    def __init__(self, path, key: str = "id", table: str = "record_hashes"):
+        self.key = key
+        self.table = table
+        self._quoted = quote_identifier(table)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._quoted} ("
+            " key TEXT PRIMARY KEY, hash TEXT NOT NULL,"
+            " first_seen REAL NOT NULL, last_seen REAL NOT NULL)")
+        self._seen: dict[str, str] = {}  # key -> hash for this run
+        self._started = time.time()
+
+    def __enter__(self) -> "RecordIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute(f"SELECT COUNT(*) FROM {self._quoted}").fetchone()[0]
+
+    def _stored_hashes(self, keys: list[str]) -> dict[str, str]:
+        stored = {}
+        for start in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[start:start + _MAX_PARAMS]
+            marks = ",".join("?" * len(chunk))
+            stored.update(self.connection.execute(
+                f"SELECT key, hash FROM {self._quoted} WHERE key IN ({marks})", chunk))
+        return stored
+
+    def changes(self, records: Iterable[Mapping[str, Any]]) -> list[tuple[str, Mapping[str, Any]]]:
+        """Return ``(status, record)`` for records that are new or changed.
+
+        ``status`` is ``"new"`` or ``"changed"``. Records seen earlier in
+        this run with the same content (e.g. from overlapping pages) are
+        dropped. The index is updated in the current transaction.
+        """
+        batch: dict[str, tuple[str, Mapping[str, Any]]] = {}
+        for record in records:
+            key = str(record[self.key])
+            digest = record_hash(record)
+            if self._seen.get(key) != digest:
+                batch[key] = (digest, record)
+        if not batch:
+            return []
+        stored = self._stored_hashes([k for k in batch if k not in self._seen])
+        now = time.time()
+        out = []
+        rows = []
+        for key, (digest, record) in batch.items():
+            previous = self._seen.get(key, stored.get(key))
+            self._seen[key] = digest
+            rows.append((key, digest, now, now))
+            if previous is None:
+                out.append((NEW, record))
+            elif previous != digest:
+                out.append((CHANGED, record))
+        self.connection.executemany(
+            f"INSERT INTO {self._quoted} (key, hash, first_seen, last_seen)"
+            " VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET hash = excluded.hash, last_seen = excluded.last_seen",
+            rows)
+        return out
+
+    def unseen(self) -> Iterator[str]:
+        """Keys in the index that this run has not seen (so far)."""
+        for (key,) in self.connection.execute(
+                f"SELECT key FROM {self._quoted} WHERE last_seen < ?", (self._started,)):
+            if key not in self._seen:
+                yield key
+
+
+class DeltaWriter:
+    """Write ``(status, record)`` pairs to a JSON lines or CSV file.
+
+    The format follows the file extension (``.csv`` or anything else for
+    JSON lines). Each row gets a ``_change`` field with the status. JSON
+    lines are written as they come. CSV rows are kept until :meth:`close`,
+    so that the header can have a column for every field of every record
+    (records often differ in their optional fields); nested values are
+    written as JSON text.
+    """
+
+    def __init__(self, path, format: str | None = None):
+        self.path = str(path)
+        self.format = format or ("csv" if self.path.endswith(".csv") else "jsonl")
+        self.counts = {NEW: 0, CHANGED: 0}
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._rows: list[dict[str, Any]] = []
+        self._fields: dict[str, None] = {}  # ordered set of CSV columns
+
+    def __enter__(self) -> "DeltaWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.format == "csv" and self._rows:
+            writer = csv.DictWriter(self._file, fieldnames=list(self._fields))
+            writer.writeheader()
+            writer.writerows(self._rows)
+            self._rows = []
+        self._file.close()
+
+    def write(self, changes: Iterable[tuple[str, Mapping[str, Any]]]):
+        for status, record in changes:
+            row = {"_change": status, **record}
+            if self.format == "csv":
+                self._fields.update(dict.fromkeys(row))
+                self._rows.append({k: json.dumps(v) if isinstance(v, (dict, list)) else v
+                                   for k, v in row.items()})
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False, default=str))
+                self._file.write("\n")
+            self.counts[status] += 1
@@ -0,0 +1,230 @@
+"""Extract nested HTML lists and tables in a few XPath passes.
+
+The floor-plan exercise builds ``all_levels_facilities`` with one XPath
+call per level and one ``text_content()`` per facility::
+
+    all_levels = floor_plan_html.xpath('/html/body/main/section/ul/li')
+    for level in all_levels:
+        level_facilities_collection = level.xpath('div[2]/ul/li')
+        ...
+
+:class:`TableExtractor` compiles the container, row and cell XPaths once.
+Each cell XPath is evaluated over the whole document in a single call
+(``(container)/row/cell``) and its matches are assigned to rows by
+walking up the tree, and text is taken with ``etree.tostring(...,
+method="text")``, which avoids one smart-string object per node. The
+result is rectangular: one entry per row, with the container's index, so
+it goes straight into pandas::
+
+    extractor = TableExtractor("/html/body/main/section/ul/li", "div[2]/ul/li",
+                               container_cells={"level": "div[1]"})
+    pd.DataFrame(extractor.extract(floor_plan_html))
+    #    container  row  level     text
+    # 0          0    0  Level 5   Cafe
+    # ...
+    extractor.nested(floor_plan_html)   # == all_levels_facilities
+
+The same extractor can be reused for every page with the same layout.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Mapping
+
+from lxml import etree
+
+_SPACE = re.compile(r"\s+")
+
+
+_LEAVING_AXES = re.compile(r"\.\.|\b(?:parent|ancestor(?:-or-self)?|preceding(?:-sibling)?"
+                           r"|following(?:-sibling)?)\s*::")
+
+
+_NODE_TESTS = re.compile(r"\b(?:text|node|comment|processing-instruction)\s*\([^)]*\)")
+
+
+def _outside_predicates(path: str) -> str:
+    """``path`` without its predicates (``[...]``) and quoted strings."""
+    out, depth, quote = [], 0, None
+    for char in path:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif depth == 0:
+            out.append(char)
+    return "".join(out)
+
+
+def _combinable(path: str) -> bool:
+    """Whether ``path`` can be appended to another path as further steps.
+
+    Paths that can leave the node they start from (``..``, ``parent::``,
+    sibling axes, ...) are not: their matches could not be traced back to
+    the right row by walking up the tree. Neither are function calls such
+    as ``normalize-space(span)``, which are not location steps; node tests
+    like ``text()`` and functions inside predicates are fine.
+    """
+    steps = _NODE_TESTS.sub("", _outside_predicates(path))
+    return (not path.startswith("/") and "|" not in path and "(" not in steps
+            and _LEAVING_AXES.search(path) is None)
+
+
+class TableExtractor:
+    """Rows of a nested list or table, with their container's index.
+
+    Parameters
+    ----------
+    container : str
+        XPath of the repeated containers (levels, tables, ...).
+    rows : str
+        XPath of the rows, relative to a container (``"div[2]/ul/li"``,
+        ``"tr"``).
+    cells : mapping of column name to XPath, optional
+        Values to take from each row, relative to the row. The default,
+        ``{"text": "."}``, is the row's own text. Paths may select elements
+        (their text is used), attributes (``"a/@href"``) or text nodes.
+    container_cells : mapping of column name to XPath, optional
+        Values taken once per container and repeated for each of its rows.
+    text : {"strip", "normalize", "raw"}
+        How element text is cleaned: stripped like ``get_event_info``,
+        with runs of whitespace collapsed too, or left as is.
+    sep : str, optional
+        If given, all matches of a cell are joined with ``sep``; by default
+        only the first match is used. Cells without a match are ``None``.
+    keep_empty : bool
+        Add one row of ``None`` for containers without rows, so every
+        container appears in the output.
+    """
+
+    def __init__(self, container: str, rows: str,
+                 cells: Mapping[str, str] | None = None,
+                 container_cells: Mapping[str, str] | None = None,
+                 text: str = "strip", sep: str | None = None, keep_empty: bool = False):
+        if text not in ("strip", "normalize", "raw"):
+            raise ValueError(f"text must be 'strip', 'normalize' or 'raw', not {text!r}")
+        self.cells = dict(cells or {"text": "."})
+        self.container_cells = dict(container_cells or {})
+        overlap = {"container", "row"} & (set(self.cells) | set(self.container_cells))
+        if overlap:
+            raise ValueError(f"column names {sorted(overlap)} are reserved")
+        self.text = text
+        self.sep = sep
+        self.keep_empty = keep_empty
+        self._container = etree.XPath(container)
+        self._rows = etree.XPath(rows)
+        row_prefix = f"({container})/{rows}" if _combinable(rows) else None
+        self._cells = {name: self._compile(row_prefix, path)
+                       for name, path in self.cells.items()}
+        self._container_cells = {name: self._compile(f"({container})", path)
+                                 for name, path in self.container_cells.items()}
+
+    @staticmethod
+    def _compile(prefix: str | None, path: str):
+        """``(combined, per_node)`` XPaths; ``combined`` is None if not possible."""
+        if path.strip() == ".":
+            return None, None
+        if prefix is None or not _combinable(path):
+            return None, etree.XPath(path)
+        combined = etree.XPath(f"{prefix}/{path}")
+        return combined, etree.XPath(path)
+
+    def _clean(self, values: list) -> list[str]:
+        """Text of each matched element or string, cleaned per ``text``."""
+        tostring, element = etree.tostring, etree._Element
+        # Same as text_content(), but without building smart strings.
+        texts = [tostring(value, method="text", encoding="unicode", with_tail=False)
+                 if isinstance(value, element) else str(value) for value in values]
+        if self.text == "strip":
+            return list(map(str.strip, texts))
+        if self.text == "normalize":
+            return [_SPACE.sub(" ", text).strip() for text in texts]
+        return texts
+
+    def _values(self, tree, xpaths, owners: list) -> list:
+        """Cell values for each owner element (row or container), in order."""
+        combined, per_node = xpaths
+        if per_node is None:  # "." -- the owners themselves
+            return self._clean(owners)
+        if combined is not None:
+            index = {element: i for i, element in enumerate(owners)}
+            found: list[list] = [[] for _ in owners]
+            for match in combined(tree):
+                node = match.getparent() if not isinstance(match, etree._Element) else match
+                while node is not None and node not in index:
+                    node = node.getparent()
+                if node is not None:
+                    found[index[node]].append(match)
+        else:
+            found = []
+            for owner in owners:
+                matches = per_node(owner)
+                found.append(matches if isinstance(matches, list) else [matches])
+        if self.sep is None:
+            firsts = [m[0] for m in found if m]
+            cleaned = iter(self._clean(firsts))
+            return [next(cleaned) if m else None for m in found]
+        return [self.sep.join(self._clean(m)) if m else None for m in found]
+
+    def extract(self, tree) -> dict[str, list[Any]]:
+        """Return columns ``container``, ``row``, then the cells, as lists."""
+        containers = self._container(tree)
+        # One call per container rather than a combined path: it tells which
+        # container each row belongs to without walking up the tree.
+        rows, row_container, row_position = [], [], []
+        position = [0] * len(containers)
+        for c, element in enumerate(containers):
+            found = self._rows(element)
+            rows.extend(found)
+            row_container.extend([c] * len(found))
+            row_position.extend(range(len(found)))
+            position[c] = len(found)
+
+        columns: dict[str, list[Any]] = {"container": row_container, "row": row_position}
+        per_container = {name: self._values(tree, xpaths, containers)
+                         for name, xpaths in self._container_cells.items()}
+        for name, values in per_container.items():
+            columns[name] = [values[c] for c in row_container]
+        for name, xpaths in self._cells.items():
+            columns[name] = self._values(tree, xpaths, rows)
+
+        if self.keep_empty and 0 in position:
+            members: list[list[int]] = [[] for _ in containers]
+            for i, c in enumerate(row_container):
+                members[c].append(i)
+            out: dict[str, list[Any]] = {name: [] for name in columns}
+            for c, indices in enumerate(members):
+                for i in indices or [None]:
+                    for name, values in columns.items():
+                        if i is not None:
+                            out[name].append(values[i])
+                        elif name == "container":
+                            out[name].append(c)
+                        else:
+                            out[name].append(per_container[name][c] if name in per_container
+                                             else None)
+            columns = out
+        return columns
+
+    def nested(self, tree, column: str | None = None) -> list[list[Any]]:
+        """One list of ``column`` values per container (like the ragged loop)."""
+        column = column or next(iter(self.cells))
+        table = self.extract(tree)
+        out: list[list[Any]] = [[] for _ in self._container(tree)]
+        for c, row, value in zip(table["container"], table["row"], table[column]):
+            if row is not None:  # not a keep_empty placeholder
+                out[c].append(value)
+        return out
+
+
+def extract_table(tree, container: str, rows: str, cells: Mapping[str, str] | None = None,
+                  **options) -> dict[str, list[Any]]:
+    """One-off :meth:`TableExtractor.extract`; see :class:`TableExtractor`."""
+    return TableExtractor(container, rows, cells, **options).extract(tree)
+
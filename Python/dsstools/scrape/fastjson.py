@@ -0,0 +1,227 @@
+"""Faster decoding of JSON API pages.
+
+The workshop decodes every page with ``response.json()``, which runs the
+standard library parser over the whole body, and then only keeps
+``['records']``. This module offers:
+
+* :func:`loads` -- decode with `orjson <https://github.com/ijl/orjson>`_
+  when it is installed, otherwise with the standard library.
+* :func:`extract` -- decode only the value at a key path such as
+  ``("records",)``. With orjson the whole body is parsed (that is still
+  the fastest option); without it, parsing stops at the end of the
+  target value and nothing after it is decoded.
+* :func:`iter_items` -- yield the items of the array at a key path one by
+  one while the body is still arriving, e.g. from
+  ``response.iter_content(65536)``. This costs more CPU per item than
+  decoding the whole page at once, but never holds more than one item
+  and the unread input in memory, and the first records are available
+  before the download finishes.
+
+    >>> page = requests.get(collection_url, params=params)
+    >>> records = from_response(page, ("records",))  # page.json()['records']
+    >>> for record in iter_items(requests.get(url, stream=True).iter_content(65536)):
+    ...     ...
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator, Sequence
+
+from dsstools.scrape.content import declared_encoding
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+FAST_JSON = orjson is not None
+
+_WS = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_decoder = json.JSONDecoder()
+# Characters that can continue a number, so a value followed by one of
+# them may have been cut off (valid JSON never has them after a value).
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+class _Incomplete(Exception):
+    """The buffer ends before the value being scanned."""
+
+
+def _is_utf8(encoding: str | None) -> bool:
+    return encoding is None or codecs.lookup(encoding).name == "utf-8"
+
+
+def _text(data: bytes | memoryview | str, encoding: str | None) -> str:
+    if isinstance(data, str):
+        return data
+    return codecs.decode(data, "utf-8-sig" if _is_utf8(encoding) else encoding)
+
+
+def loads(data: bytes | memoryview | str, encoding: str | None = None) -> Any:
+    """Decode a JSON document, with orjson if it is available.
+
+    Bytes are read as UTF-8 unless another ``encoding`` is given, e.g. the
+    charset of the response.
+    """
+    if _is_utf8(encoding):
+        if orjson is not None:
+            return orjson.loads(data)
+        if not isinstance(data, memoryview):
+            return json.loads(data)
+    return json.loads(_text(data, encoding))
+
+
+def _skip_ws(buf: str, pos: int) -> int:
+    return _WS.match(buf, pos).end()
+
+
+def _skip_value(buf: str, pos: int) -> int:
+    """Index just past the JSON value starting at ``buf[pos]``."""
+    # The C scanner decodes and discards the value; a hand-written skipper
+    # in Python is slower than that for anything but tiny values.
+    try:
+        end = _decoder.raw_decode(buf, pos)[1]
+    except json.JSONDecodeError:
+        raise _Incomplete from None
+    if end >= len(buf) or buf[end] in _NUMBER_CHARS:  # a number may continue
+        raise _Incomplete
+    return end
+
+
+def _find_key(buf: str, pos: int, key: str) -> int:
+    """Start of the value of ``key`` in the object starting at ``buf[pos]``."""
+    if pos >= len(buf):
+        raise _Incomplete
+    if buf[pos] != "{":
+        raise KeyError(key)
+    quoted = json.dumps(key)
+    pos += 1
+    while True:
+        pos = _skip_ws(buf, pos)
+        if pos >= len(buf):
+            raise _Incomplete
+        if buf[pos] == "}":
+            raise KeyError(key)
+        match = _STRING.match(buf, pos)
+        if match is None:
+            raise _Incomplete
+        name = match.group()
+        pos = _skip_ws(buf, match.end())
+        if pos >= len(buf):
+            raise _Incomplete
+        pos = _skip_ws(buf, pos + 1)  # past ":"
+        if name == quoted or ("\\" in name and json.loads(name) == key):
+            return pos
+        pos = _skip_ws(buf, _skip_value(buf, pos))
+        if pos >= len(buf):
+            raise _Incomplete
+        if buf[pos] == ",":
+            pos += 1
+
+
+def _find_path(buf: str, path: Sequence[str]) -> int:
+    pos = _skip_ws(buf, 0)
+    for key in path:
+        pos = _find_key(buf, pos, key)
+    return pos
+
+
+def extract(data: bytes | memoryview | str, path: Sequence[str] = ("records",),
+            encoding: str | None = None) -> Any:
+    """Decode only the value at ``path`` (a sequence of object keys)."""
+    if orjson is not None and _is_utf8(encoding):
+        value = orjson.loads(data)
+        for key in path:
+            value = value[key]
+        return value
+    text = _text(data, encoding)
+    try:
+        pos = _find_path(text, path)
+    except _Incomplete:
+        raise ValueError("truncated or invalid JSON before the requested value") from None
+    return _decoder.raw_decode(text, pos)[0]
+
+
+def from_response(response, path: Sequence[str] | None = None) -> Any:
+    """Faster ``response.json()``; with ``path``, only that value is decoded.
+
+    The body is parsed as bytes in the declared charset (UTF-8 if there is
+    none), without ``requests`` guessing an encoding for ``.text``.
+    """
+    encoding = declared_encoding(response)
+    if path is None:
+        return loads(response.content, encoding)
+    return extract(response.content, path, encoding)
+
+
+def iter_items(chunks: Iterable[bytes | memoryview | str], path: Sequence[str] = ("records",),
+               encoding: str = "utf-8") -> Iterator[Any]:
+    """Yield the items of the array at ``path`` as the document streams in.
+
+    ``chunks`` is any iterable of byte (or text) pieces of one JSON
+    document. Only the current item and unread input are held in memory.
+    """
+    chunks = iter(chunks)
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    buf = ""
+    exhausted = False
+
+    def more() -> bool:
+        nonlocal buf, exhausted
+        for chunk in chunks:
+            piece = chunk if isinstance(chunk, str) else text_decoder.decode(chunk)
+            if piece:
+                buf += piece
+                return True
+        if not exhausted:
+            buf += text_decoder.decode(b"", final=True)
+            exhausted = True
+        return False
+
+    # Find the opening bracket of the array, reading until the keys
+    # leading to it are complete.
+    while True:
+        try:
+            pos = _find_path(buf, path)
+            if pos >= len(buf):
+                raise _Incomplete
+            break
+        except _Incomplete:
+            if not more():
+                raise ValueError("JSON document ends before the requested value") from None
+    if buf[pos] != "[":
+        raise ValueError(f"value at {list(path)} is not an array")
+    pos += 1
+    while True:
+        pos = _skip_ws(buf, pos)
+        if pos >= len(buf):
+            if not more() and pos >= len(buf):
+                raise ValueError("JSON document ends inside the array")
+            continue
+        if buf[pos] == "]":
+            return
+        if buf[pos] == ",":  # the separator arrived after the previous item
+            pos += 1
+            continue
+        try:
+            item, end = _decoder.raw_decode(buf, pos)
+            # A number cut off by the end of the buffer still decodes, so
+            # only trust items followed by input that cannot continue them.
+            complete = exhausted or (end < len(buf) and buf[end] not in _NUMBER_CHARS)
+        except json.JSONDecodeError:
+            complete = False
+        if not complete:
+            if exhausted:
+                raise ValueError("JSON document ends inside the array")
+            more()
+            continue
+        yield item
+        pos = _skip_ws(buf, end)
+        if pos < len(buf) and buf[pos] == ",":
+            pos += 1
+        if pos > 1 << 20:  # drop consumed input
+            buf, pos = buf[pos:], 0
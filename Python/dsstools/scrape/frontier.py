@@ -0,0 +1,383 @@
+"""A shared queue of crawl work that several processes or machines can drain.
+
+In the workshop the crawl state is a handful of local variables
+(``records``, ``firstFivePages``, ``all_event_values``), so only one
+process can work on a crawl. A :class:`Frontier` holds the pages still to
+fetch as *work items*. Workers lease items, fetch them and report a
+result; an item whose lease runs out (because its worker died or hung) is
+handed out again, up to ``max_attempts`` times::
+
+    frontier = Frontier(SQLiteBackend("crawl.sqlite"))
+    frontier.add_pages(collection_url, OffsetPagination("offset", 10), count=50)
+
+    # on each worker (same file on a shared disk, or see serve_frontier)
+    run_worker(frontier, fetch=lambda item: requests.get(item.url, params=item.params).json())
+
+    for key, page in frontier.results():
+        ...
+
+Backends:
+
+* :class:`MemoryBackend` -- in one process, shared by threads.
+* :class:`SQLiteBackend` -- a database file, shared by processes on one
+  machine or on a shared file system.
+* :func:`serve_frontier` / :func:`connect_frontier` -- a small TCP server
+  (``multiprocessing.managers``) holding a :class:`MemoryBackend`, for
+  workers on other machines; a stand-in for a Redis queue. It listens on
+  localhost unless given an address, and needs a shared ``authkey``
+  (or the ``DSSTOOLS_FRONTIER_AUTHKEY`` environment variable).
+
+Payloads and results must be JSON-serializable.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from multiprocessing.managers import BaseManager
+from typing import Any, Callable, Iterable, Iterator, Mapping, NamedTuple
+
+from dsstools.scrape.sinks import quote_identifier
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class WorkItem(NamedTuple):
+    key: str
+    payload: dict
+    attempts: int  # including the current one
+
+    @property
+    def url(self) -> str | None:
+        return self.payload.get("url")
+
+    @property
+    def params(self) -> dict:
+        return self.payload.get("params") or {}
+
+
+class MemoryBackend:
+    """Work items in a dict, guarded by a lock."""
+
+    def __init__(self):
+        self._items: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, items: list[tuple[str, str]]) -> int:
+        added = 0
+        with self._lock:
+            for key, payload in items:
+                if key not in self._items:
+                    self._items[key] = {"payload": payload, "state": PENDING, "attempts": 0,
+                                        "worker": None, "expires": 0.0,
+                                        "result": None, "error": None}
+                    added += 1
+        return added
+
+    def lease(self, worker: str, n: int, ttl: float, max_attempts: int,
+              now: float) -> list[tuple[str, str, int]]:
+        leased = []
+        with self._lock:
+            for key, item in self._items.items():
+                if len(leased) >= n:
+                    break
+                if item["state"] == LEASED and item["expires"] < now:
+                    if item["attempts"] >= max_attempts:
+                        item["state"], item["error"] = FAILED, item["error"] or "lease expired"
+                        continue
+                    item["state"] = PENDING
+                if item["state"] == PENDING:
+                    item.update(state=LEASED, worker=worker, expires=now + ttl,
+                                attempts=item["attempts"] + 1)
+                    leased.append((key, item["payload"], item["attempts"]))
+        return leased
+
+    def _finish(self, key: str, worker: str, **changes) -> bool:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item["state"] != LEASED or item["worker"] != worker:
+                return False  # the lease expired and someone else has the item
+            item.update(changes)
+            return True
+
+    def complete(self, key: str, worker: str, result: str) -> bool:
+        return self._finish(key, worker, state=DONE, result=result)
+
+    def fail(self, key: str, worker: str, error: str, retry: bool) -> bool:
+        return self._finish(key, worker, state=PENDING if retry else FAILED, error=error)
+
+    def extend(self, key: str, worker: str, ttl: float, now: float) -> bool:
+        return self._finish(key, worker, expires=now + ttl)
+
+    def counts(self) -> dict[str, int]:
+        counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED), 0)
+        with self._lock:
+            for item in self._items.values():
+                counts[item["state"]] += 1
+        return counts
+
+    def results(self, state: str) -> list[tuple[str, str | None]]:
+        field = "result" if state == DONE else "error"
+        with self._lock:
+            return [(key, item[field]) for key, item in self._items.items()
+                    if item["state"] == state]
+
+
+class SQLiteBackend:
+    """Work items in an SQLite file; safe to share between processes."""
+
+    def __init__(self, path, table: str = "frontier"):
+        self.table = table
+        self._quoted = quote_identifier(table)
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False,
+                                          isolation_level=None)
+        self._lock = threading.Lock()
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._quoted} ("
+            " key TEXT PRIMARY KEY, payload TEXT NOT NULL, state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, expires REAL NOT NULL DEFAULT 0,"
+            " result TEXT, error TEXT)")
+        self.connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote_identifier(table + '_state')}"
+            f" ON {self._quoted} (state, expires)")
+
+    def _transaction(self, work: Callable[[sqlite3.Connection], Any]):
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes
+            # cannot lease the same rows.
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                out = work(self.connection)
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+            return out
+
+    def add(self, items: list[tuple[str, str]]) -> int:
+        def work(db):
+            before = db.total_changes
+            db.executemany(f"INSERT OR IGNORE INTO {self._quoted} (key, payload, state)"
+                           " VALUES (?, ?, 'pending')", items)
+            return db.total_changes - before
+        return self._transaction(work)
+
+    def lease(self, worker: str, n: int, ttl: float, max_attempts: int,
+              now: float) -> list[tuple[str, str, int]]:
+        t = self._quoted
+
+        def work(db):
+            db.execute(f"UPDATE {t} SET state = 'failed', error = coalesce(error, 'lease expired')"
+                       " WHERE state = 'leased' AND expires < ? AND attempts >= ?",
+                       (now, max_attempts))
+            rows = db.execute(
+                f"SELECT key, payload, attempts FROM {t} WHERE state = 'pending'"
+                " OR (state = 'leased' AND expires < ?) ORDER BY rowid LIMIT ?",
+                (now, n)).fetchall()
+            db.executemany(f"UPDATE {t} SET state = 'leased', worker = ?, expires = ?,"
+                           " attempts = attempts + 1 WHERE key = ?",
+                           [(worker, now + ttl, key) for key, _, _ in rows])
+            return [(key, payload, attempts + 1) for key, payload, attempts in rows]
+        return self._transaction(work)
+
+    def _finish(self, key: str, worker: str, assignments: str, values: tuple) -> bool:
+        def work(db):
+            cursor = db.execute(f"UPDATE {self._quoted} SET {assignments}"
+                                " WHERE key = ? AND state = 'leased' AND worker = ?",
+                                (*values, key, worker))
+            return cursor.rowcount == 1
+        return self._transaction(work)
+
+    def complete(self, key: str, worker: str, result: str) -> bool:
+        return self._finish(key, worker, "state = 'done', result = ?", (result,))
+
+    def fail(self, key: str, worker: str, error: str, retry: bool) -> bool:
+        return self._finish(key, worker, "state = ?, error = ?",
+                            (PENDING if retry else FAILED, error))
+
+    def extend(self, key: str, worker: str, ttl: float, now: float) -> bool:
+        return self._finish(key, worker, "expires = ?", (now + ttl,))
+
+    def counts(self) -> dict[str, int]:
+        counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED), 0)
+        with self._lock:
+            counts.update(self.connection.execute(
+                f"SELECT state, COUNT(*) FROM {self._quoted} GROUP BY state"))
+        return counts
+
+    def results(self, state: str) -> list[tuple[str, str | None]]:
+        field = "result" if state == DONE else "error"
+        with self._lock:
+            return self.connection.execute(
+                f"SELECT key, {field} FROM {self._quoted} WHERE state = ? ORDER BY rowid",
+                (state,)).fetchall()
+
+
+class Frontier:
+    """Crawl work items in a shared backend.
+
+    Parameters
+    ----------
+    backend : MemoryBackend, SQLiteBackend or a proxy from connect_frontier
+        Where the items live.
+    ttl : float
+        Seconds a worker may hold a lease before the item is handed out
+        again.
+    max_attempts : int
+        Leases per item before it is marked as failed.
+    """
+
+    def __init__(self, backend=None, ttl: float = 60, max_attempts: int = 3):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+
+    def add(self, items: Mapping[str, Mapping[str, Any]] | Iterable[tuple[str, Mapping]]) -> int:
+        """Add ``{key: payload}`` items; keys already present are skipped."""
+        pairs = items.items() if isinstance(items, Mapping) else items
+        return self.backend.add([(str(key), json.dumps(payload, sort_keys=True))
+                                 for key, payload in pairs])
+
+    def add_urls(self, urls: Iterable[str]) -> int:
+        """Add one item per URL, keyed by the URL."""
+        return self.add((url, {"url": url}) for url in urls)
+
+    def add_pages(self, url: str, pagination, count: int,
+                  params: Mapping[str, Any] | None = None) -> int:
+        """Add pages ``0 .. count - 1`` of a paginated API.
+
+        ``pagination`` is an :class:`~dsstools.scrape.planner.OffsetPagination`
+        or :class:`~dsstools.scrape.planner.PagePagination`; ``count`` can
+        come from :meth:`CrawlPlanner.page_count`.
+        """
+        base = dict(params or {})
+        items = []
+        for index in range(count):
+            page_params = {**base, **pagination.params(index)}
+            key = url + "?" + "&".join(f"{k}={v}" for k, v in sorted(page_params.items()))
+            items.append((key, {"url": url, "params": page_params, "index": index}))
+        return self.add(items)
+
+    def lease(self, worker: str, n: int = 1) -> list[WorkItem]:
+        """Take up to ``n`` items for ``worker`` (an empty list if none are free)."""
+        rows = self.backend.lease(worker, n, self.ttl, self.max_attempts, time.time())
+        return [WorkItem(key, json.loads(payload), attempts) for key, payload, attempts in rows]
+
+    def complete(self, item: WorkItem | str, worker: str, result: Any = None) -> bool:
+        """Store the result; False if the lease had expired and was lost."""
+        key = item.key if isinstance(item, WorkItem) else item
+        return self.backend.complete(key, worker, json.dumps(result))
+
+    def fail(self, item: WorkItem, worker: str, error: BaseException | str) -> bool:
+        """Give the item back, to be retried unless it is out of attempts."""
+        retry = item.attempts < self.max_attempts
+        return self.backend.fail(item.key, worker, str(error), retry)
+
+    def extend(self, item: WorkItem | str, worker: str) -> bool:
+        """Renew the lease for another ``ttl`` seconds, for slow items."""
+        key = item.key if isinstance(item, WorkItem) else item
+        return self.backend.extend(key, worker, self.ttl, time.time())
+
+    def counts(self) -> dict[str, int]:
+        """Number of items per state (pending, leased, done, failed)."""
+        return self.backend.counts()
+
+    def finished(self) -> bool:
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[LEASED] == 0
+
+    def results(self) -> Iterator[tuple[str, Any]]:
+        """``(key, result)`` for every completed item."""
+        for key, result in self.backend.results(DONE):
+            yield key, json.loads(result)
+
+    def failures(self) -> list[tuple[str, str]]:
+        """``(key, last error)`` for every item that ran out of attempts."""
+        return self.backend.results(FAILED)
+
+
+def run_worker(frontier: Frontier, fetch: Callable[[WorkItem], Any],
+               worker: str | None = None, batch: int = 1, idle: float = 1.0,
+               stop_when_empty: bool = True) -> int:
+    """Lease, fetch and complete items until the frontier is drained.
+
+    ``fetch(item)`` returns the result to store (e.g. the decoded page);
+    an exception counts as a failed attempt. While leased items are still
+    out with other workers, this waits ``idle`` seconds and tries again,
+    so it picks up items whose leases expire. Returns the number of items
+    this worker completed.
+    """
+    worker = worker or f"{socket.gethostname()}-{threading.get_ident()}"
+    done = 0
+    while True:
+        items = frontier.lease(worker, batch)
+        if not items:
+            if stop_when_empty and frontier.finished():
+                return done
+            time.sleep(idle)
+            continue
+        for item in items:
+            try:
+                result = fetch(item)
+            except Exception as exc:
+                frontier.fail(item, worker, f"{type(exc).__name__}: {exc}")
+                continue
+            if frontier.complete(item, worker, result):
+                done += 1
+
+
+class _FrontierManager(BaseManager):
+    pass
+
+
+AUTHKEY_VARIABLE = "DSSTOOLS_FRONTIER_AUTHKEY"
+
+
+def _authkey(authkey: bytes | str | None) -> bytes:
+    """``authkey``, or the one in ``$DSSTOOLS_FRONTIER_AUTHKEY``, as bytes."""
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_VARIABLE)
+    if not authkey:
+        # The key is never generated here: printing it would leave it in
+        # logs, where anyone could use it to run code in the server.
+        raise ValueError(f"the frontier needs an authkey: pass one or set ${AUTHKEY_VARIABLE}")
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+def serve_frontier(address: tuple[str, int] = ("127.0.0.1", 50000),
+                   authkey: bytes | str | None = None, backend=None):
+    """Serve a backend over TCP until interrupted (blocks).
+
+    Workers connect with :func:`connect_frontier` and the same ``authkey``.
+    The connection uses pickle, so anyone with the key can run code in the
+    server: it listens on localhost only by default, and the key must be
+    given, as ``authkey`` or in ``$DSSTOOLS_FRONTIER_AUTHKEY`` (e.g. made
+    with ``python -c "import secrets; print(secrets.token_hex(16))"`` and
+    kept in a file only you can read). Pass the machine's address (or
+    ``""``) to accept workers from other machines. By default the items
+    are kept in memory in the server process.
+    """
+    authkey = _authkey(authkey)
+    backend = backend if backend is not None else MemoryBackend()
+    _FrontierManager.register("backend", callable=lambda: backend)
+    manager = _FrontierManager(address=address, authkey=authkey)
+    manager.get_server().serve_forever()
+
+
+def connect_frontier(address: tuple[str, int], authkey: bytes | str | None = None,
+                     **options) -> Frontier:
+    """A :class:`Frontier` backed by a server started with :func:`serve_frontier`.
+
+    ``authkey`` defaults to ``$DSSTOOLS_FRONTIER_AUTHKEY``, as for the server.
+    """
+    _FrontierManager.register("backend")
+    manager = _FrontierManager(address=address, authkey=_authkey(authkey))
+    manager.connect()
+    return Frontier(manager.backend(), **options)
@@ -0,0 +1,285 @@
+"""Run scraping jobs described in a YAML or JSON file.
+
+The workshop hard-codes its URLs and XPaths. A job spec lists them as
+data instead, so a whole batch of crawls runs with one command::
+
+    python -m dsstools.scrape.jobs nightly.yaml
+    python -m dsstools.scrape.jobs nightly.yaml --only events floor_plan
+
+An example spec, covering the workshop's examples::
+
+    defaults:
+      timeout: 30
+      workers: 4
+      headers: {User-Agent: "dss-workshop"}
+    jobs:
+      - name: collections
+        url: https://www.harvardartmuseums.org/browse
+        params: {load_amount: 10}
+        pagination: {type: offset, param: offset, size: 10, pages: 5}
+        records: [records]                    # key path of the list in each page
+        output: records_final.csv
+      - name: exhibitions
+        url: https://www.harvardartmuseums.org/search/load_more
+        params: {type: past-exhibition}
+        pagination: {type: page, param: page, pages: auto, max_pages: 500}  # find the last page
+        output: {path: museum.sqlite, table: exhibitions, index: [id]}
+      - name: events
+        url: https://www.harvardartmuseums.org/calendar
+        container: '//*[@id="events_list"]/article'
+        fields:
+          title: div/div/header/h2/a
+          date: div/div/header/time
+        output: all_event_values.json
+      - name: floor_plan
+        url: https://www.harvardartmuseums.org/visit/floor-plan
+        table:
+          container: /html/body/main/section/ul/li
+          rows: div[2]/ul/li
+          container_cells: {level: "div[1]"}
+        output: facilities.csv
+
+A job is a JSON job unless it has ``container``/``fields`` (one record per
+container, with :class:`~dsstools.scrape.stream.StreamSelector`) or
+``table`` (:class:`~dsstools.scrape.extract.TableExtractor`). Outputs are
+``.csv``, ``.json`` or a SQLite database (``.sqlite``/``.db``, with a
+``table``).
+
+All jobs in a spec share one HTTP session per host, so connections stay
+open from one job to the next. Identical extractors are compiled once
+and reused by every job that names them. Pages of one job are fetched
+``workers`` at a time. A failing job is reported and the others still
+run; the exit status is 1 if any failed. YAML specs need PyYAML.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Mapping
+from urllib.parse import urlsplit
+
+from dsstools.scrape import fastjson
+from dsstools.scrape.planner import CrawlPlanner, OffsetPagination, PagePagination, _lookup
+
+JOB_DEFAULTS = {"timeout": 30, "workers": 4, "headers": {}, "params": {}, "records": ["records"]}
+_SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+
+def load_spec(path) -> dict:
+    """Read a spec from a ``.yaml``/``.yml`` or ``.json`` file and check its jobs."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML job specs need PyYAML; use a .json spec instead") from None
+        spec = yaml.safe_load(text)
+    else:
+        spec = json.loads(text)
+    if not isinstance(spec, Mapping) or not isinstance(spec.get("jobs"), list):
+        raise ValueError(f"{path}: a spec needs a list of 'jobs'")
+    names = set()
+    for i, job in enumerate(spec["jobs"]):
+        if not isinstance(job, Mapping) or "url" not in job:
+            raise ValueError(f"{path}: job {i} needs a 'url'")
+        name = job.setdefault("name", f"job{i}")
+        if name in names:
+            raise ValueError(f"{path}: job name {name!r} is used twice")
+        names.add(name)
+    return dict(spec)
+
+
+def _pagination(options: Mapping[str, Any]):
+    options = dict(options)
+    kind = options.pop("type", "offset")
+    options.pop("pages", None)
+    options.pop("max_pages", None)
+    if kind == "offset":
+        return OffsetPagination(**options)
+    if kind == "page":
+        return PagePagination(**options)
+    raise ValueError(f"unknown pagination type {kind!r} (use 'offset' or 'page')")
+
+
+def _output(options) -> tuple[str, dict]:
+    """``(kind, options)`` for an output given as a path or a mapping."""
+    options = {"path": options} if isinstance(options, str) else dict(options)
+    suffix = Path(options["path"]).suffix.lower()
+    if suffix in _SQLITE_SUFFIXES:
+        return "sqlite", options
+    if suffix in (".csv", ".json"):
+        return suffix[1:], options
+    raise ValueError(f"unsupported output {options['path']!r} (use .csv, .json or .sqlite)")
+
+
+class JobRunner:
+    """Run jobs with shared sessions and compiled extractors.
+
+    Parameters
+    ----------
+    defaults : mapping, optional
+        Settings for every job that does not set them (see ``JOB_DEFAULTS``).
+    session_factory : callable, optional
+        Makes the session for a host; ``requests.Session`` by default.
+    """
+
+    def __init__(self, defaults: Mapping[str, Any] | None = None,
+                 session_factory: Callable[[], Any] | None = None):
+        self.defaults = {**JOB_DEFAULTS, **(defaults or {})}
+        self._session_factory = session_factory
+        self._sessions: dict[str, Any] = {}
+        self._extractors: dict[str, Any] = {}
+        # Pages are fetched and parsed in worker threads.
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "JobRunner":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def session(self, url: str):
+        """The session for ``url``'s host, created on first use."""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._sessions:
+                factory = self._session_factory
+                if factory is None:
+                    import requests
+                    factory = requests.Session
+                self._sessions[host] = factory()
+            return self._sessions[host]
+
+    def _extractor(self, job: Mapping[str, Any]):
+        """The compiled extractor for an HTML job, shared between identical jobs."""
+        if "table" in job:
+            key = json.dumps(["table", job["table"]], sort_keys=True)
+        else:
+            key = json.dumps(["fields", job["container"], job.get("fields", {}),
+                              job.get("default", "")], sort_keys=True)
+        with self._lock:
+            extractor = self._extractors.get(key)
+            if extractor is None:
+                if "table" in job:
+                    from dsstools.scrape.extract import TableExtractor
+                    extractor = TableExtractor(**job["table"])
+                else:
+                    from dsstools.scrape.stream import StreamSelector
+                    extractor = StreamSelector(job["container"], job.get("fields", {}),
+                                               job.get("default", ""))
+                self._extractors[key] = extractor
+            return extractor
+
+    def _fetch(self, job: Mapping[str, Any], params: Mapping[str, Any]):
+        session = self.session(job["url"])
+        response = session.get(job["url"], params={**job["params"], **params},
+                               headers=job["headers"] or None, timeout=job["timeout"])
+        response.raise_for_status()
+        return response
+
+    def _records(self, job: Mapping[str, Any], response) -> list[dict]:
+        if "table" in job:
+            from dsstools.scrape.content import html_tree
+
+            columns = self._extractor(job).extract(html_tree(response))
+            return [dict(zip(columns, row)) for row in zip(*columns.values())]
+        if "container" in job:
+            return self._extractor(job).from_response(response)
+        records = fastjson.from_response(response, job["records"])
+        return list(records or [])
+
+    def run(self, job: Mapping[str, Any]) -> list[dict]:
+        """Fetch every page of ``job`` and return its records, in page order."""
+        job = {**self.defaults, **job}
+        pagination = job.get("pagination")
+        if not pagination:
+            return self._records(job, self._fetch(job, {}))
+        pager = _pagination(pagination)
+        pages = pagination.get("pages", 1)
+        if pages == "auto":
+            if "container" in job or "table" in job:
+                raise ValueError(f"job {job['name']!r}: 'pages: auto' needs a JSON job")
+            planner = CrawlPlanner(lambda params: fastjson.from_response(self._fetch(job, params)),
+                                   pager, records_path=job["records"],
+                                   max_pages=pagination.get("max_pages", 1 << 20))
+            records: list[dict] = []
+            for _, page in planner.crawl(workers=job["workers"]):
+                records.extend(_lookup(page, job["records"]) or [])
+            return records
+        with ThreadPoolExecutor(job["workers"]) as pool:
+            responses = pool.map(lambda i: self._fetch(job, pager.params(i)), range(int(pages)))
+            return [record for response in responses for record in self._records(job, response)]
+
+    def write(self, job: Mapping[str, Any], records: list[dict]) -> None:
+        """Write ``records`` to the job's ``output``, if it has one."""
+        if not job.get("output"):
+            return
+        kind, options = _output(job["output"])
+        if kind == "sqlite":
+            from dsstools.scrape.sinks import SQLiteSink
+            with SQLiteSink(options["path"], options.get("table", job["name"]),
+                            index=options.get("index", ()),
+                            replace=options.get("replace", False)) as sink:
+                sink.write_records(records)
+        else:
+            from dsstools.scrape.workflow import write_records
+            write_records(records, options["path"])
+
+    def run_all(self, jobs: Iterable[Mapping[str, Any]], log=print) -> dict[str, Any]:
+        """Run and write each job; return its record count or the exception it raised."""
+        results: dict[str, Any] = {}
+        for job in jobs:
+            start = time.perf_counter()
+            try:
+                records = self.run(job)
+                self.write(job, records)
+            except Exception as exc:
+                results[job["name"]] = exc
+                log(f"{job['name']}: FAILED {type(exc).__name__}: {exc}")
+                continue
+            results[job["name"]] = len(records)
+            output = job.get("output")
+            target = f" -> {output if isinstance(output, str) else output['path']}" if output else ""
+            log(f"{job['name']}: {len(records)} records{target} "
+                f"({time.perf_counter() - start:.1f} s)")
+        return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the scraping jobs in a spec file.")
+    parser.add_argument("spec", help="YAML or JSON job spec")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run only these jobs")
+    parser.add_argument("--list", action="store_true", help="list the jobs and exit")
+    args = parser.parse_args(argv)
+
+    spec = load_spec(args.spec)
+    jobs = spec["jobs"]
+    if args.only:
+        unknown = set(args.only) - {job["name"] for job in jobs}
+        if unknown:
+            parser.error(f"no such job(s): {', '.join(sorted(unknown))}")
+        jobs = [job for job in jobs if job["name"] in args.only]
+    if args.list:
+        for job in jobs:
+            print(f"{job['name']}: {job['url']}")
+        return 0
+    with JobRunner(spec.get("defaults")) as runner:
+        results = runner.run_all(jobs)
+    return 1 if any(isinstance(result, Exception) for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Run fetch, parse, extract and write as concurrent stages.
+
+In the workshop each page is requested, parsed, picked apart and saved
+before the next request goes out, so the network waits for pandas and
+pandas waits for the network. :class:`Pipeline` runs each step in its own
+pool of threads, connected by bounded queues: a stage that falls behind
+fills its input queue, which blocks the stage before it (backpressure),
+so memory stays bounded no matter how many pages there are::
+
+    session = requests.Session()
+    pipeline = (Pipeline(maxsize=32)
+                .stage("fetch", lambda url: session.get(url).content, workers=8)
+                .stage("parse", html.fromstring, workers=2)
+                .stage("extract", lambda page: page.xpath('//*[@id="events_list"]/article'),
+                       many=True)
+                .stage("fields", lambda event: {key: get_event_info(event, path)
+                                                for key, path in elements_we_want.items()}))
+    with SQLiteSink("events.sqlite", "events") as sink:
+        for batch in pipeline.batches(calendar_urls, size=500):
+            sink.write_records(batch)
+    print(pipeline.stats)
+
+The output of the last stage is returned to the calling thread, so sinks
+that are not thread-safe (SQLite connections, open files) are written
+from one place. Items may come out in a different order than they went
+in. An exception in any stage stops the pipeline and is raised in the
+caller.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator
+
+_DONE = object()
+_POLL = 0.1  # seconds between checks for a stopped pipeline
+
+
+class _Stage:
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int, many: bool):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.many = many
+        self.items = 0
+        self.busy = 0.0
+
+
+class Pipeline:
+    """Stages of worker threads joined by bounded queues.
+
+    Parameters
+    ----------
+    maxsize : int
+        Capacity of each queue between stages.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._stages: list[_Stage] = []
+
+    def stage(self, name: str, func: Callable[[Any], Any], workers: int = 1,
+              many: bool = False) -> "Pipeline":
+        """Add a stage that applies ``func`` to each item, in ``workers`` threads.
+
+        If ``func`` returns ``None`` the item is dropped. With ``many=True``
+        ``func`` returns an iterable and each of its elements is passed on
+        separately (e.g. one parsed page to many events). Returns the
+        pipeline, so calls can be chained.
+        """
+        if workers < 1:
+            raise ValueError("a stage needs at least one worker")
+        self._stages.append(_Stage(name, func, workers, many))
+        return self
+
+    @property
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Items processed and seconds spent per stage, from the last run."""
+        return {stage.name: {"items": stage.items, "busy": stage.busy}
+                for stage in self._stages}
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """Feed ``items`` through every stage and yield the results."""
+        queues = [queue.Queue(self.maxsize) for _ in range(len(self._stages) + 1)]
+        stop = threading.Event()
+        errors: list[BaseException] = []
+        lock = threading.Lock()
+
+        def put(q: queue.Queue, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=_POLL)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def fail(exc: BaseException):
+            with lock:
+                errors.append(exc)
+            stop.set()
+
+        def feed():
+            try:
+                for item in items:
+                    if not put(queues[0], item):
+                        return
+            except BaseException as exc:
+                fail(exc)
+            put(queues[0], _DONE)
+
+        def work(stage: _Stage, inbox: queue.Queue, outbox: queue.Queue, live: list[int]):
+            while not stop.is_set():
+                try:
+                    item = inbox.get(timeout=_POLL)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    inbox.put(_DONE)  # let the other workers of this stage see it
+                    with lock:
+                        live[0] -= 1
+                        last = live[0] == 0
+                    if last:
+                        put(outbox, _DONE)
+                    return
+                started = time.perf_counter()
+                try:
+                    result = stage.func(item)
+                    with lock:
+                        stage.items += 1
+                        stage.busy += time.perf_counter() - started
+                    if result is None:
+                        continue
+                    # A many=True result may be a generator that raises
+                    # while it is iterated.
+                    for out in (result if stage.many else (result,)):
+                        if not put(outbox, out):
+                            return
+                except BaseException as exc:
+                    fail(exc)
+                    return
+
+        for stage in self._stages:
+            stage.items, stage.busy = 0, 0.0
+        threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+        for i, stage in enumerate(self._stages):
+            live = [stage.workers]
+            threads.extend(
+                threading.Thread(target=work, args=(stage, queues[i], queues[i + 1], live),
+                                 name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                try:
+                    item = queues[-1].get(timeout=_POLL)
+                except queue.Empty:
+                    if stop.is_set():
+                        break
+                    continue
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+    def batches(self, items: Iterable[Any], size: int = 1000) -> Iterator[list[Any]]:
+        """Like :meth:`run`, but yield lists of up to ``size`` results."""
+        batch = []
+        for item in self.run(items):
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
@@ -0,0 +1,244 @@
+"""Work out how many pages a paginated API has, then fetch exactly those.
+
+The workshop loops over ``range(0, 50, 10)`` offsets of ``browse`` and
+``range(1, 6)`` pages of ``search/load_more``. To fetch *everything* you
+would have to guess the upper bound. :class:`CrawlPlanner` finds it:
+
+1. If the first page reports a total (``info.totalrecords`` and similar
+   keys), the page count follows from the page size. A reported page
+   count (``info.pages``) is used only if the server's pages hold as many
+   records as ours.
+2. Otherwise it probes pages 1, 2, 4, 8, ... until it finds an empty one,
+   then binary-searches between the last full and the first empty page.
+
+The crawl then requests every remaining page in parallel batches; pages
+fetched while probing are reused, not requested again::
+
+    planner = CrawlPlanner(
+        json_fetcher(collection_url),
+        OffsetPagination("offset", size=10, size_param="load_amount"),
+    )
+    for index, page in planner.crawl(workers=8):
+        builder.add_page(page)
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Mapping, Sequence, Sized
+
+from dsstools.scrape import fastjson
+
+# Keys (inside the page or its "info" object) that report the number of
+# pages or records, in order of preference.
+PAGE_COUNT_KEYS = ("pages", "totalpages", "total_pages", "pageCount")
+RECORD_COUNT_KEYS = ("totalrecords", "total", "total_count", "totalCount", "count")
+
+
+class OffsetPagination:
+    """Pages selected by a record offset, e.g. ``?offset=20&load_amount=10``."""
+
+    def __init__(self, param: str = "offset", size: int = 10,
+                 size_param: str | None = None, start: int = 0):
+        self.param = param
+        self.size = size
+        self.size_param = size_param
+        self.start = start
+
+    def params(self, index: int) -> dict[str, int]:
+        params = {self.param: self.start + index * self.size}
+        if self.size_param:
+            params[self.size_param] = self.size
+        return params
+
+    def pages_for(self, records: int) -> int:
+        return math.ceil(max(records - self.start, 0) / self.size)
+
+
+class PagePagination:
+    """Pages selected by number, e.g. ``?page=3`` (first page ``start``)."""
+
+    def __init__(self, param: str = "page", size: int | None = None, start: int = 1):
+        self.param = param
+        self.size = size
+        self.start = start
+
+    def params(self, index: int) -> dict[str, int]:
+        return {self.param: self.start + index}
+
+    def pages_for(self, records: int) -> int:
+        if not self.size:
+            raise ValueError("PagePagination needs size to convert a record count")
+        return math.ceil(records / self.size)
+
+
+def json_fetcher(url: str, params: Mapping[str, Any] | None = None,
+                 session=None, timeout: float = 30) -> Callable[[dict], Any]:
+    """Return ``fetch(page_params)`` that GETs ``url`` and decodes the JSON."""
+    if session is None:
+        import requests
+        session = requests.Session()
+    base = dict(params or {})
+
+    def fetch(page_params: dict) -> Any:
+        response = session.get(url, params={**base, **page_params}, timeout=timeout)
+        response.raise_for_status()
+        return fastjson.from_response(response)
+
+    return fetch
+
+
+def _lookup(page: Any, path: Sequence[str]):
+    for key in path:
+        if not isinstance(page, Mapping) or key not in page:
+            return None
+        page = page[key]
+    return page
+
+
+class CrawlPlanner:
+    """Find the last page of a paginated API and schedule the requests.
+
+    Parameters
+    ----------
+    fetch : callable
+        ``fetch(params)`` requests one page and returns the decoded JSON.
+    pagination : OffsetPagination or PagePagination
+        How a page number turns into request parameters.
+    records_path : sequence of str
+        Keys leading to the page's list of records; a page without records
+        is past the end.
+    total_path, pages_path : sequence of str, optional
+        Where the first page reports the number of records or pages. By
+        default common keys (:data:`RECORD_COUNT_KEYS`,
+        :data:`PAGE_COUNT_KEYS`) are tried at the top level and in
+        ``info``.
+    max_pages : int
+        Upper bound on the page count, in case the API never returns an
+        empty page.
+    """
+
+    def __init__(self, fetch: Callable[[dict], Any], pagination,
+                 records_path: Sequence[str] = ("records",),
+                 total_path: Sequence[str] | None = None,
+                 pages_path: Sequence[str] | None = None,
+                 max_pages: int = 1 << 20):
+        self.fetch = fetch
+        self.pagination = pagination
+        self.records_path = tuple(records_path)
+        self.total_path = total_path
+        self.pages_path = pages_path
+        self.max_pages = max_pages
+        self.pages: dict[int, Any] = {}  # pages fetched so far, by index
+        self.requests = 0  # number of pages requested so far
+        self._page_count: int | None = None
+        self._lock = threading.Lock()
+
+    def _get(self, index: int) -> Any:
+        if index not in self.pages:
+            page = self.fetch(self.pagination.params(index))
+            with self._lock:
+                self.pages[index] = page
+                self.requests += 1
+        return self.pages[index]
+
+    def _is_empty(self, page: Any) -> bool:
+        return not _lookup(page, self.records_path)
+
+    def _page_size_matches(self, page: Any, pages: int) -> bool:
+        """Whether the server's pages are the same size as ours."""
+        if isinstance(self.pagination, PagePagination) or pages <= 1:
+            # Page numbers select the server's own pages.
+            return True
+        records = _lookup(page, self.records_path)
+        # The first of several pages is full, so it shows the server's size.
+        return isinstance(records, Sized) and len(records) == self.pagination.size
+
+    def _reported_pages(self, page: Any) -> int | None:
+        """Page count from the first page's metadata, if it has any.
+
+        A record total is preferred, divided by our page size. A reported
+        page count is used only if the server's pages have the size we ask
+        for, e.g. not when ``load_amount`` is ignored.
+        """
+        total = pages = None
+        if self.total_path is not None:
+            value = _lookup(page, self.total_path)
+            total = int(value) if value is not None else None
+            if total is not None:
+                return self.pagination.pages_for(total)
+        if self.pages_path is not None:
+            value = _lookup(page, self.pages_path)
+            pages = int(value) if value is not None else None
+        if self.total_path is None and self.pages_path is None:
+            for prefix in ((), ("info",)):
+                for key in RECORD_COUNT_KEYS:
+                    value = _lookup(page, prefix + (key,))
+                    if total is None and isinstance(value, int):
+                        total = value
+                for key in PAGE_COUNT_KEYS:
+                    value = _lookup(page, prefix + (key,))
+                    if pages is None and isinstance(value, int):
+                        pages = value
+        if total is not None and getattr(self.pagination, "size", None):
+            return self.pagination.pages_for(total)
+        if pages is not None and self._page_size_matches(page, pages):
+            return pages
+        return None
+
+    def page_count(self) -> int:
+        """Number of non-empty pages (fetches the first page, maybe probes)."""
+        if self._page_count is not None:
+            return self._page_count
+        first = self._get(0)
+        if self._is_empty(first):
+            self._page_count = 0
+            return 0
+        reported = self._reported_pages(first)
+        if reported is not None:
+            self._page_count = min(reported, self.max_pages)
+            return self._page_count
+        # Exponential probing: lo is known to be full, hi (once found) empty.
+        lo, hi, step = 0, None, 1
+        while hi is None:
+            index = min(step, self.max_pages - 1)
+            if index <= lo:  # every page up to max_pages is full
+                hi = lo + 1
+            elif self._is_empty(self._get(index)):
+                hi = index
+            else:
+                lo = index
+                step *= 2
+        # Binary search for the last full page.
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self._is_empty(self._get(mid)):
+                hi = mid
+            else:
+                lo = mid
+        self._page_count = lo + 1
+        return self._page_count
+
+    def plan(self) -> list[dict]:
+        """Request parameters for every page still to be fetched."""
+        return [self.pagination.params(i) for i in range(self.page_count())
+                if i not in self.pages]
+
+    def crawl(self, workers: int = 8) -> Iterator[tuple[int, Any]]:
+        """Yield ``(index, page)`` for every page, in order.
+
+        Pages not fetched while planning are requested ``workers`` at a
+        time; each batch is yielded before the next one is requested, so
+        only one batch of pages is held in memory.
+        """
+        count = self.page_count()
+        workers = max(workers, 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, count, workers):
+                batch = range(start, min(start + workers, count))
+                for index, page in zip(batch, pool.map(self._get, batch)):
+                    with self._lock:
+                        self.pages.pop(index, None)
+                    yield index, page
@@ -0,0 +1,291 @@
+"""Build a DataFrame from pages of JSON records without a list of dicts.
+
+The workshop collects records like this::
+
+    records = []
+    for offset in range(0, 50, 10):
+        ...
+        records.extend(current_request.json()['records'])
+    records_final = pd.DataFrame.from_records(records)
+
+which keeps every decoded record dict alive until the end and lets pandas
+guess each column's type row by row. :class:`RecordBatchBuilder` instead
+copies each field straight into a typed column buffer as a page arrives,
+so the page's dicts can be freed immediately, and builds the DataFrame
+(or Arrow table) once with a fixed schema::
+
+    builder = RecordBatchBuilder({"id": "int", "title": "str", "rank": "float"})
+    for offset in range(0, 50, 10):
+        ...
+        builder.add_page(current_request.content)
+    records_final = builder.to_frame()
+
+Column types are ``"int"``, ``"float"``, ``"bool"``, ``"str"`` and
+``"object"`` (anything else, e.g. nested lists). Missing values become
+nulls. Without a schema, the types are taken from the first page. An
+int column that later gets a fraction becomes a float column, and one
+that gets an integer too large for 64 bits becomes an object column. A
+bool column takes only ``true``/``false`` (and 0 or 1); anything else,
+such as the string ``"false"``, makes it an object column. Values are
+never truncated.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from itertools import repeat
+from operator import is_not, itemgetter
+from typing import Any, Iterable, Mapping, Sequence
+
+from dsstools.scrape import fastjson
+
+COLUMN_TYPES = ("int", "float", "bool", "str", "object")
+
+_PYTHON_TYPES = {int: "int", float: "float", bool: "bool", str: "str", object: "object"}
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _normalize_type(kind) -> str:
+    kind = _PYTHON_TYPES.get(kind, kind)
+    if kind not in COLUMN_TYPES:
+        raise ValueError(f"unknown column type {kind!r}; use one of {COLUMN_TYPES}")
+    return kind
+
+
+def infer_type(value) -> str:
+    """Column type for a decoded JSON value."""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    return "object"
+
+
+class _Column:
+    """Values of one field plus a validity mask."""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        if kind == "int":
+            self.values = array("q")
+        elif kind == "float":
+            self.values = array("d")
+        elif kind == "bool":
+            self.values = bytearray()
+        else:
+            self.values = []
+        self.valid = bytearray()
+
+    def extend(self, values: list):
+        """Append a page worth of values (``None`` for missing)."""
+        # Fast path: the buffers take whole lists at C speed. Values of the
+        # wrong type fall back to append(), which converts or rejects them.
+        if self.kind in ("str", "bool"):
+            # bytearray.extend() would also take any small int as a bool.
+            types = set(map(type, values))
+            if types - {str if self.kind == "str" else bool, type(None)}:
+                for value in values:
+                    self.append(value)
+                return
+        if None in values:
+            valid = bytes(map(is_not, values, repeat(None)))
+            if self.kind not in ("str", "object"):
+                fill = math.nan if self.kind == "float" else 0
+                values = [fill if value is None else value for value in values]
+        else:
+            valid = b"\x01" * len(values)
+        size = len(self.values)
+        try:
+            self.values.extend(values)
+        except (TypeError, ValueError, OverflowError):
+            del self.values[size:]
+            for value, ok in zip(values, valid):
+                self.append(value if ok else None)
+            return
+        self.valid.extend(valid)
+
+    def _widen(self, kind: str):
+        """Change an int or bool column to ``kind``, keeping the values stored so far."""
+        if kind == "float":
+            self.values = array("d", [value if ok else math.nan
+                                      for value, ok in zip(self.values, self.valid)])
+        else:
+            as_python = bool if self.kind == "bool" else int
+            self.values = [as_python(value) if ok else None
+                           for value, ok in zip(self.values, self.valid)]
+        self.kind = kind
+
+    def append(self, value):
+        if self.kind == "int" and value is not None:
+            # Widen rather than truncate 2.7 to 2 or overflow the int64 buffer.
+            if isinstance(value, float) and not value.is_integer():
+                self._widen("float")
+            elif isinstance(value, (int, float)) and not _INT64_MIN <= value <= _INT64_MAX:
+                self._widen("object")
+        elif self.kind == "bool" and value is not None:
+            # bool("false") is True: keep anything but a real bool (or a
+            # 0/1 flag) as it is.
+            if not (isinstance(value, bool) or (isinstance(value, int) and value in (0, 1))):
+                self._widen("object")
+        if value is None:
+            self.values.append(math.nan if self.kind == "float" else
+                               None if self.kind in ("str", "object") else 0)
+            self.valid.append(0)
+            return
+        try:
+            if self.kind == "int":
+                value = int(value)
+            elif self.kind == "float":
+                value = float(value)
+            elif self.kind == "bool":
+                value = bool(value)
+            elif self.kind == "str" and not isinstance(value, str):
+                value = str(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"field {self.name!r}: cannot store {value!r} "
+                             f"in a {self.kind} column") from None
+        self.values.append(value)
+        self.valid.append(1)
+
+    def to_pandas(self):
+        import numpy as np
+        import pandas as pd
+
+        mask = np.frombuffer(bytes(self.valid), dtype=np.uint8) == 0
+        if self.kind == "int":
+            values = np.frombuffer(self.values, dtype=np.int64).copy()
+            return pd.arrays.IntegerArray(values, mask)
+        if self.kind == "float":
+            return np.frombuffer(self.values, dtype=np.float64).copy()
+        if self.kind == "bool":
+            values = np.frombuffer(bytes(self.values), dtype=np.uint8).astype(bool)
+            return pd.arrays.BooleanArray(values, mask)
+        if self.kind == "str":
+            # Values are already checked to be str; the Python-backed string
+            # dtype wraps them without converting each one.
+            return pd.array(self.values, dtype=pd.StringDtype("python"))
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values
+
+    def to_arrow(self):
+        import numpy as np
+        import pyarrow as pa
+
+        mask = np.frombuffer(bytes(self.valid), dtype=np.uint8) == 0
+        if self.kind == "int":
+            return pa.array(np.frombuffer(self.values, dtype=np.int64), mask=mask)
+        if self.kind == "float":
+            return pa.array(np.frombuffer(self.values, dtype=np.float64), mask=mask)
+        if self.kind == "bool":
+            values = np.frombuffer(bytes(self.values), dtype=np.uint8).astype(bool)
+            return pa.array(values, mask=mask)
+        if self.kind == "str":
+            return pa.array(self.values, type=pa.string())
+        # Nested values have no fixed Arrow type; store them as JSON text.
+        import json
+        return pa.array([None if v is None else json.dumps(v) for v in self.values],
+                        type=pa.string())
+
+
+class RecordBatchBuilder:
+    """Accumulate JSON records into typed columns.
+
+    Parameters
+    ----------
+    schema : mapping of field name to column type, optional
+        Fields to keep and their types (``"int"``, ``"float"``, ``"bool"``,
+        ``"str"``, ``"object"`` or the matching Python types). If omitted,
+        every field of the first page is kept with the type of its first
+        non-null value.
+
+    Fields not in the schema are dropped; their names are collected in
+    ``ignored_fields``.
+    """
+
+    def __init__(self, schema: Mapping[str, Any] | None = None):
+        self._columns: list[_Column] = []
+        self._names: frozenset[str] = frozenset()
+        self.ignored_fields: set[str] = set()
+        self._rows = 0
+        if schema is not None:
+            self._set_schema({name: _normalize_type(kind) for name, kind in schema.items()})
+
+    def _set_schema(self, schema: dict[str, str]):
+        self._columns = [_Column(name, kind) for name, kind in schema.items()]
+        self._names = frozenset(schema)
+
+    @property
+    def schema(self) -> dict[str, str]:
+        return {column.name: column.kind for column in self._columns}
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def extend(self, records: Sequence[Mapping[str, Any]] | Iterable[Mapping[str, Any]]):
+        """Append records (dicts decoded from JSON), typically one page."""
+        records = list(records)
+        if not records:
+            return
+        if not self._columns:
+            self._set_schema(self._infer_schema(records))
+        for column in self._columns:
+            try:
+                values = list(map(itemgetter(column.name), records))
+            except KeyError:
+                values = [record.get(column.name) for record in records]
+            column.extend(values)
+        extra = set().union(*records) - self._names
+        if extra:
+            self.ignored_fields.update(extra)
+        self._rows += len(records)
+
+    def append(self, record: Mapping[str, Any]):
+        self.extend((record,))
+
+    def add_page(self, page, path: Sequence[str] = ("records",),
+                 encoding: str | None = None) -> int:
+        """Append the records of one page; return how many there were.
+
+        ``page`` is either decoded JSON or the raw response body (bytes or
+        str), in which case only the records are decoded, as ``encoding``
+        (UTF-8 by default). ``path`` gives the keys leading from the page
+        to its list of records; ``("records",)`` matches the museum API.
+        """
+        if isinstance(page, (bytes, bytearray, memoryview, str)):
+            records = fastjson.extract(page, path, encoding)
+        else:
+            records = page
+            for key in path:
+                records = records[key]
+        before = self._rows
+        self.extend(records)
+        return self._rows - before
+
+    @staticmethod
+    def _infer_schema(records: Sequence[Mapping[str, Any]]) -> dict[str, str]:
+        schema: dict[str, str | None] = {}
+        for record in records:
+            for name, value in record.items():
+                if schema.get(name) is None:
+                    schema[name] = None if value is None else infer_type(value)
+        return {name: kind or "object" for name, kind in schema.items()}
+
+    def to_frame(self):
+        """Return the records as a pandas ``DataFrame``."""
+        import pandas as pd
+
+        return pd.DataFrame({column.name: column.to_pandas() for column in self._columns},
+                            index=pd.RangeIndex(self._rows))
+
+    def to_arrow(self):
+        """Return the records as a ``pyarrow.Table`` (needs pyarrow)."""
+        import pyarrow as pa
+
+        return pa.table({column.name: column.to_arrow() for column in self._columns})
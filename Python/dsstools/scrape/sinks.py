@@ -0,0 +1,157 @@
+"""Write scraped records to a local SQLite database.
+
+The workshop saves every result with ``DataFrame.to_csv``, so each file
+has to be parsed again before it can be queried, and appending means
+rewriting. :class:`SQLiteSink` bulk-inserts records as they arrive, in
+batched transactions through one prepared ``INSERT`` statement, and
+creates indexes once loading is done::
+
+    with SQLiteSink("museum.sqlite", "collection", index=["id"]) as sink:
+        for offset in range(0, 50, 10):
+            ...
+            sink.write_records(current_request.json()["records"])
+
+    with SQLiteSink("museum.sqlite", "events") as sink:
+        sink.write_columns(all_event_values)    # dict of equal-length lists
+
+The table is created from the first batch (one column per field, typed
+like :class:`~dsstools.scrape.records.RecordBatchBuilder` columns) and
+new fields in later batches are added as columns. Nested values are
+stored as JSON text.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Any, Iterable, Mapping, Sequence
+
+from dsstools.scrape.records import infer_type
+
+_SQL_TYPES = {"int": "INTEGER", "float": "REAL", "bool": "INTEGER",
+              "str": "TEXT", "object": "TEXT"}
+
+
+def quote_identifier(name: str) -> str:
+    """``name`` as an SQLite identifier (table, column or index name).
+
+    The name is put in double quotes with inner quotes doubled, so any
+    string, e.g. ``"crawl queue"`` or a field name from an API, is safe to
+    put in SQL. Values should still be passed as ``?`` parameters.
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class SQLiteSink:
+    """Batched, append-only loader for one SQLite table.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Database file (created if missing).
+    table : str
+        Table to append to (created if missing).
+    index : sequence of str
+        Columns to index after loading, e.g. ``["id"]``.
+    batch_size : int
+        Rows per transaction.
+    replace : bool
+        Drop the table first instead of appending to it.
+    """
+
+    def __init__(self, path, table: str, index: Sequence[str] = (),
+                 batch_size: int = 5000, replace: bool = False):
+        self.table = table
+        self._quoted = quote_identifier(table)
+        self.index = list(index)
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self.connection = sqlite3.connect(path)
+        # Safe for a local cache that can be rebuilt by crawling again.
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        if replace:
+            self.connection.execute(f"DROP TABLE IF EXISTS {self._quoted}")
+        self.columns: list[str] = [
+            row[1] for row in self.connection.execute(f"PRAGMA table_info({self._quoted})")]
+        self._pending: list[tuple] = []
+        self._insert: str | None = None
+
+    def __enter__(self) -> "SQLiteSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _ensure_columns(self, records: Sequence[Mapping[str, Any]]):
+        known = set(self.columns)
+        new: dict[str, str] = {}
+        for record in records:
+            for name, value in record.items():
+                if name not in known and (name not in new or new[name] is None):
+                    new[name] = None if value is None else infer_type(value)
+        if not new:
+            return
+        self.flush()
+        if not self.columns:
+            definitions = ", ".join(f"{quote_identifier(name)} {_SQL_TYPES[kind or 'str']}"
+                                    for name, kind in new.items())
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {self._quoted} ({definitions})")
+        else:
+            for name, kind in new.items():
+                self.connection.execute(f"ALTER TABLE {self._quoted} ADD COLUMN "
+                                        f"{quote_identifier(name)} {_SQL_TYPES[kind or 'str']}")
+        self.columns.extend(new)
+        self._insert = None
+
+    def write_records(self, records: Iterable[Mapping[str, Any]]):
+        """Append records (dicts), e.g. one page of ``["records"]``."""
+        records = list(records)
+        if not records:
+            return
+        self._ensure_columns(records)
+        if self._insert is None:
+            # One statement text for every batch, so sqlite3 prepares it once.
+            names = ", ".join(quote_identifier(name) for name in self.columns)
+            marks = ", ".join("?" * len(self.columns))
+            self._insert = f"INSERT INTO {self._quoted} ({names}) VALUES ({marks})"
+        columns = self.columns
+        self._pending.extend(tuple(_sql_value(record.get(name)) for name in columns)
+                             for record in records)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def write_columns(self, columns: Mapping[str, Sequence[Any]]):
+        """Append a dict of equal-length lists (like ``all_event_values``)."""
+        names = list(columns)
+        self.write_records(dict(zip(names, row)) for row in zip(*columns.values()))
+
+    def write_frame(self, frame):
+        """Append the rows of a pandas ``DataFrame``."""
+        self.write_records(frame.to_dict("records"))
+
+    def flush(self):
+        """Insert pending rows in one transaction."""
+        if not self._pending:
+            return
+        with self.connection:
+            self.connection.executemany(self._insert, self._pending)
+        self.rows_written += len(self._pending)
+        self._pending = []
+
+    def close(self):
+        """Flush, create the indexes and close the database."""
+        self.flush()
+        for column in self.index:
+            if column in self.columns:
+                name = f"idx_{self.table}_{column}"
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS {quote_identifier(name)} "
+                                        f"ON {self._quoted} ({quote_identifier(column)})")
+        self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,254 @@
+"""Pick fields out of HTML while it is parsed, without keeping the tree.
+
+The calendar example parses the whole page with ``html.fromstring``,
+finds the events with XPath and calls ``text_content()`` for each field
+in ``elements_we_want``. :class:`StreamSelector` takes the same container
+path and field map, but feeds the page to an incremental parser: as soon
+as a container element is complete its fields are read and it is thrown
+away, and so is every other element once it ends, unless it is inside a
+container. What stays in memory is the open elements (the current one and
+its ancestors), one emptied element per open level, and the container
+being read. The expensive ``//`` search over the whole document is
+replaced by a check of each element's ancestors when it starts::
+
+    selector = StreamSelector('//*[@id="events_list"]/article', elements_we_want)
+    all_event_values = selector.from_response(events)     # list of dicts
+    pd.DataFrame(all_event_values)
+
+Each record holds the stripped text of the first match of every field,
+or ``""`` when there is none, like ``get_event_info``. Records can also be
+taken one at a time from a streamed response with
+:meth:`StreamSelector.iter_records`.
+
+Field paths can be any XPath relative to the container (a path ending
+in ``@attr`` gives the attribute value) that stays inside it: elements
+before the container have already been freed. The container path must use a
+subset of XPath: steps separated by ``/`` or ``//``, each a tag name or
+``*`` with optional predicates ``[n]``, ``[@attr]`` and
+``[@attr="value"]`` (the value may contain ``/`` and ``]``); anything
+else raises ``ValueError``.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, Iterator, Mapping, NamedTuple
+
+from lxml import etree
+
+from dsstools.scrape.content import declared_encoding, lxml_encoding
+
+_STEP = re.compile(r"""
+    (?P<name>\*|[A-Za-z_][\w.-]*)
+    (?P<predicates>(?:\[.*\])?)$
+""", re.X | re.S)
+_PREDICATE = re.compile(r"""\[\s*(?:
+    (?P<position>\d+)
+  | @(?P<attr>[\w:.-]+)\s*(?:=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'))?
+)\s*\]""", re.X)
+
+
+class _Step(NamedTuple):
+    descendant: bool  # reached with "//" rather than "/"
+    name: str         # tag name or "*"
+    position: int     # 1-based position among the siblings it names, 0 for any
+    attrs: tuple[tuple[str, str | None], ...]  # (name, value or None for "exists")
+
+
+def _split_steps(path: str) -> list[str]:
+    """``path`` split into steps and ``/``/``//`` separators.
+
+    Only slashes outside predicates and quoted strings separate steps, so
+    ``a[@href="/x"]`` is one step.
+    """
+    parts, start, depth, quote, i = [], 0, 0, None, 0
+    while i < len(path):
+        char = path[i]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif char == "/" and depth == 0:
+            separator = "//" if path.startswith("//", i) else "/"
+            parts += [path[start:i], separator]
+            i += len(separator)
+            start = i
+            continue
+        i += 1
+    if quote or depth:
+        raise ValueError(f"unbalanced quote or bracket in {path!r}")
+    parts.append(path[start:])
+    return parts
+
+
+def _parse_path(path: str) -> tuple[_Step, ...]:
+    text = path.strip()
+    if not text.startswith("/"):
+        text = "//" + text  # a bare path matches anywhere
+    parts = _split_steps(text)
+    steps = []
+    descendant = False
+    for part in parts:
+        if part in ("/", "//"):
+            descendant = part == "//"
+            continue
+        if not part:
+            continue
+        match = _STEP.match(part)
+        if match is None:
+            raise ValueError(f"unsupported path step {part!r} in {path!r}")
+        position, attrs = 0, []
+        predicates = match.group("predicates")
+        consumed = 0
+        for predicate in _PREDICATE.finditer(predicates):
+            if predicate.start() != consumed:
+                break
+            consumed = predicate.end()
+            if predicate.group("position"):
+                position = int(predicate.group("position"))
+            else:
+                value = predicate.group("dq")
+                if value is None:
+                    value = predicate.group("sq")
+                attrs.append((predicate.group("attr"), value))
+        if consumed != len(predicates):
+            raise ValueError(f"unsupported predicate in {part!r} of {path!r}")
+        steps.append(_Step(descendant, match.group("name").lower(), position, tuple(attrs)))
+        descendant = False
+    if not steps:
+        raise ValueError(f"empty path {path!r}")
+    return tuple(steps)
+
+
+class _Frame(NamedTuple):
+    tag: str
+    attrs: Mapping[str, str]
+    position: int  # among siblings with the same tag
+    index: int     # among all element siblings (for "*[n]")
+
+
+def _step_matches(step: _Step, frame: _Frame) -> bool:
+    if step.name != "*" and step.name != frame.tag:
+        return False
+    if step.position and step.position != (frame.index if step.name == "*" else frame.position):
+        return False
+    for name, value in step.attrs:
+        actual = frame.attrs.get(name)
+        if actual is None or (value is not None and actual != value):
+            return False
+    return True
+
+
+def _matches(steps: tuple[_Step, ...], frames: list[_Frame]) -> bool:
+    """Whether ``steps`` select ``frames[-1]``; ``frames`` run from the root."""
+
+    def match(i: int, j: int) -> bool:
+        step = steps[i]
+        if not _step_matches(step, frames[j]):
+            return False
+        if i == 0:
+            return step.descendant or j == 0
+        if step.descendant:
+            return any(match(i - 1, k) for k in range(j - 1, -1, -1))
+        return j > 0 and match(i - 1, j - 1)
+
+    return match(len(steps) - 1, len(frames) - 1)
+
+
+class StreamSelector:
+    """Extract one record per container from HTML as it is parsed.
+
+    Parameters
+    ----------
+    container : str
+        Path of the repeated element, e.g. ``'//*[@id="events_list"]/article'``.
+        A path not starting with ``/`` matches anywhere in the document.
+    fields : mapping of name to XPath
+        Paths relative to the container, like ``elements_we_want``.
+    default : str
+        Value for fields that are not found.
+    """
+
+    def __init__(self, container: str, fields: Mapping[str, str], default: str = ""):
+        self._container = _parse_path(container)
+        self.fields = dict(fields)
+        self._fields = {name: etree.XPath(path) for name, path in self.fields.items()}
+        self.default = default
+
+    def _record(self, element) -> dict[str, str]:
+        record = {}
+        for name, xpath in self._fields.items():
+            found = xpath(element)
+            if isinstance(found, list):
+                found = found[0] if found else None
+            if found is None:
+                record[name] = self.default
+            elif isinstance(found, etree._Element):
+                record[name] = etree.tostring(found, method="text", encoding="unicode",
+                                              with_tail=False).strip()
+            else:
+                record[name] = str(found).strip()
+        return record
+
+    def _events(self, parser, state: dict) -> Iterator[dict[str, str]]:
+        seen, frames, matched = state["seen"], state["frames"], state["matched"]
+        for event, element in parser.read_events():
+            if event == "start":
+                tag = element.tag.lower() if isinstance(element.tag, str) else ""
+                # Earlier siblings may be freed already, so they are counted
+                # as they start; the ancestors' frames are on the stack.
+                counts = seen.setdefault(element.getparent(), {"*": 0})
+                counts[tag] = counts.get(tag, 0) + 1
+                counts["*"] += 1
+                frames.append(_Frame(tag, dict(element.attrib), counts[tag], counts["*"]))
+                is_container = _matches(self._container, frames)
+                matched.append(is_container)
+                state["inside"] += is_container
+                continue
+            frames.pop()
+            seen.pop(element, None)
+            if matched.pop():
+                state["inside"] -= 1
+                yield self._record(element)
+            if state["inside"]:
+                continue  # part of a container that is still open
+            # Free the element and everything before it at its level. The
+            # element itself stays (empty) while the parser may still use it.
+            element.clear(keep_tail=False)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    def iter_records(self, chunks: Iterable[bytes | memoryview | str],
+                     encoding: str | None = None) -> Iterator[dict[str, str]]:
+        """Yield records as each container ends in the streamed input.
+
+        ``encoding`` is the declared charset of byte chunks (see
+        :func:`~dsstools.scrape.content.declared_encoding`); without it the
+        parser detects the encoding.
+        """
+        parser = etree.HTMLPullParser(events=("start", "end"), encoding=lxml_encoding(encoding),
+                                      remove_comments=True, remove_pis=True)
+        state = {"seen": {}, "frames": [], "matched": [], "inside": 0}
+        for chunk in chunks:
+            if chunk:
+                # The pull parser only takes bytes and str.
+                parser.feed(chunk.tobytes() if isinstance(chunk, memoryview) else chunk)
+                yield from self._events(parser, state)
+        parser.close()
+        yield from self._events(parser, state)
+
+    def extract(self, data: bytes | memoryview | str,
+                encoding: str | None = None) -> list[dict[str, str]]:
+        """Records from a whole page (``response.content`` or ``.text``)."""
+        return list(self.iter_records((data,), encoding))
+
+    def from_response(self, response) -> list[dict[str, str]]:
+        """Records from a response's bytes, in its declared charset."""
+        return self.extract(response.content, declared_encoding(response))
@@ -0,0 +1,158 @@
+"""The PythonWebScrape examples as functions and a command-line entry point.
+
+Each step of the workshop is one function that fetches and extracts its
+data and returns plain Python lists and dicts::
+
+    collections(pages=5)      # records from browse?offset=...&load_amount=10
+    exhibitions(pages=5)      # records from search/load_more?type=past-exhibition
+    events()                  # one dict of elements_we_want per calendar event
+    floor_plan()              # facility rows with their level
+
+and the same from a shell, writing CSV or JSON (by the file suffix)::
+
+    python -m dsstools.scrape.workflow collections --pages 5 --out records_final.csv
+    python -m dsstools.scrape.workflow events --out all_event_values.json
+
+Only what a step needs is imported, and only when it runs: ``requests``
+for every step, and lxml for ``events`` and ``floor-plan``. pandas is
+never imported. A JSON step starts without loading an HTML parser, and
+``--help`` returns at once. Pages are parsed from the response bytes in
+their declared charset, never through ``response.text``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from typing import Any, Iterable, Mapping
+
+from dsstools.scrape import fastjson
+
+MUSEUM_DOMAIN = "https://www.harvardartmuseums.org"
+COLLECTION_URL = MUSEUM_DOMAIN + "/browse"
+EXHIBIT_URL = MUSEUM_DOMAIN + "/search/load_more"
+CALENDAR_URL = MUSEUM_DOMAIN + "/calendar"
+FLOOR_PLAN_URL = MUSEUM_DOMAIN + "/visit/floor-plan"
+
+EVENTS_CONTAINER = '//*[@id="events_list"]/article'
+EVENT_FIELDS = {
+    "figcaption": "div/figure/div/figcaption",
+    "date": "div/div/header/time",
+    "title": "div/div/header/h2/a",
+    "time": "div/div/div/p[1]/time",
+    "description": "div/div/div/p[3]",
+}
+FLOOR_PLAN_LEVELS = "/html/body/main/section/ul/li"
+FLOOR_PLAN_FACILITIES = "div[2]/ul/li"
+
+
+def _session(session=None):
+    if session is None:
+        import requests
+        session = requests.Session()
+    return session
+
+
+def _get(session, url: str, params: Mapping[str, Any] | None = None, timeout: float = 30):
+    response = session.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
+def collections(pages: int = 5, load_amount: int = 10, session=None,
+                timeout: float = 30) -> list[dict]:
+    """Records from the first ``pages`` pages of the collection (``records_final``)."""
+    session = _session(session)
+    records: list[dict] = []
+    for offset in range(0, pages * load_amount, load_amount):
+        response = _get(session, COLLECTION_URL, {"load_amount": load_amount, "offset": offset},
+                        timeout)
+        records.extend(fastjson.from_response(response, ("records",)))
+    return records
+
+
+def exhibitions(pages: int = 5, type: str = "past-exhibition", session=None,
+                timeout: float = 30) -> list[dict]:
+    """Records from the first ``pages`` pages of exhibitions (``first5Pages``)."""
+    session = _session(session)
+    records: list[dict] = []
+    for page in range(1, pages + 1):
+        response = _get(session, EXHIBIT_URL, {"type": type, "page": page}, timeout)
+        records.extend(fastjson.from_response(response, ("records",)))
+    return records
+
+
+def events(session=None, timeout: float = 30) -> list[dict]:
+    """The ``elements_we_want`` of every calendar event (``all_event_values``)."""
+    from dsstools.scrape.stream import StreamSelector
+
+    response = _get(_session(session), CALENDAR_URL, timeout=timeout)
+    return StreamSelector(EVENTS_CONTAINER, EVENT_FIELDS).from_response(response)
+
+
+def floor_plan(session=None, timeout: float = 30) -> list[dict]:
+    """One row per facility with its level (``all_levels_facilities``, flattened)."""
+    from dsstools.scrape.content import html_tree
+    from dsstools.scrape.extract import TableExtractor
+
+    response = _get(_session(session), FLOOR_PLAN_URL, timeout=timeout)
+    extractor = TableExtractor(FLOOR_PLAN_LEVELS, FLOOR_PLAN_FACILITIES,
+                               cells={"facility": "."}, container_cells={"level": "div[1]"})
+    columns = extractor.extract(html_tree(response))
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def write_records(records: Iterable[Mapping[str, Any]], out=None) -> None:
+    """Write records as CSV, or as JSON if ``out`` ends in ``.json``; stdout by default."""
+    records = list(records)
+    if out is not None and str(out).endswith(".json"):
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False, indent=1)
+        return
+    fields: dict[str, None] = {}
+    for record in records:
+        fields.update(dict.fromkeys(record))
+    f = open(out, "w", newline="", encoding="utf-8") if out is not None else sys.stdout
+    try:
+        writer = csv.DictWriter(f, fieldnames=list(fields))
+        writer.writeheader()
+        for record in records:
+            writer.writerow({key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                             for key, value in record.items()})
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    # Options every step takes, after the step name.
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--out", help="output file, .csv or .json (default: CSV on stdout)")
+    common.add_argument("--timeout", type=float, default=30, help="seconds per request")
+    parser = argparse.ArgumentParser(description="Run a PythonWebScrape example.")
+    steps = parser.add_subparsers(dest="step", required=True)
+    step = steps.add_parser("collections", parents=[common], help="collection records")
+    step.add_argument("--pages", type=int, default=5)
+    step.add_argument("--load-amount", type=int, default=10)
+    step = steps.add_parser("exhibitions", parents=[common], help="exhibition records")
+    step.add_argument("--pages", type=int, default=5)
+    step.add_argument("--type", default="past-exhibition")
+    steps.add_parser("events", parents=[common], help="calendar events")
+    steps.add_parser("floor-plan", parents=[common], help="facilities per level")
+    args = parser.parse_args(argv)
+
+    if args.step == "collections":
+        records = collections(args.pages, args.load_amount, timeout=args.timeout)
+    elif args.step == "exhibitions":
+        records = exhibitions(args.pages, args.type, timeout=args.timeout)
+    elif args.step == "events":
+        records = events(timeout=args.timeout)
+    else:
+        records = floor_plan(timeout=args.timeout)
+    write_records(records, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Text analysis for the PythonIntro workflow.
+
+Names are imported from their submodules on first use, so
+``import dsstools.text`` is instant and NumPy is only loaded when a
+class that needs it is used.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from dsstools.text.compressed import open_text
+    from dsstools.text.cooccur import Cooccurrence, NameMatcher, cooccurrence
+    from dsstools.text.corpus import Corpus
+    from dsstools.text.kwic import Concordance, Hit, Page
+    from dsstools.text.prefilter import ParagraphFilter
+    from dsstools.text.profile import Profiler, StageStats
+    from dsstools.text.tokenize import Tokenizer, Tokens, Vocabulary
+
+# Public names and the submodules that define them.
+_EXPORTS = {
+    "Concordance": ".kwic",
+    "Cooccurrence": ".cooccur",
+    "Corpus": ".corpus",
+    "Hit": ".kwic",
+    "NameMatcher": ".cooccur",
+    "Page": ".kwic",
+    "ParagraphFilter": ".prefilter",
+    "Profiler": ".profile",
+    "StageStats": ".profile",
+    "Tokenizer": ".tokenize",
+    "Tokens": ".tokenize",
+    "Vocabulary": ".tokenize",
+    "cooccurrence": ".cooccur",
+    "open_text": ".compressed",
+}
+
+__all__ = [
+    "Concordance",
+    "Cooccurrence",
+    "Corpus",
+    "Hit",
+    "NameMatcher",
+    "Page",
+    "ParagraphFilter",
+    "Profiler",
+    "StageStats",
+    "Tokenizer",
+    "Tokens",
+    "Vocabulary",
+    "cooccurrence",
+    "open_text",
+]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
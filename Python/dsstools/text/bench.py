@@ -0,0 +1,410 @@
+"""Benchmark the intro's text operations on corpora of growing size.
+
+The intro works on a 148 KB book. To see how its operations scale, this
+module builds larger corpora by repeating the chapters of
+``Alice_in_wonderland.txt`` and times each operation both the way the
+intro does it and with the array-based engines of :mod:`dsstools.text`:
+
+=================  ===========================  ==============================
+operation          intro                        engine
+=================  ===========================  ==============================
+read               ``open().read()``
+split words        ``alice_txt.split()``        :meth:`Tokenizer.tokenize`
+unique words       ``set(alice_words)``         :meth:`Tokens.unique_count`
+split chapters     ``split("CHAPTER ")``        :func:`~.corpus.split_starts`
+count characters   ``alice_txt.count(name)``    :class:`~.cooccur.NameMatcher`
+Alice per chapter  ``chapter.count("Alice")``   :class:`Corpus` + ``bincount``
+numpy stats        ``numpy.mean``/``std``
+=================  ===========================  ==============================
+
+The two columns do comparable, not identical, work: the engines match
+normalized whole words, the intro matches exact substrings. For each
+run the time (best of ``--repeat``), throughput in MB/s and tokens/s and
+the peak memory traced during one extra run are reported. Engines that
+work on a :class:`Corpus` are timed once it is built; building it costs
+about as much as the Tokenizer row. Results can be saved as JSON and
+compared with an earlier result::
+
+    python -m dsstools.text.bench --sizes 100K 10M 1G --out bench.json
+    python -m dsstools.text.bench --sizes 100K 10M 1G --compare bench.json
+
+Before that, the time to import each entry point and the libraries it
+may load (``IMPORT_MODULES``) is measured in a fresh interpreter, so
+start-up regressions show up too. Comparing prints the change for every
+import and operation and exits with status 1
+if any got slower by more than ``--threshold``. The generated corpora are
+kept in ``--data-dir`` and reused. The vocabulary of a repeated book
+does not grow, so ``set()`` and the vocabulary see fewer new words than
+in a real corpus of the same size. At several GB the intro's word lists
+need several times the text size in memory; use ``--ops`` to run only
+some operations.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from dsstools.text.cooccur import NameMatcher
+from dsstools.text.corpus import Corpus, split_starts
+from dsstools.text.tokenize import Tokenizer
+
+INTRO_DIR = Path(__file__).resolve().parents[2] / "PythonIntro"
+DEFAULT_SIZES = ("100K", "1M", "10M", "100M")
+# Entry points and the heavy libraries they may pull in.
+IMPORT_MODULES = ("dsstools.text", "dsstools.text.workflow", "dsstools.scrape",
+                  "dsstools.scrape.workflow", "numpy", "lxml.html", "requests", "pandas")
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(text: str) -> int:
+    """Bytes in a size such as ``"100K"``, ``"2.5G"`` or ``"4096"``."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*", text.upper())
+    if match is None:
+        raise ValueError(f"not a size: {text!r}")
+    return int(float(match.group(1)) * _UNITS[match.group(2)])
+
+
+def format_size(size: int) -> str:
+    for unit in ("G", "M", "K"):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return str(size)
+
+
+def synthesize(size: int, data_dir, source=INTRO_DIR / "Alice_in_wonderland.txt") -> Path:
+    """Write a corpus of about ``size`` bytes built from ``source``'s chapters.
+
+    The front matter is written once, then the chapters are repeated in
+    order until the size is reached, so the text keeps the intro's
+    ``"CHAPTER "`` and ``"\\n\\n"`` structure. The number of words is saved
+    next to the corpus in a ``.json`` file. Existing corpora are reused.
+    """
+    data_dir = Path(data_dir)
+    path = data_dir / f"{Path(source).stem}-{format_size(size)}.txt"
+    meta_path = path.with_suffix(".json")
+    if path.exists() and meta_path.exists():
+        return path
+    data_dir.mkdir(parents=True, exist_ok=True)
+    with open(source, encoding="utf-8-sig") as f:
+        front, *chapters = f.read().split("CHAPTER ")
+    pieces = [front] + ["CHAPTER " + chapter for chapter in chapters]
+    encoded = [piece.encode("utf-8") for piece in pieces]
+    words = [len(piece.split()) for piece in pieces]
+    written = n_words = 0
+    i = 0
+    with open(path, "wb") as out:
+        while written < size:
+            out.write(encoded[i])
+            written += len(encoded[i])
+            n_words += words[i]
+            i = i + 1 if i + 1 < len(pieces) else 1  # the front matter only once
+    meta_path.write_text(json.dumps({"bytes": written, "words": n_words}))
+    return path
+
+
+class _Inputs:
+    """Inputs of the benchmarks for one corpus, built when first needed."""
+
+    def __init__(self, path: Path, characters: list[str]):
+        self.path = path
+        self.characters = characters
+        meta = json.loads(path.with_suffix(".json").read_text())
+        self.bytes = meta["bytes"]
+        self.words = meta["words"]
+        self._cache: dict[str, object] = {}
+
+    def get(self, name: str):
+        if name not in self._cache:
+            self._cache[name] = getattr(self, "_make_" + name.replace(" ", "_"))()
+        return self._cache[name]
+
+    def release(self, keep) -> None:
+        """Drop the inputs not in ``keep``, so large corpora fit in memory."""
+        for name in set(self._cache) - set(keep):
+            del self._cache[name]
+        gc.collect()
+
+    def _make_text(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def _make_word_list(self):
+        return self.get("text").split()
+
+    def _make_chapters(self):
+        return self.get("text").split("CHAPTER ")
+
+    def _make_corpus(self):
+        return Corpus(self.get("text"))
+
+    def _make_chapter_alice(self):
+        return [chapter.count("Alice") for chapter in self.get("chapters")[1:]]
+
+
+class Case(NamedTuple):
+    op: str
+    engine: str             # "intro" or the name of the faster engine
+    needs: tuple[str, ...]  # inputs, built before timing starts
+    run: Callable[[_Inputs], object]
+
+
+def _read(inputs):
+    with open(inputs.path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _count_characters(inputs):
+    text = inputs.get("text")
+    return [text.count(character) for character in inputs.characters]
+
+
+def _match_characters(inputs):
+    corpus = inputs.get("corpus")
+    terms, _ = NameMatcher(inputs.characters, corpus.tokenizer).mentions(corpus.tokens)
+    return np.bincount(terms)
+
+
+def _alice_per_chapter(inputs):
+    corpus = inputs.get("corpus")
+    found = corpus.tokens.find("Alice")
+    return np.bincount(corpus.token_chapter[found], minlength=corpus.n_chapters)[1:]
+
+
+def _stats(inputs):
+    values = inputs.get("chapter_alice")
+    return np.mean(values), np.std(values)
+
+
+CASES = (
+    Case("read", "intro", (), _read),
+    Case("split words", "intro", ("text",), lambda i: i.get("text").split()),
+    Case("split words", "Tokenizer", ("text",), lambda i: Tokenizer().tokenize(i.get("text"))),
+    Case("unique words", "intro", ("word_list",), lambda i: len(set(i.get("word_list")))),
+    Case("unique words", "Tokens", ("corpus",), lambda i: i.get("corpus").tokens.unique_count()),
+    Case("split chapters", "intro", ("text",), lambda i: i.get("text").split("CHAPTER ")),
+    Case("split chapters", "split_starts", ("text",),
+         lambda i: split_starts(i.get("text"), "CHAPTER ")),
+    Case("count characters", "intro", ("text",), _count_characters),
+    Case("count characters", "NameMatcher", ("corpus",), _match_characters),
+    Case("Alice per chapter", "intro", ("chapters",),
+         lambda i: [chapter.count("Alice") for chapter in i.get("chapters")[1:]]),
+    Case("Alice per chapter", "Corpus", ("corpus",), _alice_per_chapter),
+    Case("numpy stats", "intro", ("chapter_alice",), _stats),
+)
+
+
+def _time(case: Case, inputs: _Inputs, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = case.run(inputs)
+        best = min(best, time.perf_counter() - start)
+        del result
+    return best
+
+
+def _peak(case: Case, inputs: _Inputs) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = case.run(inputs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def import_time(module: str, repeat: int = 3) -> float | None:
+    """Seconds to import ``module`` in a fresh interpreter (best of ``repeat``).
+
+    This is what a command-line run pays before doing any work. Returns
+    None if the module cannot be imported.
+    """
+    code = ("import time; start = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - start)")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(INTRO_DIR.parent),
+                                                      env.get("PYTHONPATH")]))
+    best = None
+    for _ in range(repeat):
+        done = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                              env=env)
+        if done.returncode != 0:
+            return None
+        seconds = float(done.stdout.strip())
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def run_imports(modules=IMPORT_MODULES, repeat: int = 3, log=print) -> dict[str, float | None]:
+    """:func:`import_time` of each module."""
+    times = {}
+    for module in modules:
+        times[module] = import_time(module, repeat)
+        seconds = times[module]
+        log(f"import {module:<29} " + (f"{seconds * 1000:>9.1f} ms" if seconds is not None
+                                        else f"{'not installed':>12}"))
+    return times
+
+
+def run_benchmarks(sizes, data_dir, ops=None, repeat: int = 3, memory: bool = True,
+                   characters_path=INTRO_DIR / "Characters.txt", log=print) -> dict:
+    """Run :data:`CASES` (or those in ``ops``) on a corpus of each size."""
+    with open(characters_path, encoding="utf-8-sig") as f:
+        characters = f.read().splitlines()
+    cases = [case for case in CASES if ops is None or case.op in ops]
+    results = []
+    for size in sizes:
+        label = format_size(size)
+        inputs = _Inputs(synthesize(size, data_dir), characters)
+        for n, case in enumerate(cases):
+            inputs.release({"text"}.union(*(later.needs for later in cases[n:])))
+            for name in case.needs:
+                inputs.get(name)
+            seconds = _time(case, inputs, repeat)
+            peak = _peak(case, inputs) if memory else None
+            row = {
+                "label": label,
+                "size": inputs.bytes,
+                "op": case.op,
+                "engine": case.engine,
+                "seconds": seconds,
+                "mb_per_s": inputs.bytes / 1e6 / seconds if seconds else None,
+                "tokens_per_s": inputs.words / seconds if seconds else None,
+                "peak_mb": peak / 1e6 if peak is not None else None,
+            }
+            results.append(row)
+            log(_format_row(row))
+        del inputs
+        gc.collect()
+    return {"meta": _meta(repeat), "results": results}
+
+
+def _meta(repeat: int) -> dict:
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "repeat": repeat,
+    }
+
+
+HEADER = (f"{'size':>7} {'operation':<18} {'engine':<13} {'seconds':>9} "
+          f"{'MB/s':>9} {'Mtok/s':>8} {'peak MB':>9}")
+
+
+def _format_row(row: dict) -> str:
+    def number(value, scale, width, digits):
+        return f"{value / scale:>{width}.{digits}f}" if value is not None else f"{'-':>{width}}"
+    return (f"{row['label']:>7} {row['op']:<18} {row['engine']:<13} {row['seconds']:>9.4f} "
+            f"{number(row['mb_per_s'], 1, 9, 1)} {number(row['tokens_per_s'], 1e6, 8, 2)} "
+            f"{number(row['peak_mb'], 1, 9, 1)}")
+
+
+def compare(new: dict, old: dict, threshold: float = 0.2) -> tuple[list[str], int]:
+    """Lines comparing two results, and how many runs got slower than ``threshold``.
+
+    Runs are matched by corpus size, operation and engine; a run is slower
+    if it took more than ``1 + threshold`` times as long as before.
+    """
+    before = {(r["size"], r["op"], r["engine"]): r for r in old.get("results", [])}
+    lines, regressions = [], 0
+    old_imports = old.get("imports", {})
+    for module, seconds in new.get("imports", {}).items():
+        previous = old_imports.get(module)
+        if not seconds or not previous:
+            continue
+        ratio = seconds / previous
+        flag = ""
+        # A few milliseconds either way is noise.
+        if ratio > 1 + threshold and seconds - previous > 0.005:
+            flag = "  SLOWER"
+            regressions += 1
+        elif ratio < 1 / (1 + threshold) and previous - seconds > 0.005:
+            flag = "  faster"
+        lines.append(f"import {module:<29} {previous:>9.4f} -> {seconds:>9.4f} "
+                     f"({ratio:.2f}x){flag}")
+    for row in new.get("results", []):
+        previous = before.get((row["size"], row["op"], row["engine"]))
+        if previous is None or not previous["seconds"]:
+            continue
+        ratio = row["seconds"] / previous["seconds"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif ratio < 1 / (1 + threshold):
+            flag = "  faster"
+        lines.append(f"{row['label']:>7} {row['op']:<18} {row['engine']:<13} "
+                     f"{previous['seconds']:>9.4f} -> {row['seconds']:>9.4f} "
+                     f"({ratio:.2f}x){flag}")
+    return lines, regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the intro's text operations.")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES),
+                        help="corpus sizes such as 100K 10M 2G (default: %(default)s)")
+    parser.add_argument("--ops", nargs="+", choices=sorted({case.op for case in CASES}),
+                        metavar="OP", help="only these operations")
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run")
+    parser.add_argument("--data-dir", default=Path(tempfile.gettempdir()) / "dsstools-bench",
+                        help="where generated corpora are kept (default: %(default)s)")
+    parser.add_argument("--imports", nargs="*", metavar="MODULE",
+                        help="time importing these modules (default: %s)"
+                        % " ".join(IMPORT_MODULES))
+    parser.add_argument("--no-imports", action="store_true", help="skip the import times")
+    parser.add_argument("--imports-only", action="store_true",
+                        help="only time imports, not the operations")
+    parser.add_argument("--out", help="save the results as JSON")
+    parser.add_argument("--compare", metavar="JSON", help="compare with earlier results")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slow-down reported as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results: dict = {"meta": _meta(args.repeat)}
+    if not args.no_imports:
+        results["imports"] = run_imports(args.imports or IMPORT_MODULES, args.repeat)
+        print()
+    if not args.imports_only:
+        print(HEADER)
+        print("-" * len(HEADER))
+        results.update(run_benchmarks([parse_size(size) for size in args.sizes], args.data_dir,
+                                      ops=args.ops, repeat=args.repeat,
+                                      memory=not args.no_memory))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            lines, regressions = compare(results, json.load(f), args.threshold)
+        print()
+        print("\n".join(lines))
+        if regressions:
+            print(f"{regressions} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""Read compressed text files as streams.
+
+The intro reads its book with ``open("Alice_in_wonderland.txt").read()``.
+:func:`open_text` does the same for ``.gz``, ``.bz2``, ``.xz`` and
+``.zst`` files (recognized by their first bytes, so the suffix does not
+matter), decompressing in a background thread while the caller decodes,
+splits and counts. Nothing is written to disk::
+
+    with open_text("corpus.txt.zst") as f:
+        alice_txt = f.read()
+    corpus = Corpus.from_file("corpus.txt.xz")   # uses open_text
+
+    with open_text("corpus.txt.gz") as f:        # or line by line
+        for line in f:
+            ...
+
+The zlib, bz2 and lzma decompressors release the GIL, so decompression
+runs alongside the caller's Python code. Files made of several
+independent frames (from ``pzstd``, or pieces compressed separately and
+concatenated) are decompressed in parallel, one frame per thread; other files are
+decompressed in order. Concatenated members (``cat a.gz b.gz``) are read
+like ``gzip`` does. Zstandard needs the optional ``zstandard`` package
+(``pip install zstandard``).
+"""
+
+from __future__ import annotations
+
+import bz2
+import io
+import lzma
+import os
+import queue
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+CHUNK_SIZE = 1 << 20
+
+_MAGIC = {
+    "gz": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zst": b"\x28\xb5\x2f\xfd",
+}
+_ZSTD_SKIPPABLE = range(0x184D2A50, 0x184D2A60)
+
+
+def detect_compression(path) -> str | None:
+    """``"gz"``, ``"bz2"``, ``"xz"`` or ``"zst"`` from the file's first bytes, else None."""
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for kind, magic in _MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    if len(head) >= 4 and struct.unpack("<I", head[:4])[0] in _ZSTD_SKIPPABLE:
+        return "zst"  # pzstd starts with a skippable frame
+    return None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("reading .zst files needs the zstandard package "
+                          "(pip install zstandard)") from None
+    return zstandard
+
+
+def _decompressor_factory(kind: str) -> Callable:
+    if kind == "gz":
+        return lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if kind == "bz2":
+        return bz2.BZ2Decompressor
+    if kind == "xz":
+        return lzma.LZMADecompressor
+    if kind == "zst":
+        zstandard = _zstandard()
+        # A ZstdDecompressor must not be shared between threads.
+        return lambda: zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"unknown compression {kind!r}")
+
+
+def _decompress_stream(chunks: Iterator[bytes], new: Callable) -> Iterator[bytes]:
+    """Decompress ``chunks``, starting over after each complete member."""
+    decompressor = new()
+    started = False
+    for data in chunks:
+        while data:
+            started = True
+            out = decompressor.decompress(data)
+            if out:
+                yield out
+            if decompressor.eof:
+                data = decompressor.unused_data
+                decompressor = new()
+                started = False
+                if not data.strip(b"\x00"):  # trailing padding
+                    data = b""
+            else:
+                data = b""
+    if started and not decompressor.eof:
+        raise EOFError("compressed file ended before the end-of-stream marker was reached")
+
+
+def zstd_frames(f) -> Iterator[tuple[int, int]]:
+    """``(offset, size)`` of each data frame in a zstandard file, from its headers.
+
+    Only the 3-byte block headers are read, so this is cheap even for
+    large files. Skippable frames are left out.
+    """
+    end = f.seek(0, io.SEEK_END)
+    offset = 0
+    while offset < end:
+        f.seek(offset)
+        header = f.read(14)
+        magic = struct.unpack("<I", header[:4])[0]
+        if magic in _ZSTD_SKIPPABLE:
+            offset += 8 + struct.unpack("<I", header[4:8])[0]
+            continue
+        if header[:4] != _MAGIC["zst"]:
+            raise ValueError(f"not a zstandard frame at byte {offset}")
+        descriptor = header[4]
+        single_segment = descriptor >> 5 & 1
+        size_bytes = (1 if single_segment else 0, 2, 4, 8)[descriptor >> 6]
+        position = (offset + 5 + (0 if single_segment else 1)
+                    + (0, 1, 2, 4)[descriptor & 3] + size_bytes)
+        while True:
+            f.seek(position)
+            block = f.read(3)
+            if len(block) < 3:
+                raise EOFError(f"zstandard frame at byte {offset} is truncated")
+            value = int.from_bytes(block, "little")
+            kind = value >> 1 & 3
+            if kind == 3:
+                raise ValueError(f"invalid zstandard block at byte {position}")
+            position += 3 + (1 if kind == 1 else value >> 3)
+            if value & 1:  # last block
+                break
+        if descriptor >> 2 & 1:  # content checksum
+            position += 4
+        yield offset, position - offset
+        offset = position
+
+
+class DecompressingReader(io.RawIOBase):
+    """Binary stream of a compressed file, decompressed in a background thread.
+
+    Usually wrapped by :func:`open_text`. ``threads`` limits the threads
+    used for multi-frame zstandard files; ``buffers`` is how many
+    decompressed chunks may wait to be read.
+    """
+
+    def __init__(self, path, kind: str | None = None, threads: int | None = None,
+                 chunk_size: int = CHUNK_SIZE, buffers: int = 8):
+        super().__init__()
+        self.name = os.fspath(path)
+        self.kind = kind or detect_compression(path)
+        if self.kind is None:
+            raise ValueError(f"{self.name} is not a compressed file")
+        self.threads = threads or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._new = _decompressor_factory(self.kind)
+        self._file = open(path, "rb")
+        self._queue: queue.Queue = queue.Queue(buffers)
+        self._stop = threading.Event()
+        self._current = memoryview(b"")
+        self._done = False
+        self._thread = threading.Thread(target=self._produce, daemon=True,
+                                        name=f"decompress {os.path.basename(self.name)}")
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _raw_chunks(self) -> Iterator[bytes]:
+        self._file.seek(0)
+        while not self._stop.is_set():
+            data = self._file.read(self.chunk_size)
+            if not data:
+                return
+            yield data
+
+    def _parallel_frames(self) -> Iterator[bytes] | None:
+        """Decompressed frames of a multi-frame zstandard file, or None."""
+        if self.kind != "zst" or self.threads < 2:
+            return None
+        frames = list(zstd_frames(self._file))
+        if len(frames) < 2:
+            return None
+
+        def decompress(frame):
+            offset, size = frame
+            with open(self.name, "rb") as f:
+                f.seek(offset)
+                return b"".join(_decompress_stream(iter((f.read(size),)), self._new))
+
+        def run():
+            with ThreadPoolExecutor(self.threads) as pool:
+                pending = []
+                frames_left = iter(frames)
+                for frame in frames_left:
+                    pending.append(pool.submit(decompress, frame))
+                    if len(pending) >= 2 * self.threads:
+                        break
+                while pending and not self._stop.is_set():
+                    yield pending.pop(0).result()
+                    frame = next(frames_left, None)
+                    if frame is not None:
+                        pending.append(pool.submit(decompress, frame))
+                for future in pending:
+                    future.cancel()
+        return run()
+
+    def _produce(self) -> None:
+        try:
+            chunks = self._parallel_frames()
+            if chunks is None:
+                chunks = _decompress_stream(self._raw_chunks(), self._new)
+            for chunk in chunks:
+                if not self._put(chunk):
+                    return
+            self._put(None)
+        except BaseException as exc:  # handed to the reader
+            self._put(exc)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            if self._done:
+                return 0
+            item = self._queue.get()
+            if item is None:
+                self._done = True
+                return 0
+            if isinstance(item, BaseException):
+                self._done = True
+                raise item
+            self._current = memoryview(item)
+        n = min(len(buffer), len(self._current))
+        buffer[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._file.close()
+        super().close()
+
+
+def open_text(path, encoding: str = "utf-8-sig", errors: str | None = None,
+              newline: str | None = None, threads: int | None = None) -> io.TextIOBase:
+    """Open a text file for reading, decompressing it if it is compressed.
+
+    Plain files are opened with :func:`open`. The arguments have the same
+    meaning as for :func:`open`; ``threads`` is passed to
+    :class:`DecompressingReader`.
+    """
+    kind = detect_compression(path)
+    if kind is None:
+        return open(path, encoding=encoding, errors=errors, newline=newline)
+    raw = DecompressingReader(path, kind, threads=threads)
+    return io.TextIOWrapper(io.BufferedReader(raw, CHUNK_SIZE), encoding=encoding,
+                            errors=errors, newline=newline)
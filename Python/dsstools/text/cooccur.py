@@ -0,0 +1,230 @@
+"""Character co-occurrence counts across a whole corpus.
+
+The intro checks co-mentions one paragraph at a time::
+
+    "Alice" in alice_paragraphs[10] or "Eaglet" in alice_paragraphs[10]
+
+:func:`cooccurrence` does this for every pair of names in every paragraph
+(or chapter) in one pass. Names are matched as whole, normalized words
+("Alice," and "ALICE" count as "Alice"), including multi-word names such
+as "White Rabbit" (within one paragraph). Instead of segments, co-mentions can also be counted
+within a sliding window of ``window`` tokens.
+
+    >>> corpus = Corpus.from_file("Alice_in_wonderland.txt")
+    >>> names = open("Characters.txt").read().splitlines()
+    >>> counts = cooccurrence(corpus, names)                # per paragraph
+    >>> counts["Alice", "Mouse"]
+    >>> near = cooccurrence(corpus, names, window=20)       # within 20 words
+    >>> near.to_scipy()                                     # sparse matrix
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from dsstools.text.corpus import Corpus
+from dsstools.text.tokenize import Tokens
+
+_KEY_MIX = 0x9E3779B97F4A7C15
+
+
+def _ngram_keys(ids: np.ndarray, k: int) -> np.ndarray:
+    """Hash of every run of ``k`` consecutive token ids."""
+    n = len(ids) - k + 1
+    keys = np.zeros(max(n, 0), dtype=np.uint64)
+    for j in range(k):
+        keys = keys * np.uint64(_KEY_MIX) + ids[j:j + n].astype(np.uint64)
+    return keys
+
+
+def _expand(counts: np.ndarray):
+    """For groups of the given sizes, the index of each member in its group."""
+    total = int(counts.sum())
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(total, dtype=np.int64) - offsets
+
+
+class NameMatcher:
+    """Finds every mention of a list of names in tokenized text.
+
+    Names with the same number of words are matched together: the token
+    ids of every run of ``k`` words are hashed and looked up among the
+    hashes of the ``k``-word names, so the cost grows with the number of
+    distinct name lengths, not the number of names.
+    """
+
+    def __init__(self, names: list[str], tokenizer):
+        self.names = list(names)
+        self.tokenizer = tokenizer
+        # Names that normalize to the same words share one "term".
+        self.terms: list[tuple[int, ...]] = []
+        term_of: dict[tuple[int, ...], int] = {}
+        self.name_term = np.empty(len(self.names), dtype=np.int64)
+        for i, name in enumerate(self.names):
+            key = tuple(tokenizer.encode(name).tolist())
+            self.name_term[i] = term_of.setdefault(key, len(term_of))
+            if self.name_term[i] == len(self.terms):
+                self.terms.append(key)
+
+    def mentions(self, tokens: Tokens):
+        """Return ``(terms, positions)`` of all mentions, sorted by position."""
+        by_length: dict[int, list[int]] = {}
+        for t, key in enumerate(self.terms):
+            if key and min(key) >= 0:  # words the text never uses cannot match
+                by_length.setdefault(len(key), []).append(t)
+        found_terms, found_positions = [], []
+        for k, terms in by_length.items():
+            term_keys = np.concatenate([_ngram_keys(np.array(self.terms[t]), k) for t in terms])
+            order = np.argsort(term_keys)
+            term_keys = term_keys[order]
+            terms = np.array(terms)[order]
+            keys = _ngram_keys(tokens.ids, k)
+            pos = np.minimum(np.searchsorted(term_keys, keys), len(term_keys) - 1)
+            hit = np.flatnonzero(term_keys[pos] == keys)
+            found_terms.append(terms[pos[hit]])
+            found_positions.append(hit)
+        if not found_terms:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        terms = np.concatenate(found_terms)
+        positions = np.concatenate(found_positions)
+        order = np.argsort(positions, kind="stable")
+        return terms[order], positions[order]
+
+
+class Cooccurrence:
+    """Symmetric co-occurrence counts between names.
+
+    Counts are stored sparsely (``rows``, ``cols``, ``counts``) over the
+    distinct normalized names; :meth:`to_numpy` and :meth:`to_scipy` expand
+    them to one row and column per entry of ``names``.
+    """
+
+    def __init__(self, names, name_term, n_terms, rows, cols, counts):
+        self.names = list(names)
+        self.name_term = name_term
+        self.n_terms = n_terms
+        self.rows = rows
+        self.cols = cols
+        self.counts = counts
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    def __getitem__(self, pair: tuple[str, str]) -> int:
+        a, b = (self.name_term[self._index[name]] for name in pair)
+        hit = np.flatnonzero((self.rows == a) & (self.cols == b))
+        return int(self.counts[hit[0]]) if len(hit) else 0
+
+    def to_numpy(self) -> np.ndarray:
+        """Dense ``len(names) x len(names)`` array of counts."""
+        dense = np.zeros((self.n_terms, self.n_terms), dtype=np.int64)
+        dense[self.rows, self.cols] = self.counts
+        return dense[np.ix_(self.name_term, self.name_term)]
+
+    def to_scipy(self, format: str = "csr"):
+        """Sparse ``len(names) x len(names)`` matrix of counts (needs SciPy)."""
+        try:
+            from scipy import sparse
+        except ImportError:
+            raise ImportError("to_scipy() needs SciPy; use to_numpy() instead") from None
+        matrix = sparse.csr_matrix((self.counts, (self.rows, self.cols)),
+                                   shape=(self.n_terms, self.n_terms))
+        return matrix[self.name_term][:, self.name_term].asformat(format)
+
+    def pairs(self, min_count: int = 1) -> list[tuple[str, str, int]]:
+        """``(name, name, count)`` for each co-occurring pair, most frequent first."""
+        first_name = {}
+        for name, term in zip(self.names, self.name_term.tolist()):
+            first_name.setdefault(term, name)
+        keep = (self.rows < self.cols) & (self.counts >= min_count)
+        order = np.argsort(-self.counts[keep], kind="stable")
+        rows, cols, counts = self.rows[keep][order], self.cols[keep][order], self.counts[keep][order]
+        return [(first_name[a], first_name[b], c)
+                for a, b, c in zip(rows.tolist(), cols.tolist(), counts.tolist())]
+
+
+def _aggregate(n_terms: int, rows: np.ndarray, cols: np.ndarray):
+    keys, counts = np.unique(rows * n_terms + cols, return_counts=True)
+    return keys // n_terms, keys % n_terms, counts
+
+
+def _segment_counts(terms, units, n_terms):
+    """Number of units in which each pair of terms appears together."""
+    keys = np.unique(units * n_terms + terms)
+    units, terms = keys // n_terms, keys % n_terms
+    try:
+        from scipy import sparse
+    except ImportError:
+        sparse = None
+    if sparse is not None:
+        # counts = M.T @ M for the unit-by-term incidence matrix M.
+        unit_ids, units = np.unique(units, return_inverse=True)
+        incidence = sparse.csr_matrix(
+            (np.ones(len(terms), dtype=np.int64), (units.ravel(), terms)),
+            shape=(len(unit_ids), n_terms))
+        product = (incidence.T @ incidence).tocoo()
+        return product.row.astype(np.int64), product.col.astype(np.int64), product.data
+    group_start = np.flatnonzero(np.r_[True, units[1:] != units[:-1]])
+    group_size = np.diff(np.r_[group_start, len(units)])
+    size_of = np.repeat(group_size, group_size)
+    start_of = np.repeat(group_start, group_size)
+    left = np.repeat(np.arange(len(units)), size_of)
+    right = np.repeat(start_of, size_of) + _expand(size_of)
+    return _aggregate(n_terms, terms[left], terms[right])
+
+
+def _window_pairs(terms, positions, window, units):
+    """Pairs of mentions at most ``window`` tokens apart (optionally in one unit)."""
+    stop = np.searchsorted(positions, positions + window, side="right")
+    if units is not None:
+        unit_end = np.searchsorted(units, units, side="right")
+        stop = np.minimum(stop, unit_end)
+    n_after = stop - np.arange(len(positions)) - 1
+    left = np.repeat(np.arange(len(positions)), n_after)
+    right = left + 1 + _expand(n_after)
+    a, b = terms[left], terms[right]
+    different = a != b
+    a, b = a[different], b[different]
+    return np.r_[a, b], np.r_[b, a]
+
+
+def cooccurrence(corpus: Corpus, names: list[str], by: str = "paragraph",
+                 window: int | None = None) -> Cooccurrence:
+    """Count co-occurrences of every pair of ``names`` in ``corpus``.
+
+    Parameters
+    ----------
+    corpus : Corpus
+        Tokenized, segmented text.
+    names : list of str
+        Names to look for, e.g. the lines of ``Characters.txt``.
+    by : {"paragraph", "chapter", None}
+        Without ``window``, count the segments in which both names appear
+        (the diagonal holds the number of segments mentioning each name).
+        With ``window``, only count pairs inside the same segment; pass
+        ``None`` to let windows cross segment boundaries.
+    window : int, optional
+        Count pairs of mentions whose first words are at most ``window``
+        tokens apart. Mentions of the same name are not counted.
+    """
+    matcher = NameMatcher(names, corpus.tokenizer)
+    n_terms = len(matcher.terms)
+    terms, positions = matcher.mentions(corpus.tokens)
+    if len(terms):
+        # A multi-word name cannot run on from one paragraph into the next.
+        last = positions + np.array([len(term) for term in matcher.terms])[terms] - 1
+        one_paragraph = corpus.token_paragraph[positions] == corpus.token_paragraph[last]
+        terms, positions = terms[one_paragraph], positions[one_paragraph]
+    if by is None:
+        units = None
+    elif by in ("paragraph", "chapter"):
+        units = getattr(corpus, "token_" + by)[positions]
+    else:
+        raise ValueError(f"by must be 'paragraph', 'chapter' or None, not {by!r}")
+    if window is None:
+        if units is None:
+            raise ValueError("either by or window must be given")
+        rows, cols, counts = _segment_counts(terms, units, max(n_terms, 1))
+    else:
+        rows, cols = _window_pairs(terms, positions, window, units)
+        rows, cols, counts = _aggregate(max(n_terms, 1), rows, cols)
+    return Cooccurrence(matcher.names, matcher.name_term, n_terms, rows, cols, counts)
@@ -0,0 +1,95 @@
+"""A tokenized text split into chapters and paragraphs.
+
+The intro workshop segments *Alice in Wonderland* with
+``alice_txt.split("CHAPTER ")`` and ``alice_txt.split("\\n\\n")``.
+:class:`Corpus` records the same segmentation as character offsets and
+assigns every token to its chapter and paragraph, so segment-level
+statistics can be computed with array operations instead of loops over
+lists of strings. Segment numbers match the indices of the lists the
+intro builds: ``corpus.paragraph(10) == alice_txt.split("\\n\\n")[10]``.
+
+    >>> corpus = Corpus.from_file("Alice_in_wonderland.txt")
+    >>> corpus.n_chapters, corpus.n_paragraphs
+    >>> corpus.token_chapter[:10]     # chapter number of the first 10 words
+"""
+
+from __future__ import annotations
+
+import re
+
+import numpy as np
+
+from dsstools.text.compressed import open_text
+from dsstools.text.tokenize import Tokenizer, Tokens
+
+
+def split_starts(text: str, sep: str) -> np.ndarray:
+    """Start offsets of the pieces ``text.split(sep)`` would return."""
+    starts = [0]
+    starts.extend(match.end() for match in re.finditer(re.escape(sep), text))
+    return np.array(starts, dtype=np.int64)
+
+
+class Corpus:
+    """Text, tokens and chapter/paragraph boundaries.
+
+    Parameters
+    ----------
+    text : str
+        The full text.
+    tokenizer : Tokenizer, optional
+        Tokenizer to use; a new lower-casing one by default. Pass a shared
+        tokenizer to make token ids comparable across corpora.
+    chapter_sep, paragraph_sep : str
+        Separators used to split chapters and paragraphs, as in the intro.
+    """
+
+    def __init__(self, text: str, tokenizer: Tokenizer | None = None,
+                 chapter_sep: str = "CHAPTER ", paragraph_sep: str = "\n\n"):
+        self.text = text
+        self.tokenizer = tokenizer or Tokenizer()
+        self.tokens: Tokens = self.tokenizer.tokenize(text)
+        self.chapter_sep = chapter_sep
+        self.paragraph_sep = paragraph_sep
+        self.chapter_starts = split_starts(text, chapter_sep)
+        self.paragraph_starts = split_starts(text, paragraph_sep)
+        self.token_chapter = self._segment_of(self.chapter_starts)
+        self.token_paragraph = self._segment_of(self.paragraph_starts)
+
+    @classmethod
+    def from_file(cls, path, encoding: str = "utf-8-sig", **kwargs) -> "Corpus":
+        """Read a text file (a leading byte-order mark is dropped).
+
+        Compressed files (``.gz``, ``.bz2``, ``.xz``, ``.zst``) are
+        decompressed while they are read; see :func:`~.compressed.open_text`.
+        """
+        with open_text(path, encoding=encoding) as f:
+            return cls(f.read(), **kwargs)
+
+    def _segment_of(self, starts: np.ndarray) -> np.ndarray:
+        return np.searchsorted(starts, self.tokens.starts, side="right") - 1
+
+    @property
+    def n_chapters(self) -> int:
+        return len(self.chapter_starts)
+
+    @property
+    def n_paragraphs(self) -> int:
+        return len(self.paragraph_starts)
+
+    def _piece(self, starts: np.ndarray, sep: str, i: int) -> str:
+        start = starts[i]
+        end = starts[i + 1] - len(sep) if i + 1 < len(starts) else len(self.text)
+        return self.text[start:end]
+
+    def chapter(self, i: int) -> str:
+        """Text of chapter ``i`` (chapter 0 is everything before the first)."""
+        return self._piece(self.chapter_starts, self.chapter_sep, i)
+
+    def paragraph(self, i: int) -> str:
+        """Text of paragraph ``i``."""
+        return self._piece(self.paragraph_starts, self.paragraph_sep, i)
+
+    def paragraph_chapters(self) -> np.ndarray:
+        """Chapter number of every paragraph (by where the paragraph starts)."""
+        return np.searchsorted(self.chapter_starts, self.paragraph_starts, side="right") - 1
@@ -0,0 +1,134 @@
+"""Keyword-in-context (KWIC) search over a segmented corpus.
+
+Instead of ``alice_chapters[2].count("Mouse")`` followed by slicing the
+text by hand, a :class:`Concordance` shows every occurrence of a word or
+phrase with the text around it and the chapter and paragraph it is in::
+
+    >>> concordance = Concordance(Corpus.from_file("Alice_in_wonderland.txt"))
+    >>> results = concordance.search(["Mouse", "Duck"], width=30, chapters=2)
+    >>> results["Mouse"].total
+    >>> for hit in results["Mouse"].hits:
+    ...     print(hit)
+
+The concordance is an inverted index: the token positions of every
+vocabulary word are stored contiguously, so a lookup is an array slice
+and context strings are only built for the hits on the requested page.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from dsstools.text.corpus import Corpus
+
+
+class Hit(NamedTuple):
+    """One occurrence of a search term."""
+
+    chapter: int
+    paragraph: int
+    token: int  # position of the first word in the corpus tokens
+    start: int  # character offsets of the match in corpus.text
+    end: int
+    left: str
+    match: str
+    right: str
+
+    def __str__(self) -> str:
+        return f"{self.left} [{self.match}] {self.right}"
+
+
+class Page(NamedTuple):
+    """One page of hits for a search term."""
+
+    term: str
+    total: int  # number of hits over all pages
+    page: int
+    page_size: int
+    hits: list[Hit]
+
+    @property
+    def pages(self) -> int:
+        return -(-self.total // self.page_size)
+
+
+class Concordance:
+    """Inverted index of token positions for fast KWIC lookups."""
+
+    def __init__(self, corpus: Corpus):
+        self.corpus = corpus
+        ids = corpus.tokens.ids
+        counts = np.bincount(ids, minlength=len(corpus.tokens.vocabulary))
+        self._offsets = np.r_[0, np.cumsum(counts)]
+        self._postings = np.argsort(ids, kind="stable")  # positions, grouped by id
+
+    def positions(self, term: str, chapters=None) -> np.ndarray:
+        """Token positions where ``term`` (a word or phrase) starts, in order.
+
+        ``chapters`` restricts the result to one chapter number or a
+        collection of them.
+        """
+        ids = self.corpus.tokens.ids
+        query = self.corpus.tokenizer.encode(term)
+        if len(query) == 0 or (query < 0).any() or query[0] >= len(self._offsets) - 1:
+            return np.empty(0, dtype=np.int64)
+        first = query[0]
+        found = self._postings[self._offsets[first]:self._offsets[first + 1]]
+        if len(query) > 1:
+            found = found[found + len(query) <= len(ids)]
+            for j in range(1, len(query)):
+                found = found[ids[found + j] == query[j]]
+        if chapters is not None:
+            wanted = np.atleast_1d(np.asarray(chapters))
+            found = found[np.isin(self.corpus.token_chapter[found], wanted)]
+        return found
+
+    def count(self, term: str, chapters=None) -> int:
+        return len(self.positions(term, chapters))
+
+    def search(self, terms: str | Iterable[str], width: int = 40, page: int = 0,
+               page_size: int = 20, chapters=None) -> dict[str, Page]:
+        """Find every hit of each term and return one page of them per term.
+
+        Parameters
+        ----------
+        terms : str or iterable of str
+            Words or phrases to look up, matched like :meth:`Tokens.find`.
+        width : int
+            Number of characters of context on each side of a hit.
+        page, page_size : int
+            Which page of hits to return (counting from 0) and its length.
+        chapters : int or iterable of int, optional
+            Only report hits in these chapters.
+        """
+        if isinstance(terms, str):
+            terms = [terms]
+        tokens = self.corpus.tokens
+        text = self.corpus.text
+        results = {}
+        for term in terms:
+            found = self.positions(term, chapters)
+            n_words = max(len(self.corpus.tokenizer.encode(term)), 1)
+            selected = found[page * page_size:(page + 1) * page_size]
+            hits = []
+            for pos in selected.tolist():
+                start = int(tokens.starts[pos])
+                end = int(tokens.ends[pos + n_words - 1])
+                hits.append(Hit(
+                    chapter=int(self.corpus.token_chapter[pos]),
+                    paragraph=int(self.corpus.token_paragraph[pos]),
+                    token=pos,
+                    start=start,
+                    end=end,
+                    left=_flatten(text[max(start - width, 0):start]),
+                    match=_flatten(text[start:end]),
+                    right=_flatten(text[end:end + width]),
+                ))
+            results[term] = Page(term, len(found), page, page_size, hits)
+        return results
+
+
+def _flatten(s: str) -> str:
+    return s.replace("\r", " ").replace("\n", " ")
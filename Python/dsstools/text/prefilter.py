@@ -0,0 +1,214 @@
+"""Skip paragraphs that cannot contain a name.
+
+The intro tests co-mentions with substring checks such as::
+
+    "Alice" in alice_paragraphs[10] or "Eaglet" in alice_paragraphs[10]
+
+Done for every name and every paragraph, each test scans the whole
+paragraph, although most paragraphs mention none of the names.
+:class:`ParagraphFilter` builds a small Bloom filter of the character
+trigrams of every paragraph once, with NumPy over the whole text. A term
+can only occur in a paragraph whose filter holds all of the term's
+trigrams, so checking the filters rules most paragraphs out and only the
+remaining candidates are scanned::
+
+    >>> paragraphs = ParagraphFilter.from_paragraphs(alice_paragraphs)
+    >>> paragraphs.find("Eaglet")                 # paragraphs containing it
+    >>> paragraphs.contains("Alice")[10]          # == "Alice" in alice_paragraphs[10]
+    >>> paragraphs.any_of(["Alice", "Eaglet"])    # the "or" test, for all paragraphs
+    >>> paragraphs.all_of(["Alice", "Mouse"])     # co-mentions
+    >>> paragraphs.mention_matrix(names)          # paragraphs x names
+
+Results are exactly those of ``term in paragraph`` (case-sensitive
+substrings); the filter only decides which paragraphs are checked.
+Terms shorter than three characters have no trigrams, so for them every
+paragraph is a candidate.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from dsstools.text.corpus import Corpus, split_starts
+from dsstools.text.tokenize import CHUNK_CHARS, as_codes
+
+_TRIGRAM_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _trigram_keys(codes: np.ndarray) -> np.ndarray:
+    """Hash of the trigram starting at each position (characters are < 2**21)."""
+    codes = codes.astype(np.uint64)
+    keys = (codes[:-2] << np.uint64(42)) | (codes[1:-1] << np.uint64(21)) | codes[2:]
+    return keys * _TRIGRAM_MIX
+
+
+class ParagraphFilter:
+    """Per-paragraph trigram Bloom filters over one text.
+
+    Parameters
+    ----------
+    text : str
+        The text the paragraphs are taken from.
+    starts, ends : array of int
+        Character offsets of each paragraph in ``text``.
+    bits : int, optional
+        Bits per paragraph filter, a power of two. By default it is chosen
+        from the average paragraph length, for about one false candidate in
+        a thousand for a five-letter name.
+    hashes : int
+        Bits set per trigram.
+
+    Use :meth:`from_paragraphs`, :meth:`from_text` or :meth:`from_corpus`
+    rather than giving offsets directly.
+    """
+
+    def __init__(self, text: str, starts, ends, bits: int | None = None, hashes: int = 3):
+        self.text = text
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        if bits is None:
+            mean = float(np.mean(self.ends - self.starts)) if len(self.starts) else 0.0
+            bits = 1 << max(6, min(16, math.ceil(math.log2(max(1.0, 1.5 * hashes * mean)))))
+        if bits < 8 or bits & (bits - 1):
+            raise ValueError(f"bits must be a power of two of at least 8, not {bits}")
+        self.bits = bits
+        self.hashes = hashes
+        self._shift = bits.bit_length() - 1
+        if hashes * self._shift > 64:
+            raise ValueError(f"{hashes} hashes of {bits} bits need more than 64 hash bits")
+        # Byte j of every paragraph's filter is contiguous, so a query
+        # reads only the few rows its trigrams hash to.
+        self.filters = np.zeros((bits // 8, len(self.starts)), dtype=np.uint8)
+        self._build()
+
+    @classmethod
+    def from_paragraphs(cls, paragraphs: Sequence[str], **kwargs) -> "ParagraphFilter":
+        """Filter a list of paragraphs, such as ``alice_txt.split("\\n\\n")``."""
+        sep = "\n\n"
+        lengths = np.fromiter(map(len, paragraphs), dtype=np.int64, count=len(paragraphs))
+        starts = np.cumsum(lengths + len(sep)) - lengths - len(sep)
+        return cls(sep.join(paragraphs), starts, starts + lengths, **kwargs)
+
+    @classmethod
+    def from_text(cls, text: str, sep: str = "\n\n", **kwargs) -> "ParagraphFilter":
+        """Filter the pieces ``text.split(sep)`` would return, without splitting."""
+        starts = split_starts(text, sep)
+        ends = np.r_[starts[1:] - len(sep), len(text)]
+        return cls(text, starts, ends, **kwargs)
+
+    @classmethod
+    def from_corpus(cls, corpus: Corpus, **kwargs) -> "ParagraphFilter":
+        """Filter the paragraphs of a :class:`Corpus` (same numbering)."""
+        starts = corpus.paragraph_starts
+        ends = np.r_[starts[1:] - len(corpus.paragraph_sep), len(corpus.text)]
+        return cls(corpus.text, starts, ends, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def paragraph(self, i: int) -> str:
+        return self.text[self.starts[i]:self.ends[i]]
+
+    def _bit_positions(self, keys: np.ndarray) -> list[np.ndarray]:
+        mask = np.uint64(self.bits - 1)
+        return [(keys >> np.uint64(64 - self._shift * (j + 1))) & mask
+                for j in range(self.hashes)]
+
+    def _build(self) -> None:
+        n = len(self.starts)
+        # Paragraphs are processed in groups of about CHUNK_CHARS characters,
+        # with room for each group's filters unpacked (one byte per bit).
+        max_rows = max(1, CHUNK_CHARS // self.bits)
+        first = 0
+        while first < n:
+            last = int(np.searchsorted(self.starts, self.starts[first] + CHUNK_CHARS, "right"))
+            last = min(max(last, first + 1), first + max_rows)
+            starts, ends = self.starts[first:last], self.ends[first:last]
+            lo, hi = int(starts[0]), int(ends[-1])
+            codes = as_codes(self.text[lo:hi])
+            if len(codes) >= 3:
+                keys = _trigram_keys(codes)
+                # The paragraph each trigram starts in; trigrams that reach
+                # past its end are left out.
+                spans = np.diff(np.r_[starts, hi])
+                owner = np.repeat(np.arange(last - first), spans)[:len(keys)]
+                positions = np.arange(lo, lo + len(keys), dtype=np.int64)
+                inside = positions + 3 <= ends[owner]
+                keys, owner = keys[inside], owner[inside] * self.bits
+                unpacked = np.zeros((last - first) * self.bits, dtype=bool)
+                for bit in self._bit_positions(keys):
+                    unpacked[owner + bit.astype(np.int64)] = True
+                packed = np.packbits(unpacked.reshape(last - first, -1), axis=1)
+                self.filters[:, first:last] = packed.T
+            first = last
+
+    def candidates(self, term: str) -> np.ndarray:
+        """Paragraphs whose filter allows ``term`` (a superset of those containing it)."""
+        if len(term) < 3:
+            return np.arange(len(self), dtype=np.int64)
+        keys = np.unique(_trigram_keys(as_codes(term)))
+        bits = np.concatenate(self._bit_positions(keys)).astype(np.int64)
+        rows = bits >> 3
+        masks = (0x80 >> (bits & 7)).astype(np.uint8)
+        unique_rows, where = np.unique(rows, return_inverse=True)
+        wanted = np.zeros(len(unique_rows), dtype=np.uint8)
+        np.bitwise_or.at(wanted, where, masks)
+        allowed = np.ones(len(self), dtype=bool)
+        for row, mask in zip(unique_rows.tolist(), wanted.tolist()):
+            allowed &= (self.filters[row] & mask) == mask
+        return np.flatnonzero(allowed)
+
+    def _verify(self, term: str, paragraphs: np.ndarray) -> np.ndarray:
+        find = self.text.find
+        bounds = zip(self.starts[paragraphs].tolist(), self.ends[paragraphs].tolist())
+        found = [find(term, start, end) != -1 for start, end in bounds]
+        return paragraphs[np.array(found, dtype=bool)]
+
+    def find(self, term: str) -> np.ndarray:
+        """Paragraphs that contain ``term``, in order."""
+        return self._verify(term, self.candidates(term))
+
+    def contains(self, term: str) -> np.ndarray:
+        """``term in paragraph`` for every paragraph, as a boolean array."""
+        out = np.zeros(len(self), dtype=bool)
+        out[self.find(term)] = True
+        return out
+
+    def counts(self, term: str) -> np.ndarray:
+        """``paragraph.count(term)`` for every paragraph."""
+        out = np.zeros(len(self), dtype=np.int64)
+        found = self.candidates(term)
+        count = self.text.count
+        bounds = zip(self.starts[found].tolist(), self.ends[found].tolist())
+        out[found] = [count(term, start, end) for start, end in bounds]
+        return out
+
+    def any_of(self, terms: Iterable[str]) -> np.ndarray:
+        """Paragraphs that contain at least one of ``terms``."""
+        found = [self.find(term) for term in terms]
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def all_of(self, terms: Iterable[str]) -> np.ndarray:
+        """Paragraphs that contain every one of ``terms`` (co-mentions)."""
+        terms = list(terms)
+        if not terms:
+            return np.arange(len(self), dtype=np.int64)
+        # Narrow down with all the filters before scanning any text.
+        remaining = self.candidates(terms[0])
+        for term in terms[1:]:
+            remaining = np.intersect1d(remaining, self.candidates(term), assume_unique=True)
+        for term in terms:
+            if not len(remaining):
+                break
+            remaining = self._verify(term, remaining)
+        return remaining
+
+    def mention_matrix(self, terms: Sequence[str]) -> np.ndarray:
+        """Boolean ``len(self) x len(terms)`` array of which paragraph contains which term."""
+        out = np.zeros((len(self), len(terms)), dtype=bool)
+        for j, term in enumerate(terms):
+            out[self.find(term), j] = True
+        return out
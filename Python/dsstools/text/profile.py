@@ -0,0 +1,148 @@
+"""Measure the stages of a text-analysis workflow.
+
+Wrap each step in :meth:`Profiler.stage` to record its wall time, CPU time
+and memory allocations (net change and peak, from :mod:`tracemalloc`)::
+
+    profiler = Profiler()
+    with profiler.stage("read"):
+        alice_txt = open("Alice_in_wonderland.txt").read()
+    with profiler.stage("split words"):
+        alice_words = alice_txt.split()
+    print(profiler.summary())
+    profiler.write_collapsed("intro.folded")
+
+Stages can be nested; a nested stage is reported under its parent's name
+(``"chapters;count Alice"``). :meth:`Profiler.collapsed` gives the
+"collapsed stack" text format read by flame-graph tools such as
+``flamegraph.pl`` and speedscope, weighted by each stage's own wall time
+in microseconds.
+
+Tracing allocations slows Python code down; pass ``memory=False`` to
+record times only.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import time
+import tracemalloc
+from typing import Iterator
+
+
+class StageStats:
+    """Totals for one stage path over all the times it ran."""
+
+    __slots__ = ("path", "calls", "wall", "cpu", "child_wall", "alloc", "peak")
+
+    def __init__(self, path: tuple[str, ...]):
+        self.path = path
+        self.calls = 0
+        self.wall = 0.0        # seconds, including nested stages
+        self.cpu = 0.0         # seconds of process CPU time
+        self.child_wall = 0.0  # seconds spent in nested stages
+        self.alloc = 0         # net bytes still allocated at the end
+        self.peak = 0          # largest extra bytes in use during the stage
+
+    @property
+    def name(self) -> str:
+        return ";".join(self.path)
+
+    @property
+    def self_wall(self) -> float:
+        return self.wall - self.child_wall
+
+
+class _Open:
+    __slots__ = ("stats", "wall", "cpu", "memory", "peak")
+
+    def __init__(self, stats: StageStats, memory: int):
+        self.stats = stats
+        self.memory = memory
+        self.peak = memory
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+
+
+class Profiler:
+    """Collect per-stage timings; see the module docstring."""
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.stages: dict[tuple[str, ...], StageStats] = {}
+        self._open: list[_Open] = []
+        self._started_tracing = False
+
+    def _traced(self) -> tuple[int, int]:
+        return tracemalloc.get_traced_memory() if self.memory else (0, 0)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """Time the ``with`` block as stage ``name`` (nested in any open stage)."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        path = (self._open[-1].stats.path if self._open else ()) + (name,)
+        stats = self.stages.get(path)
+        if stats is None:
+            stats = self.stages[path] = StageStats(path)
+        current, peak = self._traced()
+        # The peak is reset for the new stage, so hand the peak so far to
+        # the stages that are already open.
+        for frame in self._open:
+            frame.peak = max(frame.peak, peak)
+        if self.memory:
+            tracemalloc.reset_peak()
+        frame = _Open(stats, current)
+        self._open.append(frame)
+        try:
+            yield stats
+        finally:
+            wall = time.perf_counter() - frame.wall
+            cpu = time.process_time() - frame.cpu
+            current, peak = self._traced()
+            self._open.pop()
+            frame.peak = max(frame.peak, peak)
+            stats.calls += 1
+            stats.wall += wall
+            stats.cpu += cpu
+            stats.alloc += current - frame.memory
+            stats.peak = max(stats.peak, frame.peak - frame.memory)
+            if self._open:
+                parent = self._open[-1]
+                parent.stats.child_wall += wall
+                parent.peak = max(parent.peak, frame.peak)
+            elif self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def summary(self, sort: str | None = None) -> str:
+        """A text table of the stages, in the order they first ran.
+
+        ``sort="wall"`` (or ``"cpu"``, ``"peak"``, ...) sorts by that
+        column instead, largest first.
+        """
+        rows = list(self.stages.values())
+        if sort:
+            rows.sort(key=lambda s: getattr(s, sort), reverse=True)
+        total = sum(s.wall for s in rows if len(s.path) == 1) or 1.0
+        header = f"{'stage':<36} {'calls':>6} {'wall s':>9} {'self s':>9} {'%':>6} {'cpu s':>9}"
+        if self.memory:
+            header += f" {'alloc MB':>9} {'peak MB':>9}"
+        lines = [header, "-" * len(header)]
+        for s in rows:
+            label = "  " * (len(s.path) - 1) + s.path[-1]
+            line = (f"{label[:36]:<36} {s.calls:>6} {s.wall:>9.4f} {s.self_wall:>9.4f} "
+                    f"{100 * s.self_wall / total:>6.1f} {s.cpu:>9.4f}")
+            if self.memory:
+                line += f" {s.alloc / 1e6:>9.2f} {s.peak / 1e6:>9.2f}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def collapsed(self) -> str:
+        """Collapsed stacks (``a;b;c <microseconds>``) for flame-graph tools."""
+        return "\n".join(f"{s.name.replace(' ', '_')} {round(s.self_wall * 1e6)}"
+                         for s in self.stages.values() if s.self_wall > 0) + "\n"
+
+    def write_collapsed(self, path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
@@ -0,0 +1,364 @@
+"""Bulk word tokenizer.
+
+``alice_txt.split()`` keeps punctuation attached to words, so ``"Alice,"``
+and ``"Alice"`` count as different words. Fixing that with ``strip`` and
+``lower`` on every word is slow because each word becomes its own Python
+string. The tokenizer here works on the whole text at once with NumPy:
+
+1. the text is viewed as an array of character codes,
+2. each character is classified (word / not word) and case-folded
+   through a lookup table,
+3. token boundaries come from the edges of the word mask, and
+4. each token is identified by a polynomial hash of its folded characters.
+
+The result is an array of token ids plus start/end character offsets into
+the original text. A Python string is only created once per *distinct*
+word, when it is first added to the vocabulary.
+
+    >>> tokenizer = Tokenizer()
+    >>> tokens = tokenizer.tokenize(alice_txt)
+    >>> len(tokens)                  # number of words
+    >>> tokens.unique_count()        # number of distinct words
+    >>> tokens.count("Alice")        # "Alice", "Alice," and "ALICE" all match
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+# Odd, so it has a multiplicative inverse modulo 2**64.
+_HASH_BASE = 0x100000001B3
+_LENGTH_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+# Characters that join two words into one token ("Alice's", "don't").
+_APOSTROPHES = ("'", "’")
+
+# Texts longer than this are hashed in pieces to bound memory use. Other
+# array passes over a text (e.g. the trigram prefilter) use the same size.
+CHUNK_CHARS = 1 << 20
+
+
+def _inverse_mod64(a: int) -> int:
+    """Multiplicative inverse of odd ``a`` modulo 2**64 (Newton iteration)."""
+    x = a
+    for _ in range(6):
+        x = (x * (2 - a * x)) & _MASK64
+    return x
+
+
+def as_codes(text: str) -> np.ndarray:
+    """View ``text`` as an array with one integer code per character.
+
+    The dtype is the narrowest that holds every character: ``uint8`` for
+    Latin-1 text, ``uint16`` for the BMP, ``uint32`` otherwise. Offsets
+    into the array are character offsets into ``text``.
+    """
+    try:
+        return np.frombuffer(text.encode("latin-1"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        pass
+    encoded = text.encode("utf-16-le")
+    if len(encoded) == 2 * len(text):  # no surrogate pairs
+        return np.frombuffer(encoded, dtype=np.uint16)
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+def _codes_to_str(codes: np.ndarray) -> str:
+    if codes.dtype == np.uint8:
+        return codes.tobytes().decode("latin-1")
+    if codes.dtype == np.uint16:
+        return codes.tobytes().decode("utf-16-le")
+    return codes.astype(np.uint32).tobytes().decode("utf-32-le")
+
+
+def _fold_char(ch: str, lowercase: bool) -> int:
+    if ch in _APOSTROPHES:
+        return ord("'")
+    if lowercase:
+        low = ch.lower()
+        if len(low) == 1:
+            return ord(low)
+    return ord(ch)
+
+
+_APOSTROPHE = ord("'")
+
+
+class _CharTable:
+    """Word-character mask and case folding for an array of codes.
+
+    A single lookup table maps every character to its folded code, or to 0
+    if it is not part of a word. Latin-1 and BMP text is classified with
+    one gather per character; astral code points go through ``np.unique``.
+    """
+
+    # Building the BMP table takes a few tens of milliseconds, so tables
+    # are shared by all tokenizers in the process.
+    _tables: dict[tuple[bool, int], np.ndarray] = {}
+
+    def __init__(self, lowercase: bool):
+        self.lowercase = lowercase
+
+    def _value(self, ch: str) -> int:
+        if ch in _APOSTROPHES or ch.isalnum():
+            return _fold_char(ch, self.lowercase)
+        return 0
+
+    def _table(self, size: int) -> np.ndarray:
+        key = (self.lowercase, size)
+        if key not in self._tables:
+            values = np.array([self._value(chr(i)) for i in range(size)])
+            dtype = np.uint8 if values.max() < 256 else np.uint16
+            self._tables[key] = values.astype(dtype)
+        return self._tables[key]
+
+    def classify(self, codes: np.ndarray):
+        """Return ``(word_mask, folded_codes)`` for ``codes``.
+
+        Non-word characters have a folded code of 0.
+        """
+        if codes.dtype == np.uint8:
+            folded = self._table(256)[codes]
+        elif codes.dtype == np.uint16:
+            folded = self._table(1 << 16)[codes]
+        else:
+            folded = self._table(1 << 16)[np.minimum(codes, 0xFFFF)].astype(np.uint32)
+            high = np.flatnonzero(codes > 0xFFFF)
+            if len(high):
+                unique, inverse = np.unique(codes[high], return_inverse=True)
+                values = [self._value(chr(c)) for c in unique.tolist()]
+                folded[high] = np.array(values, dtype=np.uint32)[inverse]
+        apostrophe = folded == _APOSTROPHE
+        word = folded != 0
+        word &= ~apostrophe
+        # An apostrophe between two word characters belongs to the word.
+        if len(word) > 2:
+            word[1:-1] |= apostrophe[1:-1] & word[:-2] & word[2:]
+        return word, folded
+
+
+class Vocabulary:
+    """Mapping between token hashes, integer ids and normalized words."""
+
+    def __init__(self):
+        self.words: list[str] = []
+        self._keys = np.empty(0, dtype=np.uint64)  # sorted token hashes
+        self._ids = np.empty(0, dtype=np.int64)  # id of each entry in _keys
+        self._index: dict[str, int] | None = None
+        # Direct-mapped cache in front of the binary search: most lookups
+        # are answered by a single gather from these two arrays.
+        self._slot_bits = 10
+        self._slot_keys = np.zeros(1 << self._slot_bits, dtype=np.uint64)
+        self._slot_ids = np.full(1 << self._slot_bits, -1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __getitem__(self, token_id: int) -> str:
+        return self.words[token_id]
+
+    def id_of(self, word: str) -> int:
+        """Id of an already normalized ``word``, or -1 if it is unknown."""
+        if self._index is None or len(self._index) != len(self.words):
+            self._index = {w: i for i, w in enumerate(self.words)}
+        return self._index.get(word, -1)
+
+    def lookup(self, hashes: np.ndarray) -> np.ndarray:
+        """Ids for an array of token hashes (-1 where unknown)."""
+        slots = self._slots(hashes)
+        ids = self._slot_ids[slots]
+        misses = np.flatnonzero(self._slot_keys[slots] != hashes)
+        ids[misses] = -1
+        if len(misses) and len(self._keys):
+            pos = np.searchsorted(self._keys, hashes[misses])
+            pos = np.minimum(pos, len(self._keys) - 1)
+            found = self._keys[pos] == hashes[misses]
+            ids[misses[found]] = self._ids[pos[found]]
+        return ids
+
+    def _slots(self, hashes: np.ndarray) -> np.ndarray:
+        return ((hashes * np.uint64(_LENGTH_MIX)) >> np.uint64(64 - self._slot_bits)).astype(np.intp)
+
+    def _add(self, hashes: np.ndarray, words: list[str]) -> np.ndarray:
+        new_ids = np.arange(len(self.words), len(self.words) + len(words), dtype=np.int64)
+        self.words.extend(words)
+        keys = np.concatenate([self._keys, hashes])
+        ids = np.concatenate([self._ids, new_ids])
+        order = np.argsort(keys, kind="stable")
+        self._keys, self._ids = keys[order], ids[order]
+        bits = max(10, 2 + int(len(self._keys)).bit_length())
+        cached_keys, cached_ids = hashes, new_ids
+        if bits != self._slot_bits:
+            # A bigger cache, refilled with every word.
+            self._slot_bits = bits
+            self._slot_keys = np.zeros(1 << bits, dtype=np.uint64)
+            self._slot_ids = np.full(1 << bits, -1, dtype=np.int64)
+            cached_keys, cached_ids = self._keys, self._ids
+        slots = self._slots(cached_keys)
+        self._slot_keys[slots] = cached_keys
+        self._slot_ids[slots] = cached_ids
+        return new_ids
+
+
+class Tokens:
+    """Token ids and character offsets for one tokenized text.
+
+    ``ids[i]`` is the vocabulary id of the i-th word, which spans
+    ``text[starts[i]:ends[i]]`` in the original text.
+    """
+
+    def __init__(self, text, ids, starts, ends, tokenizer):
+        self.text = text
+        self.ids = ids
+        self.starts = starts
+        self.ends = ends
+        self.tokenizer = tokenizer
+
+    @property
+    def vocabulary(self) -> Vocabulary:
+        return self.tokenizer.vocabulary
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> str:
+        """Original (un-normalized) text of token ``i``."""
+        return self.text[self.starts[i]:self.ends[i]]
+
+    def counts(self) -> np.ndarray:
+        """Number of occurrences of every vocabulary id."""
+        return np.bincount(self.ids, minlength=len(self.vocabulary))
+
+    def unique_count(self) -> int:
+        """Number of distinct normalized words in this text."""
+        return int(np.count_nonzero(self.counts()))
+
+    def most_common(self, n: int = 10) -> list[tuple[str, int]]:
+        counts = self.counts()
+        top = np.argsort(-counts, kind="stable")[:n]
+        return [(self.vocabulary[i], int(counts[i])) for i in top if counts[i]]
+
+    def find(self, term: str) -> np.ndarray:
+        """Token positions where ``term`` (a word or phrase) starts."""
+        query = self.tokenizer.encode(term)
+        k = len(query)
+        if k == 0 or (query < 0).any() or k > len(self.ids):
+            return np.empty(0, dtype=np.int64)
+        n = len(self.ids) - k + 1
+        match = self.ids[:n] == query[0]
+        for j in range(1, k):
+            match &= self.ids[j:n + j] == query[j]
+        return np.flatnonzero(match)
+
+    def count(self, term: str) -> int:
+        """Number of occurrences of ``term`` as whole, normalized words."""
+        return len(self.find(term))
+
+
+class Tokenizer:
+    """Split text into normalized words without a string per word.
+
+    Parameters
+    ----------
+    lowercase : bool
+        Fold case so that "Alice" and "ALICE" are the same word.
+
+    The vocabulary is shared by every call to :meth:`tokenize`, so ids are
+    comparable across texts tokenized by the same tokenizer.
+    """
+
+    def __init__(self, lowercase: bool = True):
+        self.lowercase = lowercase
+        self.vocabulary = Vocabulary()
+        self._table = _CharTable(lowercase)
+        self._powers = np.empty(0, dtype=np.uint64)
+        self._inverse_powers = np.empty(0, dtype=np.uint64)
+        self._prefix = np.zeros(1, dtype=np.uint64)  # scratch space for _hash
+
+    def tokenize(self, text: str) -> Tokens:
+        """Tokenize ``text`` and return its :class:`Tokens`."""
+        codes = as_codes(text)
+        ids, starts, ends = [], [], []
+        for lo, hi in self._chunks(codes):
+            chunk_ids, chunk_starts, chunk_ends = self._tokenize_codes(codes[lo:hi])
+            ids.append(chunk_ids)
+            starts.append(chunk_starts + lo)
+            ends.append(chunk_ends + lo)
+        if not ids:
+            empty = np.empty(0, dtype=np.int64)
+            return Tokens(text, empty.astype(np.int32), empty, empty, self)
+        return Tokens(text, np.concatenate(ids).astype(np.int32),
+                      np.concatenate(starts), np.concatenate(ends), self)
+
+    def encode(self, term: str) -> np.ndarray:
+        """Vocabulary ids of the words in ``term`` (-1 for unknown words).
+
+        Unlike :meth:`tokenize`, this never adds words to the vocabulary.
+        """
+        codes = as_codes(term) if term else np.empty(0, dtype=np.uint8)
+        word, folded = self._table.classify(codes)
+        starts, ends = self._bounds(word)
+        return self.vocabulary.lookup(self._hash(folded, starts, ends))
+
+    def _chunks(self, codes: np.ndarray):
+        """Split ``codes`` into pieces that end on non-word characters."""
+        lo, n = 0, len(codes)
+        while lo < n:
+            hi = min(lo + CHUNK_CHARS, n)
+            if hi < n:
+                # Cut at a separator, not at an apostrophe: at the edge of
+                # this window one looks like a gap but may join two words.
+                _, folded = self._table.classify(codes[hi - 1024:hi + 1])
+                gaps = np.flatnonzero(folded == 0)
+                if len(gaps):
+                    hi = hi - 1024 + int(gaps[-1])
+            yield lo, hi
+            lo = hi
+
+    def _tokenize_codes(self, codes: np.ndarray):
+        word, folded = self._table.classify(codes)
+        starts, ends = self._bounds(word)
+        hashes = self._hash(folded, starts, ends)
+        ids = self.vocabulary.lookup(hashes)
+        missing = np.flatnonzero(ids < 0)
+        if len(missing):
+            # Only words not seen in earlier chunks need sorting out.
+            unique, first, inverse = np.unique(
+                hashes[missing], return_index=True, return_inverse=True)
+            words = [_codes_to_str(folded[starts[i]:ends[i]])
+                     for i in missing[first].tolist()]
+            ids[missing] = self.vocabulary._add(unique, words)[inverse.ravel()]
+        return ids, starts, ends
+
+    @staticmethod
+    def _bounds(word: np.ndarray):
+        padded = np.zeros(len(word) + 2, dtype=bool)
+        padded[1:-1] = word
+        # Word starts and ends alternate in the positions where the mask flips.
+        edges = np.flatnonzero(padded[1:] != padded[:-1])
+        return edges[0::2], edges[1::2]
+
+    def _hash(self, folded: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Polynomial hash of each ``folded[start:end]``, mixed with its length."""
+        n = len(folded)
+        powers, inverse_powers = self._power_tables(n + 1)
+        if len(self._prefix) < n + 1:
+            self._prefix = np.zeros(n + 1, dtype=np.uint64)
+        prefix = self._prefix[:n + 1]
+        prefix[1:] = folded
+        np.multiply(prefix[1:], powers[:n], out=prefix[1:])
+        np.cumsum(prefix[1:], out=prefix[1:])
+        hashes = (prefix[ends] - prefix[starts]) * inverse_powers[starts]
+        lengths = (ends - starts).astype(np.uint64)
+        return hashes + lengths * np.uint64(_LENGTH_MIX)
+
+    def _power_tables(self, n: int):
+        if len(self._powers) < n:
+            base = np.full(n, _HASH_BASE, dtype=np.uint64)
+            base[0] = 1
+            inverse = np.full(n, _inverse_mod64(_HASH_BASE), dtype=np.uint64)
+            inverse[0] = 1
+            self._powers = np.cumprod(base, dtype=np.uint64)
+            self._inverse_powers = np.cumprod(inverse, dtype=np.uint64)
+        return self._powers, self._inverse_powers
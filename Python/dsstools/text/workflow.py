@@ -0,0 +1,108 @@
+"""The PythonIntro text analysis as one function, with optional profiling.
+
+:func:`intro_workflow` runs the same steps as the workshop, on any text
+file and character list (which may be compressed, see
+:func:`~dsstools.text.compressed.open_text`), and returns the results. With a
+:class:`~dsstools.text.profile.Profiler` each step is recorded as a
+stage, so it is easy to see which one dominates as the corpus grows::
+
+    python -m dsstools.text.workflow --profile
+    python -m dsstools.text.workflow big_corpus.txt characters.txt --profile \\
+        --flamegraph intro.folded
+
+Without ``--profile`` the stages cost nothing but a function call each.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+from pathlib import Path
+from typing import Any
+
+from dsstools.text.compressed import open_text
+from dsstools.text.profile import Profiler
+
+INTRO_DIR = Path(__file__).resolve().parents[2] / "PythonIntro"
+
+
+def intro_workflow(text_path=INTRO_DIR / "Alice_in_wonderland.txt",
+                   characters_path=INTRO_DIR / "Characters.txt",
+                   profiler: Profiler | None = None) -> dict[str, Any]:
+    """Run the PythonIntro analysis and return its results by name."""
+    stage = profiler.stage if profiler is not None else (lambda name: contextlib.nullcontext())
+    out: dict[str, Any] = {}
+    with stage("intro"):
+        with stage("read"):
+            with open_text(text_path) as f:
+                alice_txt = f.read()
+            with open_text(characters_path) as f:
+                characters_txt = f.read()
+        with stage("split words"):
+            alice_words = alice_txt.split()
+            out["words"] = len(alice_words)
+        with stage("unique words"):
+            out["unique_words"] = len(set(alice_words))
+        with stage("split characters"):
+            alice_characters = characters_txt.splitlines()
+        with stage("split chapters"):
+            alice_chapters = alice_txt.split("CHAPTER ")
+            out["chapters"] = len(alice_chapters)
+        with stage("split paragraphs"):
+            alice_paragraphs = alice_txt.split("\n\n")
+            out["paragraphs"] = len(alice_paragraphs)
+        with stage("chapter loops"):
+            with stage("paragraphs per chapter"):
+                out["paragraphs_per_chapter"] = [len(chapter.split("\n\n"))
+                                                 for chapter in alice_chapters[1:]]
+            with stage("chapter titles"):
+                chapter_titles = []
+                for chapter in alice_chapters[1:]:
+                    chapter_titles.append(chapter.split(sep="\n")[0])
+            with stage("count Alice"):
+                chapter_Alice = []
+                for chapter in alice_chapters[1:]:
+                    chapter_Alice.append(chapter.count("Alice"))
+                out["alice_per_chapter"] = dict(zip(chapter_titles, chapter_Alice))
+            with stage("words per chapter"):
+                words_per_chapter = []
+                for chapter in alice_chapters:
+                    words_per_chapter.append(len(chapter.split()))
+                out["words_per_chapter"] = words_per_chapter
+        with stage("count characters"):
+            num_per_character = []
+            for character in alice_characters:
+                num_per_character.append(alice_txt.count(character))
+            out["character_counts"] = dict(zip(alice_characters, num_per_character))
+        with stage("numpy stats"):
+            import numpy
+            out["alice_mean"] = float(numpy.mean(chapter_Alice))
+            out["alice_std"] = float(numpy.std(chapter_Alice))
+    return out
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the PythonIntro text analysis.")
+    parser.add_argument("text", nargs="?", default=INTRO_DIR / "Alice_in_wonderland.txt")
+    parser.add_argument("characters", nargs="?", default=INTRO_DIR / "Characters.txt")
+    parser.add_argument("--profile", action="store_true", help="print time and memory per stage")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="with --profile, do not trace allocations")
+    parser.add_argument("--flamegraph", metavar="PATH",
+                        help="with --profile, write collapsed stacks for flame-graph tools")
+    args = parser.parse_args(argv)
+
+    profiler = Profiler(memory=not args.no_memory) if args.profile else None
+    results = intro_workflow(args.text, args.characters, profiler)
+    print(f"{results['words']} words, {results['unique_words']} unique, "
+          f"{results['chapters'] - 1} chapters, {results['paragraphs']} paragraphs")
+    print(f"Alice per chapter: mean {results['alice_mean']:.2f}, std {results['alice_std']:.2f}")
+    if profiler is not None:
+        print()
+        print(profiler.summary())
+        if args.flamegraph:
+            profiler.write_collapsed(args.flamegraph)
+
+
+if __name__ == "__main__":
+    main()
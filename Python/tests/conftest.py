@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Make ``import dsstools`` work however pytest is started, e.g.
+# ``python3 -m pytest Python/tests`` from the repository root.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
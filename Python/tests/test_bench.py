@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from dsstools.text import bench
+
+pytestmark = pytest.mark.skipif(not (bench.INTRO_DIR / "Alice_in_wonderland.txt").exists(),
+                                reason="needs the intro's Alice_in_wonderland.txt")
+
+
+@pytest.mark.parametrize("text, size", [("4096", 4096), ("100K", 100 << 10),
+                                        ("2.5g", int(2.5 * (1 << 30))), (" 1 MB ", 1 << 20)])
+def test_parse_size(text, size):
+    assert bench.parse_size(text) == size
+
+
+def test_parse_size_rejects():
+    with pytest.raises(ValueError):
+        bench.parse_size("ten")
+
+
+@pytest.mark.parametrize("size, text", [(1 << 30, "1G"), (3 << 20, "3M"), (1536, "1536"),
+                                        (100 << 10, "100K")])
+def test_format_size(size, text):
+    assert bench.format_size(size) == text
+
+
+def test_synthesize_repeats_chapters(tmp_path):
+    path = bench.synthesize(200_000, tmp_path)
+    text = path.read_text(encoding="utf-8")
+    meta = json.loads(path.with_suffix(".json").read_text())
+    assert meta["bytes"] == len(text.encode("utf-8")) >= 200_000
+    assert meta["words"] == len(text.split())
+    source = (bench.INTRO_DIR / "Alice_in_wonderland.txt").read_text(encoding="utf-8-sig")
+    front = source.split("CHAPTER ")[0]
+    assert text.startswith(front) and text.count(front) == 1
+    assert text.count("CHAPTER I.") > source.count("CHAPTER I.")
+    assert bench.synthesize(200_000, tmp_path) == path  # reused
+
+
+def test_run_benchmarks(tmp_path):
+    logs = []
+    result = bench.run_benchmarks([50_000], tmp_path, ops={"split words", "Alice per chapter"},
+                                  repeat=1, log=logs.append)
+    rows = result["results"]
+    assert [(r["op"], r["engine"]) for r in rows] == [
+        ("split words", "intro"), ("split words", "Tokenizer"),
+        ("Alice per chapter", "intro"), ("Alice per chapter", "Corpus")]
+    assert all(r["size"] >= 50_000 for r in rows)
+    assert all(r["seconds"] > 0 and r["peak_mb"] is not None for r in rows)
+    assert len(logs) == len(rows)
+    assert result["meta"]["repeat"] == 1
+
+
+def test_engines_agree_with_the_intro(tmp_path):
+    inputs = bench._Inputs(bench.synthesize(100_000, tmp_path), ["Alice"])
+    intro = [chapter.count("Alice") for chapter in inputs.get("chapters")[1:]]
+    engine = bench._alice_per_chapter(inputs).tolist()
+    # Whole words versus substrings: "Alice's" counts for both.
+    assert len(engine) == len(intro) and sum(engine) <= sum(intro)
+
+
+def test_import_time():
+    assert bench.import_time("dsstools.text", repeat=1) > 0
+    assert bench.import_time("dsstools.no_such_module", repeat=1) is None
+
+
+def row(op, seconds, size=1000):
+    return {"label": "1K", "size": size, "op": op, "engine": "intro", "seconds": seconds}
+
+
+def test_compare():
+    old = {"imports": {"numpy": 0.100, "tiny": 0.001},
+           "results": [row("read", 1.0), row("split words", 1.0), row("stats", 1.0)]}
+    new = {"imports": {"numpy": 0.200, "tiny": 0.004, "new": 0.1},
+           "results": [row("read", 1.1), row("split words", 1.5), row("stats", 0.5),
+                       row("read", 1.0, size=2000)]}
+    lines, regressions = bench.compare(new, old, threshold=0.2)
+    assert regressions == 2  # numpy import, split words; "tiny" is within noise
+    assert [line.endswith("SLOWER") for line in lines] == [True, False, False, True, False]
+    assert lines[-1].endswith("faster")
+
+
+def test_main_compare_exit_status(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    args = ["--sizes", "20K", "--ops", "read", "--repeat", "1", "--no-imports",
+            "--no-memory", "--data-dir", str(tmp_path)]
+    assert bench.main(args + ["--out", str(out)]) == 0
+    saved = json.loads(out.read_text())
+    for r in saved["results"]:
+        r["seconds"] /= 1000  # pretend the last run was much faster
+    out.write_text(json.dumps(saved))
+    assert bench.main(args + ["--compare", str(out)]) == 1
+    assert "regression" in capsys.readouterr().out
@@ -0,0 +1,187 @@
+import contextlib
+import types
+import urllib.request
+
+import pytest
+
+from dsstools.scrape import browser
+from dsstools.scrape.browser import BrowserPool, RenderedPage, serve_directory
+
+PAGES = {
+    "static.html": "<html><body><h1>Static</h1></body></html>",
+    # Content built by JavaScript, and a button that loads two more items.
+    "collections.html": """<html><body><ul id="items"></ul>
+<button id="more" onclick="add()">Load More</button>
+<script>
+  let n = 0;
+  function add() {
+    const li = document.createElement("li");
+    li.textContent = "item " + (++n);
+    document.getElementById("items").appendChild(li);
+    if (n >= 3) document.getElementById("more").style.display = "none";
+  }
+  add();
+</script></body></html>""",
+}
+
+
+@pytest.fixture
+def site(tmp_path):
+    for name, text in PAGES.items():
+        (tmp_path / name).write_text(text, encoding="utf-8")
+    with serve_directory(tmp_path) as base_url:
+        yield base_url
+
+
+def test_serve_directory(site):
+    with urllib.request.urlopen(site + "static.html") as response:
+        assert b"<h1>Static</h1>" in response.read()
+
+
+# With a real browser (skipped without Playwright and an installed browser).
+
+@pytest.fixture(scope="module")
+def pool():
+    pytest.importorskip("playwright.sync_api")
+    try:
+        pool = BrowserPool(size=2, pages_per_context=2, timeout=10)
+    except Exception as exc:  # e.g. "python -m playwright install" not run
+        pytest.skip(f"no browser: {exc}")
+    with pool:
+        yield pool
+
+
+def test_render_javascript(pool, site):
+    tree = pool.render_tree(site + "collections.html", click="#more", clicks=5)
+    assert tree.xpath('//*[@id="items"]/li/text()') == ["item 1", "item 2", "item 3"]
+
+
+def test_map_reuses_and_recycles_pages(pool, site):
+    urls = [site + "static.html", site + "collections.html"] * 4
+    pages = list(pool.map(urls))
+    assert [page.url for page in pages] == urls
+    assert all(page.status == 200 for page in pages)
+    assert all("<h1>Static</h1>" in page.html for page in pages[::2])
+
+
+def test_failures_do_not_break_the_pool(pool, site):
+    assert pool.render(site + "missing.html").status == 404
+    with pytest.raises(Exception):
+        pool.render("http://127.0.0.1:9/", timeout=2)
+    assert pool.render(site + "static.html").status == 200
+
+
+# With a fake Playwright, to check how the pool manages contexts.
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = None
+        self.clicks = 0
+
+    def goto(self, url, wait_until):
+        if "fail" in url:
+            raise RuntimeError("net::ERR_CONNECTION_REFUSED")
+        self.url = url
+        self.clicks = 0  # a new document
+        return types.SimpleNamespace(status=200)
+
+    def wait_for_selector(self, selector):
+        pass
+
+    def locator(self, selector):
+        page = self
+        button = types.SimpleNamespace(is_visible=lambda: page.clicks < 2,
+                                       click=lambda: setattr(page, "clicks", page.clicks + 1))
+        return types.SimpleNamespace(first=button)
+
+    def wait_for_load_state(self, state):
+        pass
+
+    def content(self):
+        return f"<p>{self.url} context={self.context.number} clicks={self.clicks}</p>"
+
+
+class FakeContext:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.routes = []
+
+    def set_default_timeout(self, ms):
+        self.timeout = ms
+
+    def route(self, pattern, handler):
+        self.routes.append(pattern)
+
+    def new_page(self):
+        return FakePage(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    state = types.SimpleNamespace(contexts=[], launches=[], closed=0, fail_launch=False)
+
+    def launch(**options):
+        if state.fail_launch:
+            raise RuntimeError("Executable doesn't exist")
+        state.launches.append(options)
+
+        def new_context(**options):
+            state.contexts.append(FakeContext(len(state.contexts)))
+            return state.contexts[-1]
+        return types.SimpleNamespace(new_context=new_context,
+                                     close=lambda: setattr(state, "closed", state.closed + 1))
+
+    @contextlib.contextmanager
+    def sync_playwright():
+        yield types.SimpleNamespace(chromium=types.SimpleNamespace(launch=launch))
+
+    monkeypatch.setattr(browser, "_sync_playwright", lambda: sync_playwright)
+    return state
+
+
+def test_pages_are_reused_then_recycled(fake):
+    with BrowserPool(size=1, pages_per_context=3, timeout=5) as pool:
+        pages = list(pool.map([f"http://x/{i}" for i in range(7)]))
+    assert [page.url for page in pages] == [f"http://x/{i}" for i in range(7)]
+    assert [page.html.split("context=")[1][0] for page in pages] == list("0001112")
+    assert len(fake.contexts) == 3 and all(context.closed for context in fake.contexts)
+    assert fake.contexts[0].timeout == 5000 and fake.contexts[0].routes == ["**/*"]
+    assert fake.launches == [{"headless": True}] and fake.closed == 1
+
+
+def test_failed_render_gets_a_fresh_context(fake):
+    with BrowserPool(size=1) as pool:
+        assert "context=0" in pool.render("http://x/a").html
+        with pytest.raises(RuntimeError, match="CONNECTION_REFUSED"):
+            pool.render("http://fail/")
+        assert fake.contexts[0].closed
+        assert pool.render("http://x/b") == RenderedPage("http://x/b", 200,
+                                                         "<p>http://x/b context=1 clicks=0</p>")
+
+
+def test_clicks_stop_when_the_button_is_gone(fake):
+    with BrowserPool(size=1, block=()) as pool:
+        assert "clicks=2" in pool.render("http://x/", click="text=Load More", clicks=5).html
+        assert "clicks=1" in pool.render("http://x/", click="text=Load More", clicks=1).html
+    assert fake.contexts[0].routes == []
+
+
+def test_several_browsers_and_close(fake):
+    pool = BrowserPool(size=3)
+    assert len(pool.render_tree("http://x/").xpath("//p")) == 1
+    pool.close()
+    pool.close()
+    assert len(fake.launches) == 3 and fake.closed == 3
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.submit("http://x/")
+
+
+def test_launch_failure_is_raised(fake):
+    fake.fail_launch = True
+    with pytest.raises(RuntimeError, match="Executable"):
+        BrowserPool(size=2)
@@ -0,0 +1,166 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dsstools.scrape.coalesce import CoalescingSession, InFlight, request_key
+
+URL = "https://www.harvardartmuseums.org/browse"
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+def test_request_key():
+    key = request_key(URL, {"offset": 0, "load_amount": 10})
+    assert request_key(URL + "?load_amount=10&offset=0") == key
+    assert request_key("HTTPS://WWW.harvardartmuseums.org:443/browse?offset=0#top",
+                       "load_amount=10") == key
+    assert request_key(URL, [("offset", "0"), ("load_amount", b"10"), ("x", None)]) == key
+    assert request_key(URL, {"offset": 10, "load_amount": 10}) != key
+    assert request_key(URL, {"offset": 0, "load_amount": 10}, "head") != key
+    assert request_key("https://www.harvardartmuseums.org:8443/browse",
+                       {"offset": 0, "load_amount": 10}) != key
+    assert request_key("https://example.org") == ("GET", "https://example.org/", ())
+    assert request_key(URL, {"id": [1, 2]}) == request_key(URL + "?id=1&id=2")
+
+
+class Gate:
+    """A function that blocks until released and counts its calls."""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self, *args):
+        self.calls += 1
+        assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result if self.result is not None else args
+
+
+def run_together(inflight, gate, count, key="page"):
+    with ThreadPoolExecutor(count) as pool:
+        futures = [pool.submit(inflight.call, key, gate, key) for _ in range(count)]
+        wait_for(lambda: inflight.coalesced == count - 1)
+        assert len(inflight) == 1
+        gate.release.set()
+        return [future.exception() or future.result() for future in futures]
+
+
+def test_concurrent_calls_share_one():
+    inflight, gate = InFlight(), Gate()
+    assert run_together(inflight, gate, 5) == [("page",)] * 5
+    assert gate.calls == inflight.calls == 1
+    assert len(inflight) == 0
+    # Nothing is cached: a later call runs again.
+    assert inflight.call("page", lambda key: "again", "page") == "again"
+    assert inflight.calls == 2
+
+
+def test_errors_are_shared():
+    inflight, gate = InFlight(), Gate(error=ConnectionError("reset"))
+    results = run_together(inflight, gate, 3)
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert gate.calls == 1 and len(inflight) == 0
+
+
+def test_different_keys_run_separately():
+    inflight = InFlight()
+    fetch = inflight.wrap(lambda url, offset: (url, offset), key=lambda url, offset: offset)
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(fetch, ["u"] * 4, range(4))) == [("u", i) for i in range(4)]
+    assert inflight.calls == 4 and inflight.coalesced == 0
+
+
+class FakeResponse:
+    def __init__(self, url, params):
+        self.url = url
+        self.params = params
+        self.reads = 0
+
+    @property
+    def content(self):
+        self.reads += 1
+        return b"{}"
+
+
+class FakeSession:
+    def __init__(self):
+        self.sent = []
+        self.release = threading.Event()
+        self.release.set()
+        self.headers = {"User-Agent": "test"}
+        self.closed = False
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        self.sent.append((method, url, params, kwargs))
+        assert self.release.wait(5)
+        return FakeResponse(url, params)
+
+    def close(self):
+        self.closed = True
+
+
+def test_session_shares_concurrent_gets():
+    fake = FakeSession()
+    fake.release.clear()
+    session = CoalescingSession(fake)
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(session.get, URL, params={"offset": 0}, timeout=10)
+                   for _ in range(3)]
+        futures.append(pool.submit(session.get, URL + "?offset=0", timeout=10))
+        wait_for(lambda: session.coalesced == 3)
+        fake.release.set()
+        responses = [future.result() for future in futures]
+    assert len(fake.sent) == 1 and session.requests == 1
+    # Waiting callers get copies of the one response, read once.
+    assert len({id(response) for response in responses}) == 4
+    assert all(response.reads == 1 for response in responses)
+
+
+def test_session_sends_the_rest_alone():
+    fake = FakeSession()
+    with CoalescingSession(fake) as session:
+        session.get(URL, timeout=10)
+        session.get(URL, timeout=10)
+        session.get(URL, auth=("user", "secret"))
+        session.get(URL, stream=True)
+        session.request("POST", URL, data={"q": 1})
+        session.head(URL)
+        assert session.headers == {"User-Agent": "test"}
+    assert fake.closed
+    # Sequential identical requests are both sent; this is not a cache.
+    assert len(fake.sent) == 6
+    assert session.requests == 3 and session.coalesced == 0
+    assert fake.sent[-1][3]["allow_redirects"] is False
+
+
+@pytest.mark.parametrize("other", [
+    {"timeout": 5},
+    {"headers": {"Accept": "application/json"}},
+    {"allow_redirects": False},
+    {"params": {"offset": 10}},
+])
+def test_session_does_not_mix_different_requests(other):
+    fake = FakeSession()
+    fake.release.clear()
+    session = CoalescingSession(fake)
+    base = {"params": {"offset": 0}, "timeout": 10}
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(session.get, URL, **base)
+        wait_for(lambda: len(fake.sent) == 1)
+        second = pool.submit(session.get, URL, **{**base, **other})
+        wait_for(lambda: len(fake.sent) == 2)
+        fake.release.set()
+        first.result(), second.result()
+    assert session.coalesced == 0
@@ -0,0 +1,106 @@
+import bz2
+import gzip
+import lzma
+import struct
+import sys
+
+import pytest
+
+from dsstools.text.compressed import (DecompressingReader, detect_compression, open_text,
+                                      zstd_frames)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+needs_zstandard = pytest.mark.skipif(zstandard is None, reason="needs zstandard")
+
+TEXT = "".join(f"Alice {i} was beginning to get very tired\n" for i in range(20_000))
+COMPRESS = {
+    "gz": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+    "zst": lambda data: zstandard.ZstdCompressor().compress(data),
+}
+
+
+@pytest.mark.parametrize("kind", ["gz", "bz2", "xz",
+                                  pytest.param("zst", marks=needs_zstandard)])
+def test_formats(tmp_path, kind):
+    # The suffix is ignored; the first bytes decide.
+    path = tmp_path / "corpus.dat"
+    path.write_bytes(COMPRESS[kind](("\ufeff" + TEXT).encode()))
+    assert detect_compression(path) == kind
+    with open_text(path) as f:
+        assert f.read() == TEXT
+    with open_text(path) as f:
+        lines = list(f)
+    assert len(lines) == 20_000 and lines[-1] == "Alice 19999 was beginning to get very tired\n"
+
+
+def test_plain_file(tmp_path):
+    path = tmp_path / "corpus.txt.gz"
+    path.write_text(TEXT)
+    assert detect_compression(path) is None
+    with open_text(path) as f:
+        assert f.read() == TEXT
+    with pytest.raises(ValueError):
+        DecompressingReader(path)
+
+
+def test_concatenated_members(tmp_path):
+    path = tmp_path / "corpus.gz"
+    path.write_bytes(gzip.compress(b"first\n") + gzip.compress(b"second\n") + b"\0" * 512)
+    with open_text(path) as f:
+        assert f.read() == "first\nsecond\n"
+
+
+@pytest.mark.parametrize("kind", ["gz", "xz"])
+def test_truncated_file(tmp_path, kind):
+    path = tmp_path / "corpus"
+    path.write_bytes(COMPRESS[kind](TEXT.encode())[:-20])
+    with pytest.raises(EOFError):
+        with open_text(path) as f:
+            f.read()
+
+
+def multi_frame(tmp_path, pieces, skippable=True):
+    compressor = zstandard.ZstdCompressor(write_checksum=True)
+    frames = [compressor.compress(piece.encode()) for piece in pieces]
+    head = struct.pack("<II", 0x184D2A50, 4) + b"pzst" if skippable else b""
+    path = tmp_path / "corpus.zst"
+    path.write_bytes(head + b"".join(frames))
+    return path, head, frames
+
+
+@needs_zstandard
+@pytest.mark.parametrize("threads", [1, 4])
+def test_multi_frame_zstd(tmp_path, threads):
+    pieces = [TEXT[i:i + 50_000] for i in range(0, len(TEXT), 50_000)]
+    path, head, frames = multi_frame(tmp_path, pieces)
+    assert detect_compression(path) == "zst"
+    with open(path, "rb") as f:
+        found = list(zstd_frames(f))
+    offsets = [len(head) + sum(map(len, frames[:i])) for i in range(len(frames))]
+    assert found == list(zip(offsets, map(len, frames)))
+    with open_text(path, threads=threads) as f:
+        assert f.read() == TEXT
+
+
+def test_close_before_end(tmp_path):
+    path = tmp_path / "corpus.xz"
+    path.write_bytes(lzma.compress(TEXT.encode() * 10))
+    reader = DecompressingReader(path, chunk_size=1024, buffers=1)
+    assert reader.read(5) == b"Alice"
+    reader.close()
+    assert reader.closed and not reader._thread.is_alive()
+
+
+@needs_zstandard
+def test_zstandard_missing(tmp_path, monkeypatch):
+    path = tmp_path / "corpus.zst"
+    path.write_bytes(COMPRESS["zst"](b"text"))
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(ImportError, match="pip install zstandard"):
+        open_text(path)
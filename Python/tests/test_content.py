@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+from lxml import html
+
+from dsstools.scrape import fastjson
+from dsstools.scrape.content import declared_encoding, html_tree, lxml_encoding, parse_html
+
+PAGE = "<html><body><h2><a href='/e/1'>Café – Führung</a></h2></body></html>"
+
+
+class FakeResponse:
+    def __init__(self, content, content_type=None, url="https://www.harvardartmuseums.org/calendar"):
+        self.content = content
+        self.headers = {"Content-Type": content_type} if content_type else {}
+        self.url = url
+
+
+@pytest.mark.parametrize("content_type, expected", [
+    ("text/html; charset=ISO-8859-1", "iso-8859-1"),
+    ('text/html; Charset="UTF-8"', "utf-8"),
+    ("application/json;charset='windows-1252'; q=1", "windows-1252"),
+    ("text/html", None),
+    ("text/html; charset=", None),
+    ("text/html; charset=no-such-codec", None),
+    ("", None),
+])
+def test_declared_encoding(content_type, expected):
+    assert declared_encoding(FakeResponse(b"", content_type)) == expected
+    assert declared_encoding({"content-type": content_type}) == expected
+
+
+def test_declared_encoding_without_headers():
+    assert declared_encoding(object()) is None
+
+
+def test_lxml_encoding():
+    assert lxml_encoding(None) is None
+    assert lxml_encoding("utf-8") == "utf-8"
+    # Python aliases that libxml2 may not know still give a working name.
+    for alias in ("latin-1", "utf_8", "cp1252"):
+        html.HTMLParser(encoding=lxml_encoding(alias))
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "iso-8859-15", "cp1252", "utf-16"])
+def test_parse_declared_charset(encoding):
+    text = PAGE.replace("–", "-") if encoding == "iso-8859-15" else PAGE
+    data = text.encode(encoding)
+    for body in (data, memoryview(data)):
+        tree = parse_html(body, encoding)
+        assert tree.xpath("string(//a)") == html.fromstring(text).xpath("string(//a)")
+
+
+def test_parse_meta_charset():
+    # No declared charset: lxml reads <meta charset> instead of guessing latin-1.
+    data = ('<html><head><meta charset="windows-1252"></head>'
+            '<body><p>Café – tour</p></body></html>').encode("windows-1252")
+    assert parse_html(data).xpath("string(//p)") == "Café – tour"
+
+
+def test_parse_str_like_fromstring():
+    assert parse_html(PAGE).xpath("string(//a)") == "Café – Führung"
+
+
+def test_html_tree_from_response():
+    response = FakeResponse(PAGE.encode("utf-8"), "text/html; charset=utf-8")
+    tree = html_tree(response)
+    assert tree.xpath("string(//a)") == "Café – Führung"
+    tree.make_links_absolute()
+    assert tree.xpath("//a/@href") == ["https://www.harvardartmuseums.org/e/1"]
+
+
+def test_parsers_in_threads():
+    data = PAGE.encode("utf-8")
+    results = []
+
+    def parse():
+        for _ in range(50):
+            results.append(parse_html(data, "utf-8").xpath("string(//a)"))
+
+    threads = [threading.Thread(target=parse) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["Café – Führung"] * 200
+
+
+def test_json_in_declared_charset():
+    body = '{"records": [{"title": "Café"}]}'.encode("latin-1")
+    response = FakeResponse(body, "application/json; charset=latin-1")
+    assert fastjson.from_response(response, ("records",)) == [{"title": "Café"}]
+    assert fastjson.from_response(response) == {"records": [{"title": "Café"}]}
+    utf8 = FakeResponse('{"title": "Café"}'.encode("utf-8"), "application/json")
+    assert fastjson.from_response(utf8) == {"title": "Café"}
@@ -0,0 +1,129 @@
+import random
+import re
+import sys
+
+import numpy as np
+import pytest
+
+from dsstools.text.cooccur import NameMatcher, cooccurrence
+from dsstools.text.corpus import Corpus
+
+NAMES = ["Alice", "White Rabbit", "Rabbit", "Mouse", "the Mock Turtle", "Dodo", "ALICE", "Hatter"]
+VOCAB = ["Alice", "alice,", "White", "Rabbit", "rabbit.", "Mouse", "the", "Mock", "Turtle",
+         "Dodo", "said", "and", "was"]
+
+
+def make_text(seed=0, paragraphs=120):
+    rng = random.Random(seed)
+    chapters = []
+    for c in range(4):
+        paras = [" ".join(rng.choice(VOCAB) for _ in range(rng.randrange(1, 15)))
+                 for _ in range(paragraphs // 4)]
+        chapters.append(f"CHAPTER {c + 1}.\n\n" + "\n\n".join(paras))
+    return "Front matter\n\n" + "\n\n".join(chapters)
+
+
+def words(text):
+    return [w.lower() for w in re.findall(r"\w+", text)]
+
+
+def mentions(tokens, name):
+    """Positions where the words of ``name`` start in ``tokens``."""
+    key = words(name)
+    return [i for i in range(len(tokens) - len(key) + 1) if tokens[i:i + len(key)] == key]
+
+
+def brute_force_segments(pieces, names):
+    out = np.zeros((len(names), len(names)), dtype=np.int64)
+    for piece in pieces:
+        tokens = words(piece)
+        present = [bool(mentions(tokens, name)) for name in names]
+        for a, pa in enumerate(present):
+            for b, pb in enumerate(present):
+                out[a, b] += pa and pb
+    return out
+
+
+@pytest.fixture(params=["scipy", "numpy"])
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        monkeypatch.setitem(sys.modules, "scipy", None)  # import fails
+    elif "scipy" not in sys.modules:
+        pytest.importorskip("scipy")
+    return request.param
+
+
+@pytest.mark.parametrize("by", ["paragraph", "chapter"])
+def test_segment_counts(engine, by):
+    corpus = Corpus(make_text())
+    counts = cooccurrence(corpus, NAMES, by=by)
+    pieces = [getattr(corpus, by)(i) for i in range(getattr(corpus, f"n_{by}s"))]
+    assert np.array_equal(counts.to_numpy(), brute_force_segments(pieces, NAMES))
+    assert counts["Alice", "Mouse"] == counts["Mouse", "ALICE"]
+    assert counts["Hatter", "Alice"] == 0
+
+
+def test_window_counts():
+    corpus = Corpus(make_text(seed=1))
+    found, offset = [], 0
+    for i in range(corpus.n_paragraphs):  # names do not run across paragraphs
+        tokens = words(corpus.paragraph(i))
+        found += [(offset + pos, name) for name in dict.fromkeys(n.lower() for n in NAMES)
+                  for pos in mentions(tokens, name)]
+        offset += len(tokens)
+    found.sort()
+    expected = {}
+    for i, (p, a) in enumerate(found):
+        for q, b in found[i + 1:]:
+            if q - p <= 5 and a != b:
+                for pair in ((a, b), (b, a)):
+                    expected[pair] = expected.get(pair, 0) + 1
+    counts = cooccurrence(corpus, NAMES, by=None, window=5)
+    for a in NAMES:
+        for b in NAMES:
+            assert counts[a, b] == expected.get((a.lower(), b.lower()), 0), (a, b)
+
+
+def test_window_within_paragraphs():
+    corpus = Corpus("Alice Mouse\n\nDodo\n\nMouse Dodo Alice")
+    near = cooccurrence(corpus, ["Alice", "Mouse", "Dodo"], window=10)
+    anywhere = cooccurrence(corpus, ["Alice", "Mouse", "Dodo"], by=None, window=10)
+    assert near["Alice", "Mouse"] == 2 and near["Alice", "Dodo"] == 1
+    assert anywhere["Alice", "Dodo"] == 4
+    assert near["Alice", "Alice"] == 0
+
+
+def test_pairs_and_scipy():
+    corpus = Corpus("Alice Mouse\n\nAlice Mouse Dodo\n\nAlice Dodo\n\nAlice Mouse")
+    counts = cooccurrence(corpus, ["Alice", "Mouse", "Dodo", "ALICE"])
+    assert counts.pairs() == [("Alice", "Mouse", 3), ("Alice", "Dodo", 2), ("Mouse", "Dodo", 1)]
+    assert counts.pairs(min_count=2)[-1] == ("Alice", "Dodo", 2)
+    dense = counts.to_numpy()
+    assert dense[0, 0] == 4 and dense[3, 1] == 3
+    pytest.importorskip("scipy")
+    assert np.array_equal(counts.to_scipy().toarray(), dense)
+
+
+def test_names_do_not_span_paragraphs():
+    corpus = Corpus("Alice saw the White\n\nRabbit and the White Rabbit")
+    counts = cooccurrence(corpus, ["Alice", "White Rabbit"], by="chapter")
+    assert counts["White Rabbit", "White Rabbit"] == 1
+    near = cooccurrence(corpus, ["Alice", "White Rabbit"], by=None, window=3)
+    assert near["Alice", "White Rabbit"] == 0
+
+
+def test_name_matcher_multiword_and_unknown():
+    corpus = Corpus("the White Rabbit and the Rabbit, and white rabbits")
+    matcher = NameMatcher(["Rabbit", "White Rabbit", "rabbit", "Cheshire Cat"], corpus.tokenizer)
+    assert matcher.name_term.tolist() == [0, 1, 0, 2]
+    terms, positions = matcher.mentions(corpus.tokens)
+    assert list(zip(terms.tolist(), positions.tolist())) == [(1, 1), (0, 2), (0, 5)]
+
+
+def test_errors():
+    corpus = Corpus("Alice")
+    with pytest.raises(ValueError):
+        cooccurrence(corpus, ["Alice"], by="sentence")
+    with pytest.raises(ValueError):
+        cooccurrence(corpus, ["Alice"], by=None)
+    assert cooccurrence(corpus, []).to_numpy().shape == (0, 0)
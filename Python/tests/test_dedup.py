@@ -0,0 +1,82 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from dsstools.scrape.dedup import CHANGED, NEW, DeltaWriter, RecordIndex, record_hash
+from dsstools.scrape.sinks import quote_identifier
+
+
+def test_record_hash_ignores_key_order():
+    assert record_hash({"a": 1, "b": [1, 2]}) == record_hash({"b": [1, 2], "a": 1})
+    assert record_hash({"a": 1}) != record_hash({"a": "1"})
+
+
+def test_changes_across_runs(tmp_path):
+    path = tmp_path / "index.sqlite"
+    with RecordIndex(path) as index:
+        assert index.changes([{"id": 1, "t": "a"}, {"id": 2, "t": "b"}]) == [
+            (NEW, {"id": 1, "t": "a"}), (NEW, {"id": 2, "t": "b"})]
+        # Overlapping pages in one run: the same record again is dropped.
+        assert index.changes([{"id": 2, "t": "b"}]) == []
+        assert len(index) == 2
+    with RecordIndex(path) as index:
+        assert index.changes([{"id": 1, "t": "a"}, {"id": 2, "t": "B"}, {"id": 3}]) == [
+            (CHANGED, {"id": 2, "t": "B"}), (NEW, {"id": 3})]
+        assert list(index.unseen()) == []
+    with RecordIndex(path) as index:
+        index.changes([{"id": 3}])
+        assert sorted(index.unseen()) == ["1", "2"]
+
+
+def test_failed_run_is_rolled_back(tmp_path):
+    path = tmp_path / "index.sqlite"
+    with pytest.raises(RuntimeError):
+        with RecordIndex(path, key="objectid") as index:
+            index.changes([{"objectid": 7}])
+            raise RuntimeError("crawl failed")
+    with RecordIndex(path, key="objectid") as index:
+        assert index.changes([{"objectid": 7}]) == [(NEW, {"objectid": 7})]
+
+
+def test_many_keys_and_odd_table_names(tmp_path):
+    path = tmp_path / "index.sqlite"
+    table = 'exhibitions "past"'
+    records = [{"id": i} for i in range(2500)]  # more keys than SQLite parameters
+    with RecordIndex(path, table=table) as index:
+        assert len(index.changes(records)) == 2500
+    with RecordIndex(path, table=table) as index:
+        assert index.changes(records) == []
+    tables = [row[0] for row in sqlite3.connect(path).execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert tables == [table]
+
+
+def test_quote_identifier():
+    assert quote_identifier("id") == '"id"'
+    assert quote_identifier('a "b"') == '"a ""b"""'
+
+
+def test_jsonl_delta(tmp_path):
+    path = tmp_path / "delta.jsonl"
+    with DeltaWriter(path) as delta:
+        delta.write([(NEW, {"id": 1, "tags": ["x"]}), (CHANGED, {"id": 2})])
+    assert delta.counts == {NEW: 1, CHANGED: 1}
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert rows == [{"_change": "new", "id": 1, "tags": ["x"]},
+                    {"_change": "changed", "id": 2}]
+
+
+def test_csv_delta_has_every_field(tmp_path):
+    path = tmp_path / "delta.csv"
+    with DeltaWriter(path) as delta:
+        delta.write([(NEW, {"id": 1, "title": "a"})])
+        delta.write([(CHANGED, {"id": 2, "dated": "1990", "people": [{"n": "x"}]})])
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == ["_change", "id", "title", "dated", "people"]
+    assert rows[0] == {"_change": "new", "id": "1", "title": "a", "dated": "", "people": ""}
+    assert rows[1]["dated"] == "1990"
+    assert json.loads(rows[1]["people"]) == [{"n": "x"}]
+    delta.close()  # closing twice is fine
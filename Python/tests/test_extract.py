@@ -0,0 +1,87 @@
+import pytest
+from lxml import html
+
+from dsstools.scrape.extract import TableExtractor, extract_table
+
+FLOOR_PLAN = html.fromstring("""
+<html><body><main><section><ul>
+  <li><div>Level 1</div><div><ul>
+    <li>Cafe <a href="/cafe">more</a></li>
+    <li>  Shop  </li>
+  </ul></div></li>
+  <li><div>Level 2</div><div><ul></ul></div></li>
+  <li><div>Level 3</div><div><ul><li>Gallery</li></ul></div></li>
+</ul></section></main></body></html>
+""")
+LEVELS = "/html/body/main/section/ul/li"
+
+
+def levels_loop(tree):
+    """The workshop's loop, for comparison."""
+    out = []
+    for level in tree.xpath(LEVELS):
+        out.append([li.text_content().strip() for li in level.xpath("div[2]/ul/li")])
+    return out
+
+
+def test_rows_with_container_cells():
+    extractor = TableExtractor(LEVELS, "div[2]/ul/li", container_cells={"level": "div[1]"})
+    assert extractor.extract(FLOOR_PLAN) == {
+        "container": [0, 0, 2],
+        "row": [0, 1, 0],
+        "level": ["Level 1", "Level 1", "Level 3"],
+        "text": ["Cafe more", "Shop", "Gallery"],
+    }
+
+
+def test_nested_matches_loop():
+    extractor = TableExtractor(LEVELS, "div[2]/ul/li")
+    assert extractor.nested(FLOOR_PLAN) == levels_loop(FLOOR_PLAN)
+
+
+def test_attributes_and_missing_cells():
+    table = extract_table(FLOOR_PLAN, LEVELS, "div[2]/ul/li", {"href": "a/@href"})
+    assert table["href"] == ["/cafe", None, None]
+
+
+def test_keep_empty():
+    table = extract_table(FLOOR_PLAN, LEVELS, "div[2]/ul/li",
+                          container_cells={"level": "div[1]"}, keep_empty=True)
+    assert table["container"] == [0, 0, 1, 2]
+    assert table["level"] == ["Level 1", "Level 1", "Level 2", "Level 3"]
+    assert table["text"] == ["Cafe more", "Shop", None, "Gallery"]
+
+
+@pytest.mark.parametrize("path", ["../../../div[1]", "ancestor::li/div[1]",
+                                  "parent::ul/parent::div/preceding-sibling::div"])
+def test_paths_leaving_the_row(path):
+    table = extract_table(FLOOR_PLAN, LEVELS, "div[2]/ul/li", {"level": path})
+    assert table["level"] == ["Level 1", "Level 1", "Level 3"]
+
+
+def test_sibling_axes():
+    table = extract_table(FLOOR_PLAN, LEVELS, "div[2]/ul/li",
+                          {"text": ".", "next": "following-sibling::li"})
+    assert table["next"] == ["Shop", None, None]
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("normalize-space(.)", ["Cafe more", "Shop", "Gallery"]),
+    ("string(a)", ["more", "", ""]),
+    ("count(a)", ["1.0", "0.0", "0.0"]),
+    ("a[contains(@href, 'cafe')]/text()", ["more", None, None]),
+])
+def test_function_paths(path, expected):
+    table = extract_table(FLOOR_PLAN, LEVELS, "div[2]/ul/li", {"value": path})
+    assert table["value"] == expected
+
+
+def test_text_modes():
+    tree = html.fromstring("<ul><li> a \n  b </li></ul>")
+    assert extract_table(tree, "//ul", "li", text="normalize")["text"] == ["a b"]
+    assert extract_table(tree, "//ul", "li", text="raw")["text"] == [" a \n  b "]
+
+
+def test_reserved_names():
+    with pytest.raises(ValueError):
+        TableExtractor(LEVELS, "li", {"row": "."})
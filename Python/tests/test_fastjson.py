@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from dsstools.scrape import fastjson
+
+DOCUMENT = json.dumps({
+    "info": {"pages": 2, "next": "a, b"},
+    "records": [{"id": 1, "title": "café"}, 12.5, "x ]", [1, [2]], None, -3e2, {}],
+    "after": [1, 2],
+}, indent=1, ensure_ascii=False).encode("utf-8")
+RECORDS = json.loads(DOCUMENT)["records"]
+
+
+@pytest.mark.parametrize("split", range(len(DOCUMENT) + 1))
+def test_iter_items_at_every_split(split):
+    chunks = [DOCUMENT[:split], DOCUMENT[split:]]
+    assert list(fastjson.iter_items(chunks)) == RECORDS
+
+
+def test_iter_items_one_byte_at_a_time():
+    chunks = [DOCUMENT[i:i + 1] for i in range(len(DOCUMENT))]
+    assert list(fastjson.iter_items(chunks)) == RECORDS
+
+
+def test_iter_items_truncated():
+    with pytest.raises(ValueError):
+        list(fastjson.iter_items([DOCUMENT[:DOCUMENT.index(b"null")]]))
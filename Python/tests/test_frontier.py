@@ -0,0 +1,155 @@
+import socket
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+from dsstools.scrape import frontier as frontier_module
+from dsstools.scrape.frontier import (Frontier, MemoryBackend, SQLiteBackend, connect_frontier,
+                                      run_worker, serve_frontier)
+from dsstools.scrape.planner import OffsetPagination
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake clock for lease expiry; ``clock.now`` is moved by hand."""
+    clock = types.SimpleNamespace(now=1000.0)
+    clock.time = lambda: clock.now
+    clock.sleep = lambda seconds: setattr(clock, "now", clock.now + seconds)
+    monkeypatch.setattr(frontier_module, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(tmp_path / "crawl.sqlite", table="crawl queue")
+
+
+def test_add_and_complete(backend, clock):
+    frontier = Frontier(backend)
+    assert frontier.add_urls(["a", "b"]) == 2
+    assert frontier.add_urls(["b", "c"]) == 1
+    items = frontier.lease("w1", n=2)
+    assert [item.key for item in items] == ["a", "b"]
+    assert items[0].url == "a" and items[0].attempts == 1
+    assert frontier.complete(items[0], "w1", {"n": 1})
+    assert frontier.counts() == {"pending": 1, "leased": 1, "done": 1, "failed": 0}
+    assert list(frontier.results()) == [("a", {"n": 1})]
+    assert not frontier.finished()
+
+
+def test_expired_lease_is_handed_out_again(backend, clock):
+    frontier = Frontier(backend, ttl=10)
+    frontier.add_urls(["u"])
+    (item,) = frontier.lease("w1")
+    assert frontier.lease("w2") == []  # nothing else to do
+    clock.now += 5
+    assert frontier.extend(item, "w1")  # now expires 10 s from here
+    clock.now += 7
+    assert frontier.lease("w2") == []  # extended: still w1's
+    clock.now += 5
+    (again,) = frontier.lease("w2")
+    assert again.key == item.key and again.attempts == 2
+    # w1 comes back late: its result is refused, w2's is kept.
+    assert not frontier.complete(item, "w1", "late")
+    assert frontier.complete(again, "w2", "on time")
+    assert list(frontier.results()) == [(item.key, "on time")]
+    assert frontier.finished()
+
+
+@pytest.fixture
+def one_item(backend):
+    frontier = Frontier(backend, ttl=10, max_attempts=2)
+    frontier.add_urls(["u"])
+    return frontier
+
+
+def test_expiry_counts_as_an_attempt(one_item, clock):
+    one_item.lease("w1")
+    clock.now += 11
+    one_item.lease("w2")
+    clock.now += 11
+    assert one_item.lease("w3") == []
+    assert one_item.failures() == [("u", "lease expired")]
+    assert one_item.finished()
+
+
+def test_failures_are_retried(one_item, clock):
+    (item,) = one_item.lease("w1")
+    assert one_item.fail(item, "w1", ValueError("boom"))
+    assert one_item.counts()["pending"] == 1
+    (item,) = one_item.lease("w1")
+    assert item.attempts == 2
+    one_item.fail(item, "w1", "boom again")
+    assert one_item.failures() == [("u", "boom again")]
+
+
+def test_add_pages():
+    frontier = Frontier()
+    assert frontier.add_pages("https://x/browse", OffsetPagination("offset", 10), 3,
+                              {"load_amount": 10}) == 3
+    items = frontier.lease("w", n=5)
+    assert [item.params for item in items] == [{"load_amount": 10, "offset": o}
+                                                for o in (0, 10, 20)]
+    assert items[1].key == "https://x/browse?load_amount=10&offset=10"
+
+
+def test_run_worker(backend, clock):
+    frontier = Frontier(backend, max_attempts=2)
+    frontier.add_urls(["ok1", "bad", "ok2"])
+
+    def fetch(item):
+        if item.url == "bad":
+            raise RuntimeError("404")
+        return item.url.upper()
+
+    assert run_worker(frontier, fetch, worker="w") == 2
+    assert dict(frontier.results()) == {"ok1": "OK1", "ok2": "OK2"}
+    assert frontier.failures() == [("bad", "RuntimeError: 404")]
+
+
+def test_server_needs_an_authkey(monkeypatch):
+    monkeypatch.delenv("DSSTOOLS_FRONTIER_AUTHKEY", raising=False)
+    with pytest.raises(ValueError, match="DSSTOOLS_FRONTIER_AUTHKEY"):
+        serve_frontier(("127.0.0.1", 0))
+    with pytest.raises(ValueError):
+        connect_frontier(("127.0.0.1", 0))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_server_with_authkey_from_environment(monkeypatch):
+    monkeypatch.setenv("DSSTOOLS_FRONTIER_AUTHKEY", "s3cret")
+    port = free_port()
+    # The server registers on a class-level registry, so it gets its own process.
+    server = subprocess.Popen(
+        [sys.executable, "-c", "from dsstools.scrape.frontier import serve_frontier; "
+         f"serve_frontier(('127.0.0.1', {port}))"],
+        cwd=str(Path(__file__).resolve().parents[1]),
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        for _ in range(100):
+            try:
+                frontier = connect_frontier(("127.0.0.1", port))
+                break
+            except (ConnectionRefusedError, EOFError):
+                time.sleep(0.05)
+        else:
+            pytest.fail("the frontier server did not start")
+        frontier.add_urls(["a"])
+        (item,) = frontier.lease("remote")
+        assert frontier.complete(item, "remote", [1, 2])
+        assert list(frontier.results()) == [("a", [1, 2])]
+    finally:
+        server.terminate()
+        output = server.communicate(timeout=10)[0]
+    assert b"s3cret" not in output
@@ -0,0 +1,184 @@
+import csv
+import json
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+import pytest
+
+from dsstools.scrape import jobs
+from dsstools.scrape.jobs import JobRunner, load_spec
+
+MUSEUM = "https://www.harvardartmuseums.org"
+CALENDAR = ('<html><body><div id="events_list">'
+            '<article><h2><a>Opening</a></h2><time>May 1</time></article>'
+            '<article><h2><a>Tour</a></h2></article></div></body></html>')
+FLOOR_PLAN = ('<html><body><main><section><ul>'
+              '<li><div>Level 1</div><div><ul><li>Shop</li><li>Cafe</li></ul></div></li>'
+              '<li><div>Level 2</div><div><ul><li>Library</li></ul></div></li>'
+              '</ul></section></main></body></html>')
+
+
+class FakeResponse:
+    def __init__(self, body, status=200, content_type="application/json; charset=utf-8"):
+        self.content = body.encode("utf-8")
+        self.status = status
+        self.headers = {"Content-Type": content_type}
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise OSError(f"HTTP {self.status}")
+
+
+class FakeSession:
+    """Serves the museum pages; ``browse`` has ``total`` records."""
+
+    total = 23
+    created = []
+
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+        self.lock = threading.Lock()
+        FakeSession.created.append(self)
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        with self.lock:
+            self.calls.append((url, dict(params or {}), headers, timeout))
+        response = self.respond(url, params)
+        response.url = url
+        return response
+
+    def respond(self, url, params):
+        path = urlsplit(url).path
+        if path == "/browse":
+            offset, size = params["offset"], params.get("load_amount", 10)
+            ids = range(offset, min(offset + size, self.total))
+            return FakeResponse(json.dumps({"records": [{"id": i} for i in ids]}))
+        if path == "/search/load_more":
+            page = params["page"]
+            records = [{"page": page}] if page <= 3 else []
+            return FakeResponse(json.dumps({"info": {}, "records": records}))
+        if path == "/calendar":
+            return FakeResponse(CALENDAR, content_type="text/html")
+        if path == "/visit/floor-plan":
+            return FakeResponse(FLOOR_PLAN, content_type="text/html")
+        return FakeResponse("{}", status=404)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def runner():
+    FakeSession.created = []
+    with JobRunner({"workers": 3}, session_factory=FakeSession) as runner:
+        yield runner
+
+
+def test_load_spec(tmp_path):
+    pytest.importorskip("yaml")
+    path = tmp_path / "nightly.yaml"
+    path.write_text("defaults: {timeout: 5}\n"
+                    "jobs:\n  - url: https://a.org\n  - {name: b, url: https://b.org}\n")
+    spec = load_spec(path)
+    assert spec["defaults"] == {"timeout": 5}
+    assert [job["name"] for job in spec["jobs"]] == ["job0", "b"]
+    json_path = tmp_path / "nightly.json"
+    json_path.write_text(json.dumps({"jobs": [{"name": "a", "url": "https://a.org"}]}))
+    assert load_spec(json_path)["jobs"][0]["url"] == "https://a.org"
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({"job": []}, "list of 'jobs'"),
+    ({"jobs": [{"name": "a"}]}, "needs a 'url'"),
+    ({"jobs": [{"name": "a", "url": "u"}, {"name": "a", "url": "v"}]}, "used twice"),
+])
+def test_bad_specs(tmp_path, spec, message):
+    path = tmp_path / "spec.json"
+    path.write_text(json.dumps(spec))
+    with pytest.raises(ValueError, match=message):
+        load_spec(path)
+
+
+def test_json_job_with_fixed_pages(runner):
+    job = {"name": "collections", "url": MUSEUM + "/browse", "params": {"load_amount": 10},
+           "pagination": {"type": "offset", "size": 10, "pages": 3}, "timeout": 7}
+    records = runner.run(job)
+    assert [record["id"] for record in records] == list(range(23))
+    [session] = FakeSession.created
+    assert sorted(call[1]["offset"] for call in session.calls) == [0, 10, 20]
+    assert {call[3] for call in session.calls} == {7}
+
+
+def test_auto_pages(runner):
+    job = {"name": "exhibitions", "url": MUSEUM + "/search/load_more",
+           "params": {"type": "past-exhibition"},
+           "pagination": {"type": "page", "param": "page", "pages": "auto"}}
+    assert runner.run(job) == [{"page": 1}, {"page": 2}, {"page": 3}]
+    html_job = {"name": "events", "url": MUSEUM + "/calendar", "container": "//article",
+                "pagination": {"type": "page", "pages": "auto"}}
+    with pytest.raises(ValueError, match="needs a JSON job"):
+        runner.run(html_job)
+
+
+def test_html_jobs_share_extractors_and_sessions(runner):
+    job = {"name": "events", "url": MUSEUM + "/calendar",
+           "container": '//*[@id="events_list"]/article',
+           "fields": {"title": "h2/a", "date": "time"}}
+    assert runner.run(job) == [{"title": "Opening", "date": "May 1"},
+                               {"title": "Tour", "date": ""}]
+    runner.run(dict(job, name="events again"))
+    table = {"name": "floor_plan", "url": MUSEUM + "/visit/floor-plan",
+             "table": {"container": "/html/body/main/section/ul/li", "rows": "div[2]/ul/li",
+                       "cells": {"facility": "."}, "container_cells": {"level": "div[1]"}}}
+    rows = runner.run(table)
+    assert [(row["level"], row["facility"]) for row in rows] == [
+        ("Level 1", "Shop"), ("Level 1", "Cafe"), ("Level 2", "Library")]
+    assert len(runner._extractors) == 2
+    # One session for the host, closed with the runner.
+    assert len(FakeSession.created) == 1
+    assert runner.session(MUSEUM.upper() + "/x") is FakeSession.created[0]
+    runner.close()
+    assert FakeSession.created[0].closed
+
+
+def test_outputs(runner, tmp_path):
+    records = [{"id": 1, "title": "Vase"}, {"id": 2, "title": "Bowl"}]
+    runner.write({"name": "c", "output": str(tmp_path / "c.csv")}, records)
+    with open(tmp_path / "c.csv", newline="") as f:
+        assert list(csv.DictReader(f)) == [{"id": "1", "title": "Vase"},
+                                           {"id": "2", "title": "Bowl"}]
+    runner.write({"name": "c", "output": str(tmp_path / "c.json")}, records)
+    assert json.loads((tmp_path / "c.json").read_text()) == records
+    output = {"path": str(tmp_path / "museum.sqlite"), "index": ["id"]}
+    runner.write({"name": "collection", "output": output}, records)
+    connection = sqlite3.connect(tmp_path / "museum.sqlite")
+    assert connection.execute("SELECT id, title FROM collection").fetchall() == [
+        (1, "Vase"), (2, "Bowl")]
+    connection.close()
+    with pytest.raises(ValueError, match="unsupported output"):
+        runner.write({"name": "c", "output": str(tmp_path / "c.xlsx")}, records)
+
+
+def test_failing_job_does_not_stop_the_others(runner, tmp_path):
+    logs = []
+    results = runner.run_all([
+        {"name": "missing", "url": MUSEUM + "/nowhere"},
+        {"name": "events", "url": MUSEUM + "/calendar", "container": "//article",
+         "fields": {"title": "h2/a"}, "output": str(tmp_path / "events.json")},
+    ], log=logs.append)
+    assert isinstance(results["missing"], OSError)
+    assert results["events"] == 2
+    assert logs[0] == "missing: FAILED OSError: HTTP 404"
+    assert logs[1].startswith(f"events: 2 records -> {tmp_path / 'events.json'}")
+
+
+def test_main(tmp_path, capsys):
+    path = tmp_path / "spec.json"
+    path.write_text(json.dumps({"jobs": [{"name": "a", "url": "https://a.org"},
+                                         {"name": "b", "url": "https://b.org"}]}))
+    assert jobs.main([str(path), "--list", "--only", "b"]) == 0
+    assert capsys.readouterr().out == "b: https://b.org\n"
+    with pytest.raises(SystemExit):
+        jobs.main([str(path), "--only", "c"])
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from dsstools.text.corpus import Corpus
+from dsstools.text.kwic import Concordance, Hit, Page
+
+TEXT = ("Front matter.\n\nCHAPTER I.\n\nThe Mouse said to Alice: 'Mouse!'\n\n"
+        "Alice and the mouse.\n\nCHAPTER II.\n\nThe MOUSE\nran to the Mock Turtle, "
+        "the mock turtle.")
+
+
+@pytest.fixture(scope="module")
+def concordance():
+    return Concordance(Corpus(TEXT))
+
+
+def test_positions_match_tokens_find():
+    rng = random.Random(3)
+    words = ["Alice", "Mouse", "the", "Mock", "Turtle", "said", "and"]
+    text = "\n\n".join(" ".join(rng.choice(words) for _ in range(30)) for _ in range(50))
+    corpus = Corpus(text)
+    concordance = Concordance(corpus)
+    for term in words + ["Mock Turtle", "the Mock Turtle", "Turtle Alice", "Hatter", ""]:
+        assert concordance.positions(term).tolist() == corpus.tokens.find(term).tolist()
+        assert concordance.count(term) == corpus.tokens.count(term)
+
+
+def test_hits_with_context(concordance):
+    page = concordance.search("mouse", width=8)["mouse"]
+    assert isinstance(page, Page) and page.total == 4 and page.pages == 1
+    first = page.hits[0]
+    assert isinstance(first, Hit)
+    assert (first.chapter, first.paragraph) == (1, 2)
+    assert TEXT[first.start:first.end] == "Mouse"
+    assert (first.left, first.match, first.right) == ("I.  The ", "Mouse", " said to")
+    assert str(first) == f"{first.left} [Mouse]  said to"
+    assert [hit.match for hit in page.hits] == ["Mouse", "Mouse", "mouse", "MOUSE"]
+    assert page.hits[-1].right.startswith(" ran")  # newlines are flattened
+
+
+def test_phrases_chapters_and_pages(concordance):
+    results = concordance.search(["Mock Turtle", "Alice", "Hatter"], width=5, chapters=2)
+    assert results["Mock Turtle"].total == 2
+    assert [hit.match for hit in results["Mock Turtle"].hits] == ["Mock Turtle", "mock turtle"]
+    assert results["Alice"].total == 0 and results["Hatter"].hits == []
+    assert concordance.count("Alice", chapters=[0, 1]) == 2
+    pages = [concordance.search("the", page=i, page_size=2)["the"] for i in range(3)]
+    assert [len(p.hits) for p in pages] == [2, 2, 1]
+    assert pages[0].pages == 3
+    assert [h.token for p in pages for h in p.hits] == concordance.positions("the").tolist()
+
+
+def test_phrase_at_the_end(concordance):
+    (hit,) = concordance.search("mock turtle", chapters=2, page=1, page_size=1)["mock turtle"].hits
+    assert hit.match == "mock turtle" and hit.right == "."
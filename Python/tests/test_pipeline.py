@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from dsstools.scrape.pipeline import Pipeline
+
+
+def test_stages_in_order():
+    pipeline = (Pipeline(maxsize=4)
+                .stage("double", lambda x: 2 * x, workers=3)
+                .stage("odd", lambda x: x if x % 4 else None)
+                .stage("split", lambda x: [x, -x], many=True, workers=2))
+    results = list(pipeline.run(range(20)))
+    expected = [y for x in range(20) if (2 * x) % 4 for y in (2 * x, -2 * x)]
+    assert sorted(results) == sorted(expected)
+    assert pipeline.stats["double"]["items"] == 20
+    assert pipeline.stats["odd"]["items"] == 20
+    assert pipeline.stats["split"]["items"] == 10
+
+
+def test_batches():
+    pipeline = Pipeline().stage("same", lambda x: x, workers=2)
+    batches = list(pipeline.batches(range(25), size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert sorted(x for batch in batches for x in batch) == list(range(25))
+
+
+def test_empty_input_and_no_stages():
+    assert list(Pipeline().stage("same", lambda x: x).run([])) == []
+    assert list(Pipeline().run([1, 2])) == [1, 2]
+
+
+def test_needs_a_worker():
+    with pytest.raises(ValueError):
+        Pipeline().stage("none", lambda x: x, workers=0)
+
+
+def failing(x):
+    if x == 7:
+        raise KeyError(x)
+    return x
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_stage_error_reaches_caller(workers):
+    pipeline = Pipeline(maxsize=2).stage("fail", failing, workers=workers)
+    with pytest.raises(KeyError):
+        list(pipeline.run(range(1000)))
+
+
+def test_error_inside_many_generator():
+    def explode(x):
+        yield x
+        raise RuntimeError("bad page")
+
+    pipeline = Pipeline().stage("parse", lambda x: x).stage("events", explode, many=True)
+    with pytest.raises(RuntimeError, match="bad page"):
+        list(pipeline.run(range(5)))
+
+
+def test_error_in_input():
+    def urls():
+        yield 1
+        raise OSError("listing failed")
+
+    with pytest.raises(OSError):
+        list(Pipeline().stage("same", lambda x: x).run(urls()))
+
+
+def test_backpressure_bounds_reading_ahead():
+    pulled = []
+
+    def urls():
+        for i in range(10_000):
+            pulled.append(i)
+            yield i
+
+    results = Pipeline(maxsize=2).stage("a", lambda x: x).stage("b", lambda x: x).run(urls())
+    assert next(results) == 0
+    time.sleep(0.3)
+    # Three queues of two, one item in each stage and one in the feeder.
+    assert len(pulled) <= 10
+    results.close()
+
+
+def test_caller_stopping_early_ends_threads():
+    before = threading.active_count()
+    results = Pipeline(maxsize=1).stage("slow", lambda x: x, workers=4).run(range(10_000))
+    for item, _ in zip(results, range(3)):
+        pass
+    results.close()
+    assert threading.active_count() == before
@@ -0,0 +1,141 @@
+import threading
+
+import pytest
+
+from dsstools.scrape.planner import CrawlPlanner, OffsetPagination, PagePagination
+
+
+class FakeAPI:
+    """A paginated API over ``total`` records that counts its requests."""
+
+    def __init__(self, total, info=None, server_size=None, endless=False):
+        self.total = total
+        self.info = info
+        self.server_size = server_size
+        self.endless = endless
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, params):
+        with self.lock:
+            self.calls.append(params)
+        if "offset" in params:
+            size = self.server_size or params.get("load_amount", 10)
+            start = params["offset"]
+        else:
+            size = self.server_size or 10
+            start = (params["page"] - 1) * size
+        stop = start + size if self.endless else min(start + size, self.total)
+        page = {"records": [{"id": i} for i in range(start, stop)]}
+        if self.info is not None:
+            page["info"] = dict(self.info)
+        return page
+
+
+def offsets(planner):
+    return [params["offset"] for params in planner.fetch.calls]
+
+
+def test_record_total_gives_page_count():
+    api = FakeAPI(45, info={"totalrecords": 45})
+    planner = CrawlPlanner(api, OffsetPagination("offset", size=10, size_param="load_amount"))
+    assert planner.page_count() == 5
+    assert len(api.calls) == 1
+    pages = list(planner.crawl(workers=3))
+    assert [index for index, _ in pages] == [0, 1, 2, 3, 4]
+    assert sum(len(page["records"]) for _, page in pages) == 45
+    # The first page is reused, not requested again.
+    assert sorted(offsets(planner)) == [0, 10, 20, 30, 40]
+
+
+def test_total_preferred_to_reported_pages():
+    # The server reports pages of its own size; the total is what counts.
+    api = FakeAPI(45, info={"totalrecords": 45, "pages": 3})
+    planner = CrawlPlanner(api, OffsetPagination("offset", size=10, size_param="load_amount"))
+    assert planner.page_count() == 5
+
+
+def test_reported_pages_ignored_when_size_differs():
+    # load_amount is ignored: the server sends 20 records a page and says
+    # there are 3 pages, which is wrong for our offsets of 10.
+    api = FakeAPI(50, info={"pages": 3}, server_size=20)
+    planner = CrawlPlanner(api, OffsetPagination("offset", size=10, size_param="load_amount"))
+    assert planner.page_count() == 5
+
+
+def test_reported_pages_used_when_size_matches():
+    api = FakeAPI(30, info={"pages": 3})
+    planner = CrawlPlanner(api, OffsetPagination("offset", size=10, size_param="load_amount"))
+    assert planner.page_count() == 3
+    assert len(api.calls) == 1
+
+
+def test_explicit_paths():
+    api = FakeAPI(25, info={"n": "25"})
+    planner = CrawlPlanner(api, OffsetPagination("offset", size=10),
+                           total_path=("info", "n"))
+    assert planner.page_count() == 3
+
+
+@pytest.mark.parametrize("total", [1, 9, 10, 11, 40, 41, 99, 100, 1000, 1234])
+def test_probing_finds_last_page(total):
+    api = FakeAPI(total)
+    planner = CrawlPlanner(api, OffsetPagination("offset", size=10, size_param="load_amount"))
+    pages = -(-total // 10)
+    assert planner.page_count() == pages
+    # Exponential probing plus binary search, not a linear scan.
+    assert len(api.calls) <= 2 * pages.bit_length() + 2
+    assert planner.plan() == [{"offset": i * 10, "load_amount": 10}
+                              for i in range(pages) if i not in planner.pages]
+    records = [r["id"] for _, page in planner.crawl(workers=4) for r in page["records"]]
+    assert records == list(range(total))
+    # Every page is requested once; the only extra requests are empty probes.
+    assert len(set(offsets(planner))) == len(api.calls)
+    assert set(range(0, pages * 10, 10)) <= set(offsets(planner))
+
+
+def test_empty_first_page():
+    api = FakeAPI(0)
+    planner = CrawlPlanner(api, OffsetPagination())
+    assert planner.page_count() == 0
+    assert list(planner.crawl()) == []
+    assert len(api.calls) == 1
+
+
+def test_max_pages_caps_endless_api():
+    api = FakeAPI(0, endless=True)
+    planner = CrawlPlanner(api, OffsetPagination("offset", size=10), max_pages=20)
+    assert planner.page_count() == 20
+    assert len(list(planner.crawl())) == 20
+
+
+def test_max_pages_caps_reported_total():
+    api = FakeAPI(10_000, info={"totalrecords": 10_000})
+    planner = CrawlPlanner(api, OffsetPagination("offset", size=10), max_pages=7)
+    assert planner.page_count() == 7
+
+
+def test_page_pagination():
+    api = FakeAPI(42)
+    planner = CrawlPlanner(api, PagePagination("page"))
+    assert planner.page_count() == 5
+    pages = list(planner.crawl(workers=2))
+    assert [page["records"][0]["id"] for _, page in pages] == [0, 10, 20, 30, 40]
+    requested = [call["page"] for call in api.calls]
+    assert len(set(requested)) == len(requested)
+    assert {1, 2, 3, 4, 5, 6} <= set(requested)
+
+
+def test_page_pagination_reported_pages():
+    api = FakeAPI(42, info={"pages": 5})
+    assert CrawlPlanner(api, PagePagination("page")).page_count() == 5
+
+
+def test_pagination_params():
+    assert OffsetPagination("offset", 10, "load_amount").params(3) == {
+        "offset": 30, "load_amount": 10}
+    assert OffsetPagination("o", 5, start=2).pages_for(12) == 2
+    assert PagePagination("page").params(0) == {"page": 1}
+    assert PagePagination("page", size=10).pages_for(41) == 5
+    with pytest.raises(ValueError):
+        PagePagination("page").pages_for(41)
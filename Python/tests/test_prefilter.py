@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+import pytest
+
+from dsstools.text import prefilter
+from dsstools.text.corpus import Corpus
+from dsstools.text.prefilter import ParagraphFilter
+from dsstools.text.tokenize import as_codes
+
+WORDS = ["Alice", "Eaglet", "Mouse", "Dodo", "the", "said", "Lory", "Ænima",
+         "über", "café", "ДОДО", "🐭mouse", "ab", "a"]
+
+
+def paragraphs(n=300, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randrange(0, 25)))
+            for _ in range(n)]
+
+
+def brute_force(texts, term):
+    return np.array([i for i, text in enumerate(texts) if term in text], dtype=np.int64)
+
+
+@pytest.mark.parametrize("bits", [None, 8, 64])
+def test_same_as_substring_checks(bits):
+    texts = paragraphs()
+    filt = ParagraphFilter.from_paragraphs(texts, bits=bits)
+    assert len(filt) == len(texts)
+    for term in WORDS + ["Alice said", "Mouse the", "Hatter", "🐭", ""]:
+        assert filt.find(term).tolist() == brute_force(texts, term).tolist(), term
+        assert set(filt.find(term)) <= set(filt.candidates(term))
+        assert filt.counts(term).tolist() == [text.count(term) for text in texts]
+
+
+def test_small_chunks(monkeypatch):
+    # Paragraphs are hashed in groups of CHUNK_CHARS characters.
+    monkeypatch.setattr(prefilter, "CHUNK_CHARS", 100)
+    texts = paragraphs(seed=1)
+    filt = ParagraphFilter.from_paragraphs(texts, bits=64)
+    for term in ["Alice", "café", "🐭mouse", "Dodo said"]:
+        assert filt.find(term).tolist() == brute_force(texts, term).tolist()
+
+
+def test_combinations():
+    texts = paragraphs(seed=2)
+    filt = ParagraphFilter.from_paragraphs(texts)
+    names = ["Alice", "Mouse", "Lory"]
+    assert filt.any_of(names).tolist() == [
+        i for i, t in enumerate(texts) if any(n in t for n in names)]
+    assert filt.all_of(names).tolist() == [
+        i for i, t in enumerate(texts) if all(n in t for n in names)]
+    assert filt.all_of([]).tolist() == list(range(len(texts)))
+    matrix = filt.mention_matrix(names)
+    assert matrix.tolist() == [[n in t for n in names] for t in texts]
+    assert filt.contains("Alice").tolist() == [("Alice" in t) for t in texts]
+
+
+def test_constructors_agree():
+    texts = ["Alice was", "", "beginning to get\nvery tired", "of sitting by her sister"]
+    text = "\n\n".join(texts)
+    by_list = ParagraphFilter.from_paragraphs(texts)
+    by_text = ParagraphFilter.from_text(text)
+    by_corpus = ParagraphFilter.from_corpus(Corpus(text))
+    for filt in (by_list, by_text, by_corpus):
+        assert [filt.paragraph(i) for i in range(len(filt))] == texts
+        assert filt.find("sister").tolist() == [3]
+
+
+def test_bad_sizes():
+    with pytest.raises(ValueError):
+        ParagraphFilter.from_paragraphs(["x"], bits=12)
+    with pytest.raises(ValueError):
+        ParagraphFilter.from_paragraphs(["x"], bits=1 << 30, hashes=3)
+
+
+@pytest.mark.parametrize("text, dtype", [("abc", np.uint8), ("café", np.uint8),
+                                         ("ДОДО", np.uint16), ("a🐭b", np.uint32)])
+def test_as_codes(text, dtype):
+    codes = as_codes(text)
+    assert codes.dtype == dtype
+    assert codes.tolist() == [ord(c) for c in text]
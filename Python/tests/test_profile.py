@@ -0,0 +1,79 @@
+import time
+import tracemalloc
+
+import pytest
+
+from dsstools.text.profile import Profiler
+
+
+def test_nested_stages():
+    profiler = Profiler(memory=False)
+    for _ in range(2):
+        with profiler.stage("chapters"):
+            with profiler.stage("count Alice") as stats:
+                time.sleep(0.01)
+            assert stats.name == "chapters;count Alice"
+    assert list(profiler.stages) == [("chapters",), ("chapters", "count Alice")]
+    outer = profiler.stages[("chapters",)]
+    inner = profiler.stages[("chapters", "count Alice")]
+    assert outer.calls == inner.calls == 2
+    assert inner.wall >= 0.02
+    assert outer.child_wall == pytest.approx(inner.wall)
+    assert 0 <= outer.self_wall < outer.wall
+
+
+def test_memory():
+    assert not tracemalloc.is_tracing()
+    profiler = Profiler()
+    with profiler.stage("read"):
+        kept = bytearray(2_000_000)
+        with profiler.stage("temporary"):
+            temporary = bytearray(5_000_000)
+            del temporary
+    # Tracing started by the profiler stops with its last stage.
+    assert not tracemalloc.is_tracing()
+    read = profiler.stages[("read",)]
+    temporary = profiler.stages[("read", "temporary")]
+    assert 2_000_000 <= read.alloc < 2_500_000
+    assert abs(temporary.alloc) < 100_000
+    assert temporary.peak >= 5_000_000
+    # A nested stage's peak counts towards its parent.
+    assert read.peak >= 7_000_000
+    del kept
+
+
+def test_error_in_stage_still_recorded():
+    profiler = Profiler(memory=False)
+    with pytest.raises(ValueError):
+        with profiler.stage("parse"):
+            raise ValueError
+    assert profiler.stages[("parse",)].calls == 1
+    with profiler.stage("next"):
+        pass
+    assert ("next",) in profiler.stages
+
+
+def test_summary_and_collapsed(tmp_path):
+    profiler = Profiler()
+    with profiler.stage("read"):
+        time.sleep(0.002)
+    with profiler.stage("split words"):
+        with profiler.stage("lower"):
+            time.sleep(0.005)
+    lines = profiler.summary().splitlines()
+    assert lines[0].split()[:3] == ["stage", "calls", "wall"]
+    assert "peak MB" in lines[0]
+    assert [line.split()[0] for line in lines[2:]] == ["read", "split", "lower"]
+    assert lines[4].startswith("  lower")
+    assert Profiler(memory=False).summary().count("MB") == 0
+    by_wall = profiler.summary(sort="wall").splitlines()[2:]
+    assert by_wall[0].startswith("split words")
+
+    folded = profiler.collapsed()
+    entries = dict(line.rsplit(" ", 1) for line in folded.splitlines())
+    assert set(entries) <= {"read", "split_words", "split_words;lower"}
+    assert {"read", "split_words;lower"} <= set(entries)
+    assert int(entries["read"]) >= 2000
+    path = tmp_path / "intro.folded"
+    profiler.write_collapsed(path)
+    assert path.read_text() == folded
@@ -0,0 +1,103 @@
+import json
+import math
+
+import pandas as pd
+import pytest
+
+from dsstools.scrape.records import RecordBatchBuilder, infer_type
+
+
+def page(records):
+    return json.dumps({"records": records}).encode()
+
+
+def test_schema_from_first_page_and_nulls():
+    builder = RecordBatchBuilder()
+    builder.add_page(page([{"id": 1, "title": "a", "rank": 0.5, "seen": True}]))
+    builder.add_page(page([{"id": 2, "rank": None, "extra": [1]}, {"title": "c"}]))
+    assert builder.schema == {"id": "int", "title": "str", "rank": "float", "seen": "bool"}
+    assert builder.ignored_fields == {"extra"}
+    frame = builder.to_frame()
+    assert len(frame) == len(builder) == 3
+    assert str(frame["id"].dtype) == "Int64"
+    assert frame["id"].isna().tolist() == [False, False, True]
+    assert frame["title"].isna().tolist() == [False, True, False]
+    assert math.isnan(frame["rank"][1])
+    assert frame["seen"].tolist()[0] is True
+    assert frame["seen"].isna().tolist() == [False, True, True]
+
+
+def test_type_of_first_non_null_value():
+    builder = RecordBatchBuilder()
+    builder.extend([{"a": None, "b": None}, {"a": 1, "b": None}])
+    builder.extend([{"a": 2, "b": 3}])
+    assert builder.schema == {"a": "int", "b": "object"}
+    assert builder.to_frame()["b"].tolist() == [None, None, 3]
+
+
+@pytest.mark.parametrize("values, kind, expected", [
+    ([1, 2.5], "float", [1.0, 2.5]),
+    ([1, 2.0], "int", [1, 2]),
+    ([1, 1 << 70], "object", [1, 1 << 70]),
+    ([-(1 << 63), None, 1 << 64], "object", [-(1 << 63), None, 1 << 64]),
+])
+def test_int_widening(values, kind, expected):
+    builder = RecordBatchBuilder({"n": "int"})
+    for value in values:  # one page per value, so the column widens mid-way
+        builder.add_page([{"n": value}], path=())
+    assert builder.schema == {"n": kind}
+    result = builder.to_frame()["n"].tolist()
+    assert [None if v is None or v != v else v for v in result] == expected
+
+
+def test_int_widening_within_a_page():
+    builder = RecordBatchBuilder({"n": int})
+    builder.extend([{"n": 1}, {"n": None}, {"n": 2.5}])
+    assert builder.schema == {"n": "float"}
+    assert builder.to_frame()["n"].tolist()[::2] == [1.0, 2.5]
+
+
+@pytest.mark.parametrize("values, kind, expected", [
+    ([True, False, None], "bool", [True, False, None]),
+    ([True, 0, 1], "bool", [True, False, True]),
+    ([True, "false"], "object", [True, "false"]),
+    ([False, None, 5], "object", [False, None, 5]),
+])
+def test_bool_column(values, kind, expected):
+    builder = RecordBatchBuilder({"flag": "bool"})
+    builder.extend([{"flag": value} for value in values])
+    assert builder.schema == {"flag": kind}
+    result = builder.to_frame()["flag"].tolist()
+    assert [None if v is pd.NA else v for v in result] == expected
+
+
+def test_bool_column_across_pages():
+    builder = RecordBatchBuilder({"flag": "bool"})
+    builder.extend([{"flag": True}, {"flag": None}])
+    builder.extend([{"flag": "no"}])
+    assert builder.schema == {"flag": "object"}
+    assert builder.to_frame()["flag"].tolist() == [True, None, "no"]
+
+
+def test_str_column_converts_and_object_keeps():
+    builder = RecordBatchBuilder({"s": "str", "o": object})
+    builder.extend([{"s": 1, "o": {"a": 1}}, {"s": "x", "o": [1]}])
+    frame = builder.to_frame()
+    assert frame["s"].tolist() == ["1", "x"]
+    assert frame["o"].tolist() == [{"a": 1}, [1]]
+
+
+def test_to_arrow():
+    builder = RecordBatchBuilder()
+    builder.extend([{"id": 1, "tags": ["a"], "ok": True}, {"id": None, "tags": None, "ok": None}])
+    table = builder.to_arrow()
+    assert table.column("id").to_pylist() == [1, None]
+    assert table.column("tags").to_pylist() == ['["a"]', None]
+    assert table.column("ok").to_pylist() == [True, None]
+
+
+def test_schema_checks():
+    with pytest.raises(ValueError):
+        RecordBatchBuilder({"a": "date"})
+    assert [infer_type(v) for v in (True, 1, 1.0, "", [], None)] == [
+        "bool", "int", "float", "str", "object", "object"]
@@ -0,0 +1,116 @@
+import csv
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import dsstools.scrape
+import dsstools.text
+from dsstools.scrape import workflow
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+HEAVY = ("numpy", "pandas", "lxml", "requests", "pyarrow", "scipy")
+
+
+def loaded_after(code):
+    """Heavy modules loaded by running ``code`` in a fresh interpreter."""
+    check = f"{code}\nimport sys\nprint(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], cwd=PYTHON_DIR,
+                            capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+def test_imports_are_light():
+    assert loaded_after("import dsstools.scrape, dsstools.text, dsstools.scrape.workflow") == set()
+    assert loaded_after("from dsstools.scrape import Pipeline, RecordIndex, CrawlPlanner") == set()
+    assert loaded_after("from dsstools.text import Corpus") == {"numpy"}
+
+
+def test_help_loads_nothing_heavy():
+    code = ("import contextlib, io\n"
+            "from dsstools.scrape.workflow import main\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            "    try:\n        main(['--help'])\n    except SystemExit:\n        pass")
+    assert loaded_after(code) == set()
+
+
+@pytest.mark.parametrize("package", [dsstools.scrape, dsstools.text])
+def test_every_export_resolves(package):
+    # Without playwright too: it is imported only when a browser starts.
+    for name in package.__all__:
+        assert getattr(package, name) is not None
+    assert set(package.__all__) <= set(dir(package))
+    with pytest.raises(AttributeError):
+        package.no_such_name
+
+
+class FakeResponse:
+    def __init__(self, body, content_type="application/json"):
+        self.content = body.encode("utf-8") if isinstance(body, str) else body
+        self.headers = {"Content-Type": content_type}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, params, timeout))
+        return self.respond(url, params)
+
+
+def test_collections_pages():
+    session = FakeSession(lambda url, params: FakeResponse(json.dumps(
+        {"info": {}, "records": [{"id": params["offset"] + i} for i in range(2)]})))
+    records = workflow.collections(pages=3, load_amount=2, session=session, timeout=7)
+    assert [record["id"] for record in records] == [0, 1, 2, 3, 4, 5]
+    assert session.calls[-1] == (workflow.COLLECTION_URL, {"load_amount": 2, "offset": 4}, 7)
+
+
+def test_exhibitions_pages():
+    session = FakeSession(lambda url, params: FakeResponse(json.dumps(
+        {"records": [{"page": params["page"], "type": params["type"]}]})))
+    records = workflow.exhibitions(pages=2, session=session)
+    assert records == [{"page": 1, "type": "past-exhibition"},
+                       {"page": 2, "type": "past-exhibition"}]
+
+
+def test_events_from_declared_charset():
+    page = ('<html><body><div id="events_list"><article><div><div><header>'
+            '<time>1 mai</time><h2><a>Café</a></h2></header></div></div></article>'
+            '</div></body></html>').encode("latin-1")
+    session = FakeSession(lambda url, params: FakeResponse(page, "text/html; charset=ISO-8859-1"))
+    [event] = workflow.events(session=session)
+    assert event["title"] == "Café" and event["date"] == "1 mai"
+    assert event["figcaption"] == ""
+
+
+def test_write_records(tmp_path, capsys):
+    records = [{"id": 1, "people": [{"name": "A"}]}, {"id": 2, "title": "Vase"}]
+    workflow.write_records(records, tmp_path / "out.json")
+    assert json.loads((tmp_path / "out.json").read_text()) == records
+    workflow.write_records(records, tmp_path / "out.csv")
+    with open(tmp_path / "out.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows == [{"id": "1", "people": '[{"name": "A"}]', "title": ""},
+                    {"id": "2", "people": "", "title": "Vase"}]
+    workflow.write_records(records[1:])
+    assert capsys.readouterr().out.splitlines()[0] == "id,title"
+
+
+def test_main_options_after_step(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(workflow, "collections", lambda *args, **kwargs: calls.append(
+        (args, kwargs)) or [{"id": 1}])
+    out = tmp_path / "records_final.csv"
+    workflow.main(["collections", "--pages", "2", "--out", str(out), "--timeout", "5"])
+    assert calls == [((2, 10), {"timeout": 5.0})]
+    assert out.read_text().splitlines() == ["id", "1"]
+    with pytest.raises(SystemExit):
+        workflow.main(["no-such-step"])
@@ -0,0 +1,86 @@
+import json
+import sqlite3
+
+import pandas as pd
+
+from dsstools.scrape.sinks import SQLiteSink, quote_identifier
+
+
+def rows(path, sql):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(sql).fetchall()
+    finally:
+        connection.close()
+
+
+def column_types(path, table):
+    return {row[1]: row[2] for row in rows(path, f"PRAGMA table_info({quote_identifier(table)})")}
+
+
+def test_records_in_batches(tmp_path):
+    path = tmp_path / "museum.sqlite"
+    with SQLiteSink(path, "collection", batch_size=5) as sink:
+        for offset in range(0, 10, 3):
+            sink.write_records({"id": i, "title": f"t{i}"} for i in range(offset, min(offset + 3, 10)))
+        # Pending rows are written once they reach a batch (after the
+        # second page); the last four wait for close().
+        assert sink.rows_written == 6
+    assert sink.rows_written == 10
+    assert rows(path, "SELECT id, title FROM collection ORDER BY id") == [
+        (i, f"t{i}") for i in range(10)]
+
+
+def test_column_types_and_nested_values(tmp_path):
+    path = tmp_path / "museum.sqlite"
+    with SQLiteSink(path, "collection") as sink:
+        sink.write_records([{"id": 1, "rank": None, "ok": True, "people": [{"name": "A"}]},
+                            {"id": 2, "rank": 2.5, "ok": False, "people": []}])
+    assert column_types(path, "collection") == {
+        "id": "INTEGER", "rank": "REAL", "ok": "INTEGER", "people": "TEXT"}
+    stored = rows(path, "SELECT rank, ok, people FROM collection ORDER BY id")
+    assert stored[0][0] is None and stored[1][0] == 2.5
+    assert [row[1] for row in stored] == [1, 0]
+    assert json.loads(stored[0][2]) == [{"name": "A"}]
+
+
+def test_new_fields_become_columns(tmp_path):
+    path = tmp_path / "museum.sqlite"
+    with SQLiteSink(path, "collection") as sink:
+        sink.write_records([{"id": 1}])
+        sink.write_records([{"id": 2, "title": "Vase"}])
+    assert rows(path, "SELECT id, title FROM collection ORDER BY id") == [(1, None), (2, "Vase")]
+    # Appending later reuses the existing table and its columns.
+    with SQLiteSink(path, "collection") as sink:
+        assert sink.columns == ["id", "title"]
+        sink.write_records([{"id": 3, "year": 1900}])
+    assert rows(path, "SELECT id, title, year FROM collection ORDER BY id") == [
+        (1, None, None), (2, "Vase", None), (3, None, 1900)]
+
+
+def test_replace_and_indexes(tmp_path):
+    path = tmp_path / "museum.sqlite"
+    with SQLiteSink(path, "collection") as sink:
+        sink.write_records([{"id": 1}, {"id": 2}])
+    with SQLiteSink(path, "collection", index=["id", "missing"], replace=True) as sink:
+        sink.write_records([{"id": 3}])
+    assert rows(path, "SELECT id FROM collection") == [(3,)]
+    indexes = rows(path, "SELECT name FROM sqlite_master WHERE type = 'index'")
+    assert indexes == [("idx_collection_id",)]
+
+
+def test_awkward_names(tmp_path):
+    path = tmp_path / "museum.sqlite"
+    with SQLiteSink(path, 'crawl "queue"', index=["item id"]) as sink:
+        sink.write_records([{"item id": 1, "select": "x"}])
+    assert rows(path, 'SELECT "item id", "select" FROM "crawl ""queue"""') == [(1, "x")]
+
+
+def test_columns_and_frames(tmp_path):
+    path = tmp_path / "events.sqlite"
+    with SQLiteSink(path, "events") as sink:
+        sink.write_columns({"date": ["May 1", "May 2"], "title": ["Opening", "Tour"]})
+        sink.write_frame(pd.DataFrame({"date": ["May 3"], "title": ["Gala"]}))
+        sink.write_records([])
+    assert rows(path, "SELECT date, title FROM events") == [
+        ("May 1", "Opening"), ("May 2", "Tour"), ("May 3", "Gala")]
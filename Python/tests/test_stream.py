@@ -0,0 +1,105 @@
+import pytest
+from lxml import html
+
+from dsstools.scrape.stream import StreamSelector
+
+CALENDAR = """<!DOCTYPE html>
+<html><head><title>Calendar</title></head><body>
+<nav><article><h2><a>Not an event</a></h2></article></nav>
+<div id="events_list">
+  <article><div><div><header><time>May 1</time><h2><a href="/e/1">Opening</a></h2></header>
+    <div><p><time>10:00</time></p><p>x</p><p> Talk </p></div></div></div></article>
+  <article><div><div><header><h2><a href="/e/2">Tour</a></h2></header></div></div></article>
+  <article class="featured"><div><div><header><time>May 3</time>
+    <h2><a href="/e/3?a=/b">Gala</a></h2></header></div></div></article>
+</div>
+</body></html>
+"""
+CONTAINER = '//*[@id="events_list"]/article'
+FIELDS = {
+    "date": "div/div/header/time",
+    "title": "div/div/header/h2/a",
+    "time": "div/div/div/p[1]/time",
+    "description": "div/div/div/p[3]",
+    "link": "div/div/header/h2/a/@href",
+}
+
+
+def event_info(tree):
+    """The workshop's get_event_info, for comparison."""
+    out = []
+    for event in tree.xpath(CONTAINER):
+        record = {}
+        for name, path in FIELDS.items():
+            found = event.xpath(path)
+            if not found:
+                record[name] = ""
+            elif isinstance(found[0], str):
+                record[name] = found[0].strip()
+            else:
+                record[name] = found[0].text_content().strip()
+        out.append(record)
+    return out
+
+
+def chunks(text, size):
+    data = text.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_matches_xpath():
+    records = StreamSelector(CONTAINER, FIELDS).extract(CALENDAR)
+    assert records == event_info(html.fromstring(CALENDAR))
+    assert [r["title"] for r in records] == ["Opening", "Tour", "Gala"]
+    assert records[1]["date"] == ""
+
+
+@pytest.mark.parametrize("size", [1, 7, 64])
+def test_streamed_chunks(size):
+    selector = StreamSelector(CONTAINER, FIELDS)
+    assert list(selector.iter_records(chunks(CALENDAR, size))) == selector.extract(CALENDAR)
+
+
+@pytest.mark.parametrize("container, titles", [
+    ("//div/article[2]", ["Tour"]),
+    ("/html/body/div/*[3]", ["Gala"]),
+    ('article[@class="featured"]', ["Gala"]),
+    ("//article[@class]", ["Gala"]),
+    ("//nav/article", ["Not an event"]),
+    ('//article[.//a[@href="/e/1"]]', None),
+])
+def test_container_paths(container, titles):
+    if titles is None:
+        with pytest.raises(ValueError):
+            StreamSelector(container, {})
+        return
+    records = StreamSelector(container, {"title": "div/div/header/h2/a | h2/a"}).extract(CALENDAR)
+    assert [r["title"] for r in records] == titles
+
+
+def test_quoted_predicates():
+    page = ('<div><a href="/x">one</a><a href="/y">two</a>'
+            '<a title="a]b/c">three</a></div>')
+    assert StreamSelector('//a[@href="/x"]', {"t": "."}).extract(page) == [{"t": "one"}]
+    assert StreamSelector("div/a[@title='a]b/c']", {"t": "."}).extract(page) == [{"t": "three"}]
+    with pytest.raises(ValueError):
+        StreamSelector('//a[@href="/x]', {})
+
+
+def test_positions_after_freeing():
+    # Earlier siblings are freed before later ones start.
+    page = "<ul>" + "".join(f"<li><b>{i}</b></li>" for i in range(1, 6)) + "</ul>"
+    assert StreamSelector("//li[4]", {"n": "b"}).extract(page) == [{"n": "4"}]
+
+
+def test_finished_elements_are_freed():
+    # A field counting every element left in the document when the
+    # container ends: earlier sections and containers must be gone.
+    page = ("<html><body><section>" + "<p>filler</p>" * 200 + "</section><div>"
+            + "<article><b>a</b></article>" * 50 + "</div></body></html>")
+    selector = StreamSelector("//div/article", {"left": "count(//*)"})
+    counts = [int(float(r["left"])) for r in selector.iter_records(chunks(page, 50))]
+    assert len(counts) == 50
+    # html, body, div, the container and its <b>, emptied elements left at
+    # each level, and whatever the parser has read ahead in the chunk.
+    assert max(counts) < 20
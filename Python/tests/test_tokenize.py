@@ -0,0 +1,121 @@
+import random
+
+import numpy as np
+import pytest
+
+from dsstools.text import tokenize
+from dsstools.text.tokenize import Tokenizer
+
+APOSTROPHES = "'’"
+
+
+def reference(text, lowercase=True):
+    """Words as (start, end, normalized), one character at a time."""
+    def is_word(i):
+        ch = text[i]
+        if ch in APOSTROPHES:
+            return 0 < i < len(text) - 1 and text[i - 1].isalnum() and text[i + 1].isalnum()
+        return ch.isalnum()
+
+    def fold(ch):
+        if ch in APOSTROPHES:
+            return "'"
+        low = ch.lower()
+        return low if lowercase and len(low) == 1 else ch
+
+    words, start = [], None
+    for i in range(len(text) + 1):
+        inside = i < len(text) and is_word(i)
+        if inside and start is None:
+            start = i
+        elif not inside and start is not None:
+            words.append((start, i, "".join(map(fold, text[start:i]))))
+            start = None
+    return words
+
+
+SAMPLES = [
+    "Alice was beginning to get very tired of sitting by her sister",
+    "'Curiouser and curiouser!' cried Alice (she was so much surprised...",
+    "Alice's, ALICE, alice; don’t 'tis rock'n'roll' -- ''",
+    "café Ærø naïve ÜBER straße",           # Latin-1 and beyond
+    "Додо и Мышь — ДОДО",                      # BMP
+    "🐭 mouse🐭Mouse 𝔄lice",                  # astral code points
+    "İstanbul ΣΊΣΥΦΟΣ",                        # multi-character lowercase
+    "", "   ", "'", "a", "x'",
+]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+@pytest.mark.parametrize("lowercase", [True, False])
+def test_offsets_and_normalisation(text, lowercase):
+    tokenizer = Tokenizer(lowercase=lowercase)
+    tokens = tokenizer.tokenize(text)
+    expected = reference(text, lowercase)
+    assert list(zip(tokens.starts.tolist(), tokens.ends.tolist())) == [
+        (s, e) for s, e, _ in expected]
+    assert [tokens.vocabulary[i] for i in tokens.ids] == [w for _, _, w in expected]
+    assert [tokens[i] for i in range(len(tokens))] == [text[s:e] for s, e, _ in expected]
+
+
+def test_case_and_apostrophes_fold_together():
+    tokens = Tokenizer().tokenize("Alice, ALICE alice. Alice’s alice's")
+    assert tokens.count("Alice") == 3
+    assert tokens.count("ALICE'S") == 2
+    assert tokens.unique_count() == 2
+    assert tokens.most_common(1) == [("alice", 3)]
+    assert Tokenizer(lowercase=False).tokenize("Alice ALICE").unique_count() == 2
+
+
+def test_phrases_and_unknown_words():
+    tokenizer = Tokenizer()
+    tokens = tokenizer.tokenize("the Mock Turtle said to the mock turtle")
+    assert tokens.find("mock turtle").tolist() == [1, 6]
+    assert tokens.count("Hatter") == 0 and tokens.count("") == 0
+    assert tokenizer.encode("turtle Hatter").tolist()[1] == -1
+    assert len(tokenizer.vocabulary) == 5  # encode() adds nothing
+
+
+def test_vocabulary_is_shared():
+    tokenizer = Tokenizer()
+    first = tokenizer.tokenize("Alice and the Dodo")
+    second = tokenizer.tokenize("the Dodo and the Lory")
+    assert first.ids[3] == second.ids[1]
+    assert len(tokenizer.vocabulary) == 5
+    assert tokenizer.vocabulary.id_of("lory") == second.ids[-1]
+    assert first.counts().tolist()[-1] == 0  # "lory" is not in the first text
+
+
+def test_vocabulary_growth_keeps_ids():
+    # A later text with many new words grows the vocabulary's lookup cache.
+    tokenizer = Tokenizer()
+    tokenizer.tokenize("alice")
+    words = [f"w{i}" for i in range(3000)]
+    tokens = tokenizer.tokenize(" ".join(words))
+    assert [tokens.vocabulary[i] for i in tokens.ids] == words
+    assert tokenizer.encode("w2999 alice").tolist() == [tokenizer.vocabulary.id_of("w2999"), 0]
+
+
+@pytest.mark.parametrize("alphabet", ["ab c,'\n", "aé ’Д,", "a🐭 Ω,"])
+def test_chunked_texts(monkeypatch, alphabet):
+    # Long texts are hashed in chunks that must not split words.
+    monkeypatch.setattr(tokenize, "CHUNK_CHARS", 2048)
+    rng = random.Random(len(alphabet))
+    text = "".join(rng.choice(alphabet) for _ in range(20_000))
+    tokens = Tokenizer().tokenize(text)
+    expected = reference(text)
+    assert np.array_equal(tokens.starts, [s for s, _, _ in expected])
+    assert np.array_equal(tokens.ends, [e for _, e, _ in expected])
+    assert [tokens.vocabulary[i] for i in tokens.ids] == [w for _, _, w in expected]
+
+
+def test_alice(tmp_path):
+    path = tokenize.__file__.replace("dsstools/text/tokenize.py",
+                                     "PythonIntro/Alice_in_wonderland.txt")
+    try:
+        text = open(path, encoding="utf-8-sig").read()
+    except FileNotFoundError:
+        pytest.skip("needs the intro's Alice_in_wonderland.txt")
+    tokens = Tokenizer().tokenize(text)
+    assert len(tokens) == len(reference(text))
+    assert tokens.count("Alice") == sum(w == "alice" for _, _, w in reference(text))
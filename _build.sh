@@ -5,22 +5,22 @@
 
 set -ev
 
+# With --incremental, keep previous outputs and rebuild only those whose sources
+# changed since the last build (content hashes are kept in build_scripts/.build_state.json)
+if [ "$1" = "--incremental" ]; then
+  python3 build_scripts/build.py --incremental --book
+  exit 0
+fi
+
 # remove docs and _bookdown_files directories before re-compiling
 rm -rf docs _bookdown_files
 
-# remove previous .zip, .r, .py, .do, and .ipynb files throughout directory tree
-find ./ -type f \( -iname \*.zip -o -iname \*.py \) -delete  #  -o -iname \*.r     #  -o -iname \*.do     # -o -iname \*.ipynb
-
-Rscript -e "bookdown::render_book('rmd_files', 'bookdown::gitbook')"
-Rscript -e "bookdown::render_book('rmd_files', 'bookdown::pdf_book')"
-Rscript -e "bookdown::render_book('rmd_files', 'bookdown::epub_book')"
-
-# copy .nojekyll into docs directory
-cp .nojekyll docs/
-
-# remove temp .rds and .log files
-rm -rf *.rds *.log *.RData
+# remove previous .r, .py, .do, and .ipynb files throughout directory tree
+# (Python/dsstools, Python/tests and build_scripts hold hand-written modules and tests, not converted workshop files;
+# .zip files are kept so unchanged files are not compressed again, see build_scripts/archive.py)
+find ./ -type f \( -iname \*.py \) -not -path "./Python/dsstools/*" -not -path "./Python/tests/*" -not -path "./build_scripts/*" -delete  #  -o -iname \*.r     #  -o -iname \*.do     # -o -iname \*.ipynb
 
-# convert .Rmd files to .r, .py, .do, and .ipynb formats
-chmod a+x build_scripts/_convert_files.sh
-source build_scripts/_convert_files.sh  # this converts the files
+# render the book in HTML, pdf, and epub form (copying .nojekyll into docs and
+# removing temp .rds and .log files), convert .Rmd files to .r, .py, .do, and
+# .ipynb formats, and zip each workshop, running independent steps in parallel
+python3 build_scripts/build.py --book
@@ -0,0 +1,208 @@
+"""Reproducible zip archives of the workshop folders.
+
+``zip -r`` stores file modification times, so every build produces a
+different archive even when no file changed, and it compresses every file
+again. :func:`write_archive` instead:
+
+* adds files in sorted order, with a fixed timestamp (``SOURCE_DATE_EPOCH``
+  if set, else 1980-01-01) and only the executable bit of the permissions,
+  so the same files always give the same bytes;
+* streams each file through the compressor, so large data sets are never
+  read into memory at once;
+* copies the compressed data of files that are unchanged (same name, size
+  and CRC) from the previous archive instead of compressing them again;
+* leaves the previous archive untouched when nothing in it would change.
+
+Archives must stay below 4 GiB (no ZIP64 support), which is far more than
+any workshop needs.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import struct
+import time
+import zipfile
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterable, NamedTuple
+
+_CHUNK = 1 << 20
+_LOCAL = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END = struct.Struct("<IHHHHIIH")
+_VERSION = 20              # 2.0: deflate and directories
+_MADE_BY = 3 << 8 | _VERSION  # Unix, so external attributes hold the mode
+_UTF8 = 0x800
+_MAX = 0xFFFFFFFF
+
+
+class _Entry(NamedTuple):
+    name: str
+    path: Path | None  # None for directories
+    mode: int
+    size: int
+    crc: int
+
+
+def _dos_time() -> tuple[int, int]:
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch:
+        year, month, day, hour, minute, second = time.gmtime(max(int(epoch), 315532800))[:6]
+    else:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    return (hour << 11 | minute << 5 | second // 2,
+            (year - 1980) << 9 | month << 5 | day)
+
+
+def _from_dos(mod_time: int, mod_date: int) -> tuple[int, ...]:
+    return ((mod_date >> 9) + 1980, mod_date >> 5 & 0xF, mod_date & 0x1F,
+            mod_time >> 11, mod_time >> 5 & 0x3F, (mod_time & 0x1F) * 2)
+
+
+def _crc(path: Path) -> tuple[int, int]:
+    crc = size = 0
+    with open(path, "rb") as f:
+        while block := f.read(_CHUNK):
+            crc = zlib.crc32(block, crc)
+            size += len(block)
+    return crc, size
+
+
+def _entries(source: Path, arcroot: str, exclude: Iterable[str]) -> list[_Entry]:
+    exclude = tuple(exclude)
+    entries = []
+    for path in sorted(source.rglob("*")):
+        if any(fnmatch.fnmatch(path.name, pattern) for pattern in exclude):
+            continue
+        name = "/".join((arcroot, *path.relative_to(source).parts))
+        if path.is_dir():
+            entries.append(_Entry(name + "/", None, 0o40755, 0, 0))
+        elif path.is_file():
+            mode = 0o100755 if os.access(path, os.X_OK) else 0o100644
+            crc, size = _crc(path)
+            entries.append(_Entry(name, path, mode, size, crc))
+    entries.insert(0, _Entry(arcroot + "/", None, 0o40755, 0, 0))
+    return entries
+
+
+def _deflate(path: Path, out: BinaryIO, level: int) -> int:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    written = 0
+    with open(path, "rb") as f:
+        while block := f.read(_CHUNK):
+            data = compressor.compress(block)
+            out.write(data)
+            written += len(data)
+    data = compressor.flush()
+    out.write(data)
+    return written + len(data)
+
+
+def _copy(src: BinaryIO, out: BinaryIO, size: int):
+    while size:
+        block = src.read(min(size, _CHUNK))
+        if not block:
+            raise ValueError("previous archive is truncated")
+        out.write(block)
+        size -= len(block)
+
+
+def _data_offset(src: BinaryIO, info: zipfile.ZipInfo) -> int:
+    src.seek(info.header_offset)
+    header = src.read(_LOCAL.size)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    return info.header_offset + _LOCAL.size + name_length + extra_length
+
+
+def write_archive(source, dest, arcroot: str | None = None,
+                  exclude: Iterable[str] = (".DS_Store",), level: int = 9) -> bool:
+    """Zip the directory ``source`` into ``dest``; return whether it was written.
+
+    Names in the archive start with ``arcroot`` (default: the directory's
+    name), like ``zip -r dest source`` run from the parent directory.
+    Files whose names match a pattern in ``exclude`` are left out.
+    """
+    source, dest = Path(source), Path(dest)
+    entries = _entries(source, arcroot or source.name, exclude)
+    if any(entry.size > _MAX for entry in entries):
+        raise ValueError(f"{source}: files over 4 GiB are not supported")
+    mod_time, mod_date = _dos_time()
+
+    previous: dict[str, zipfile.ZipInfo] = {}
+    old = None
+    if dest.exists():
+        try:
+            with zipfile.ZipFile(dest) as archive:
+                previous = {info.filename: info for info in archive.infolist()}
+        except zipfile.BadZipFile:
+            previous = {}
+        else:
+            old = open(dest, "rb")
+            same = [(e.name, e.crc, e.size, e.mode) for e in entries] == [
+                (i.filename, i.CRC, i.file_size, i.external_attr >> 16)
+                for i in previous.values()]
+            if same and all(i.date_time == _from_dos(mod_time, mod_date)
+                            for i in previous.values()):
+                old.close()
+                return False
+
+    tmp = dest.with_name(dest.name + ".tmp")
+    central = []
+    try:
+        with open(tmp, "wb") as out:
+            for entry in entries:
+                name = entry.name.encode("utf-8")
+                flags = 0 if name.isascii() else _UTF8
+                offset = out.tell()
+                reuse = previous.get(entry.name)
+                if entry.path is None:
+                    method, csize = zipfile.ZIP_STORED, 0
+                    out.write(_LOCAL.pack(0x04034B50, _VERSION, flags, method, mod_time,
+                                          mod_date, 0, 0, 0, len(name), 0) + name)
+                elif (reuse is not None and old is not None and reuse.CRC == entry.crc
+                      and reuse.file_size == entry.size
+                      and reuse.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)):
+                    method, csize = reuse.compress_type, reuse.compress_size
+                    out.write(_LOCAL.pack(0x04034B50, _VERSION, flags, method, mod_time,
+                                          mod_date, entry.crc, csize, entry.size,
+                                          len(name), 0) + name)
+                    old.seek(_data_offset(old, reuse))
+                    _copy(old, out, csize)
+                else:
+                    out.write(b"\0" * (_LOCAL.size + len(name)))  # header written below
+                    start = out.tell()
+                    method = zipfile.ZIP_DEFLATED
+                    csize = _deflate(entry.path, out, level)
+                    if csize >= entry.size:  # already compressed (images, PDFs)
+                        out.seek(start)
+                        out.truncate()
+                        method, csize = zipfile.ZIP_STORED, entry.size
+                        with open(entry.path, "rb") as f:
+                            _copy(f, out, entry.size)
+                    end = out.tell()
+                    out.seek(offset)
+                    out.write(_LOCAL.pack(0x04034B50, _VERSION, flags, method, mod_time,
+                                          mod_date, entry.crc, csize, entry.size,
+                                          len(name), 0) + name)
+                    out.seek(end)
+                if out.tell() > _MAX:
+                    raise ValueError(f"{dest}: archives over 4 GiB are not supported")
+                central.append(_CENTRAL.pack(
+                    0x02014B50, _MADE_BY, _VERSION, flags, method, mod_time, mod_date,
+                    entry.crc, csize, entry.size, len(name), 0, 0, 0, 0,
+                    entry.mode << 16 | (0x10 if entry.path is None else 0), offset) + name)
+            start = out.tell()
+            for record in central:
+                out.write(record)
+            out.write(_END.pack(0x06054B50, 0, 0, len(central), len(central),
+                                out.tell() - start, start, 0))
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        if old is not None:
+            old.close()
+    os.replace(tmp, dest)
+    return True
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Convert the workshop .Rmd files to scripts and notebooks, and zip them.
+
+``_build.sh`` and ``_convert_files.sh`` call this script. Workshops are
+found from the ``rmd_files`` list in ``_bookdown.yml`` (the ``*Install``
+pages have no materials to package), and each one becomes a small graph
+of jobs::
+
+    script (jupytext --to R:bare / py:bare, .do for Stata) --+
+                                                              +--> zip (archive.py)
+    notebook (jupytext --to notebook, not for Stata) ---------+
+
+All jobs whose inputs are ready run at the same time, up to ``--jobs``
+processes, so the build takes about as long as the slowest workshop.
+With ``--book`` the HTML, PDF and EPUB books are rendered as one more job,
+which the zips wait for, as knitting writes files into the workshops.
+With ``--execute`` the Python notebooks are run before they are zipped,
+reusing the outputs of unchanged cells (see ``nbcache.py``).
+Paths are relative to the repository root, found from this file.
+
+A content hash of each job's inputs is saved in ``.build_state.json``
+(next to this file, not committed) after the job succeeds. With
+``--incremental`` a job is skipped when its inputs hash the same as last
+time and its outputs still exist, so after editing one ``.Rmd`` only that
+workshop's files (and the book) are rebuilt.
+
+Usage::
+
+    python3 build_scripts/build.py                 # every workshop
+    python3 build_scripts/build.py Rintro PythonIntro --jobs 4
+    python3 build_scripts/build.py --incremental --book
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple
+
+from archive import write_archive
+
+ROOT = Path(__file__).resolve().parent.parent
+STATE_FILE = Path(__file__).resolve().parent / ".build_state.json"
+
+# Files besides the .Rmd sources that change the rendered book.
+BOOK_CONFIG = ("index.Rmd", "_bookdown.yml", "_output.yml", "style.css",
+               "preamble.tex", "DESCRIPTION")
+BOOK_FORMATS = ("bookdown::gitbook", "bookdown::pdf_book", "bookdown::epub_book")
+SCRIPT_SUFFIX = {"R": ".R", "Python": ".py", "Stata": ".do"}
+
+
+class Workshop(NamedTuple):
+    name: str      # e.g. "Rintro"
+    path: Path     # e.g. ROOT / "R/Rintro"
+    language: str  # "R", "Python" or "Stata"
+
+    @property
+    def rmd(self) -> Path:
+        return self.path / f"{self.name}.Rmd"
+
+    @property
+    def derived(self) -> set[Path]:
+        """Files this build writes inside the workshop directory."""
+        return {self.path / f"{self.name}{suffix}"
+                for suffix in (*SCRIPT_SUFFIX.values(), ".ipynb")}
+
+    def sources(self) -> list[Path]:
+        """Every file in the workshop directory that is not generated."""
+        derived = self.derived
+        return [path for path in self.path.rglob("*")
+                if path.is_file() and path not in derived and path.name != ".DS_Store"]
+
+
+class Job(NamedTuple):
+    name: str
+    run: Callable[[], None]
+    after: tuple[str, ...] = ()
+    inputs: Callable[[], Iterable[Path]] | None = None  # hashed for --incremental
+    outputs: tuple[Path, ...] = ()
+
+
+def book_files(root: Path = ROOT) -> list[str]:
+    """The ``rmd_files`` listed in ``_bookdown.yml``."""
+    text = (root / "_bookdown.yml").read_text(encoding="utf-8")
+    return re.findall(r'^\s*-\s*"?([^"\s]+\.Rmd)"?', text, re.M)
+
+
+def find_workshops(root: Path = ROOT) -> list[Workshop]:
+    """Workshops listed in ``_bookdown.yml``, in book order."""
+    workshops = []
+    for rmd in book_files(root):
+        path = root / rmd
+        parts = Path(rmd).parts
+        if len(parts) != 3 or path.stem.lower().endswith("install"):
+            continue  # index.Rmd and the installation pages
+        language = {"Python": "Python", "Stata": "Stata"}.get(parts[0], "R")
+        workshops.append(Workshop(path.stem, path.parent, language))
+    return workshops
+
+
+def run(*cmd: str, cwd: Path):
+    subprocess.run(cmd, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+
+
+def drop_lines(path: Path, count: int, stata: bool = False):
+    """Remove the jupytext header lines (and use Stata comments)."""
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    if stata:
+        lines = [line.replace("#", "*", 1) for line in lines]
+    path.write_text("".join(lines[count:]), encoding="utf-8")
+
+
+def convert_script(workshop: Workshop):
+    cwd, name = workshop.path, workshop.name
+    if workshop.language == "Python":
+        run("jupytext", "--to", "py:bare", f"{name}.Rmd", cwd=cwd)
+        drop_lines(cwd / f"{name}.py", 4)
+    elif workshop.language == "Stata":
+        run("jupytext", "--to", "R:bare", f"{name}.Rmd", cwd=cwd)
+        os.replace(cwd / f"{name}.R", cwd / f"{name}.do")
+        drop_lines(cwd / f"{name}.do", 7, stata=True)
+    else:
+        run("jupytext", "--to", "R:bare", f"{name}.Rmd", cwd=cwd)
+        drop_lines(cwd / f"{name}.R", 6)
+
+
+def convert_notebook(workshop: Workshop):
+    run("jupytext", "--to", "notebook", f"{workshop.name}.Rmd", cwd=workshop.path)
+
+
+def execute_notebook(workshop: Workshop):
+    # A separate process, since cells change the working directory and globals.
+    run(sys.executable, str(Path(__file__).resolve().parent / "nbcache.py"),
+        f"{workshop.name}.ipynb", "--allow-errors", cwd=workshop.path)
+
+
+def package(workshop: Workshop):
+    write_archive(workshop.path, workshop.path.parent / f"{workshop.name}.zip",
+                  exclude=("*.DS_Store",))
+
+
+def render_book():
+    for output_format in BOOK_FORMATS:
+        run("Rscript", "-e", f"bookdown::render_book('rmd_files', '{output_format}')", cwd=ROOT)
+    (ROOT / "docs" / ".nojekyll").write_bytes((ROOT / ".nojekyll").read_bytes())
+    for pattern in ("*.rds", "*.log", "*.RData"):  # temporary files
+        for path in ROOT.glob(pattern):
+            path.unlink()
+
+
+def jobs_for(workshop: Workshop, execute: bool = False, book: bool = False) -> list[Job]:
+    """The jobs of one workshop; with ``book`` its zip waits for the book job.
+
+    Knitting the book writes files into the workshop directories (plots,
+    derived data), so they must exist before the workshop is zipped.
+    """
+    name, path = workshop.name, workshop.path
+    script = path / f"{name}{SCRIPT_SUFFIX[workshop.language]}"
+    jobs = [Job(f"{name}:script", lambda: convert_script(workshop),
+                inputs=lambda: [workshop.rmd], outputs=(script,))]
+    if workshop.language != "Stata":
+        jobs.append(Job(f"{name}:notebook", lambda: convert_notebook(workshop),
+                        inputs=lambda: [workshop.rmd], outputs=(path / f"{name}.ipynb",)))
+    if execute and workshop.language == "Python":
+        jobs.append(Job(f"{name}:execute", lambda: execute_notebook(workshop),
+                        after=(f"{name}:notebook",),
+                        inputs=lambda: [workshop.rmd, *workshop.sources()],
+                        outputs=(path / f"{name}.ipynb",)))
+    jobs.append(Job(f"{name}:zip", lambda: package(workshop),
+                    after=tuple(job.name for job in jobs) + (("book",) if book else ()),
+                    inputs=lambda: path.rglob("*"),
+                    outputs=(path.parent / f"{name}.zip",)))
+    return jobs
+
+
+def book_job(root: Path = ROOT) -> Job:
+    def inputs():
+        files = [root / name for name in BOOK_CONFIG]
+        files.extend((root / "images").rglob("*"))
+        for rmd in book_files(root):
+            chapter = (root / rmd).parent
+            if chapter != root:
+                workshop = Workshop(chapter.name, chapter, "")
+                files.extend(workshop.sources())
+        return files
+
+    return Job("book", render_book, inputs=inputs, outputs=(root / "docs" / "index.html",))
+
+
+def content_hash(paths: Iterable[Path], root: Path = ROOT) -> str:
+    """Hash of the names and contents of ``paths`` (directories are ignored)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(p for p in paths if p.is_file() and p.name != ".DS_Store"):
+        digest.update(os.path.relpath(path, root).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            while block := f.read(1 << 20):
+                digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def load_state(path: Path = STATE_FILE) -> dict[str, str]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state: dict[str, str], path: Path = STATE_FILE):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def run_graph(jobs: list[Job], workers: int, log=print,
+              state: dict[str, str] | None = None, incremental: bool = False) -> list[str]:
+    """Run jobs as soon as the jobs they come after have finished.
+
+    Returns the names of failed jobs; jobs after a failed one are skipped.
+    If ``state`` is given, the input hash of each successful job is stored
+    in it; with ``incremental`` jobs whose hash is unchanged are not run.
+    """
+    if state is None:
+        state = {}
+
+    def execute(job: Job) -> bool:
+        """Run the job unless it is up to date; return whether it ran."""
+        digest = content_hash(job.inputs()) if job.inputs is not None else None
+        if (incremental and digest is not None and state.get(job.name) == digest
+                and all(output.exists() for output in job.outputs)):
+            return False
+        state.pop(job.name, None)
+        job.run()
+        if digest is not None:
+            # Hash again: a job (or one it came after) may have written
+            # into its own inputs, e.g. the book into a workshop directory.
+            state[job.name] = content_hash(job.inputs())
+        return True
+
+    pending = {job.name: job for job in jobs}
+    done: set[str] = set()
+    failed: list[str] = []
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for job in list(pending.values()):
+                if any(dep in failed for dep in job.after):
+                    del pending[job.name]
+                    failed.append(job.name)
+                    log(f"skip   {job.name}")
+                elif all(dep in done for dep in job.after):
+                    del pending[job.name]
+                    running[pool.submit(execute, job)] = (job.name, time.perf_counter())
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, started = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    done.add(name)
+                    if future.result():
+                        log(f"done   {name} ({time.perf_counter() - started:.1f}s)")
+                    else:
+                        log(f"fresh  {name}")
+                else:
+                    failed.append(name)
+                    log(f"FAILED {name}: {error}")
+    return failed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("workshops", nargs="*", help="names of workshops to build (default: all)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="number of jobs to run at once (default: number of CPUs)")
+    parser.add_argument("--book", action="store_true",
+                        help="also render the HTML, PDF and EPUB books")
+    parser.add_argument("--execute", action="store_true",
+                        help="run the Python notebooks (with cached cell outputs) before zipping")
+    parser.add_argument("--incremental", "-i", action="store_true",
+                        help="skip jobs whose inputs have not changed since the last build")
+    args = parser.parse_args(argv)
+
+    workshops = find_workshops()
+    if args.workshops:
+        unknown = set(args.workshops) - {w.name for w in workshops}
+        if unknown:
+            parser.error(f"unknown workshops: {', '.join(sorted(unknown))}")
+        workshops = [w for w in workshops if w.name in args.workshops]
+    jobs = [job for workshop in workshops
+            for job in jobs_for(workshop, args.execute, args.book)]
+    if args.book:
+        jobs.append(book_job())
+    state = load_state()
+    started = time.perf_counter()
+    try:
+        failed = run_graph(jobs, args.jobs, state=state, incremental=args.incremental)
+    finally:
+        save_state(state)
+    print(f"{len(jobs) - len(failed)}/{len(jobs)} jobs in {time.perf_counter() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
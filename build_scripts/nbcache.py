@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Execute a Python workshop notebook, reusing outputs of unchanged cells.
+
+Running ``PythonWebScrape.ipynb`` from the top repeats every request to
+the museum site, and ``PythonIntro.ipynb`` recounts the characters of the
+whole book, even if only the last cell was edited. This script runs the
+code cells of a notebook in order, in-process, and caches each cell's
+outputs under a key made of
+
+* the key of the cell before it (so an edit invalidates everything below),
+* the cell's source, and
+* the contents of any file the cell names in a string literal, such as
+  ``"Alice_in_wonderland.txt"``.
+
+After each cell the variables are pickled (each distinct value is stored
+once). At the first cell that is not cached, the variables are restored
+from the latest snapshot that has everything the remaining cells use, and
+only the cells from there on are executed. Values that cannot be pickled
+(open files, lxml elements, functions defined in the notebook) are not
+restored; if a later cell needs one, execution starts from an earlier
+snapshot, in the worst case from the top.
+
+Restoring from an earlier snapshot *replays* the cached cells after it,
+side effects included: a cell that both fetches a page and parses it
+into an lxml tree, as in ``PythonWebScrape.ipynb``, sends its request
+again on every build that edits a cell below it. Keeping the response
+(``page = requests.get(...)``) and the parsing in separate cells avoids
+this, since the response pickles. A cell tagged ``nbcache-no-replay``
+(cell metadata ``"tags"``, as set in Jupyter's property inspector) is
+never replayed: restoring starts no earlier than the last such cell, and
+if a variable it made cannot be restored this is reported and the cells
+that use it fail, rather than repeating the request. Such a cell still
+runs when it, or a cell above it, changes.
+
+Cell outputs are stdout/stderr text, the value of a final expression
+(plain text, plus HTML for objects such as DataFrames) and errors.
+Lines starting with ``%`` or ``!`` (IPython magics) are skipped.
+
+Usage::
+
+    cd Python/PythonIntro && python3 ../../build_scripts/nbcache.py PythonIntro.ipynb
+    python3 build_scripts/nbcache.py NOTEBOOK [-o OUTPUT] [--cache DIR] [--allow-errors]
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import contextlib
+import hashlib
+import io
+import json
+import os
+import pickle
+import sys
+import traceback
+import types
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = ROOT / ".nbcache"
+NO_REPLAY_TAG = "nbcache-no-replay"
+
+
+def _digest(*parts: bytes) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def _source(cell: dict) -> str:
+    source = cell["source"]
+    return source if isinstance(source, str) else "".join(source)
+
+
+def _code(source: str) -> str:
+    """Cell source without IPython magics and shell escapes."""
+    return "\n".join("" if line.lstrip().startswith(("%", "!")) else line
+                     for line in source.splitlines())
+
+
+def _input_files(source: str, directory: Path) -> list[Path]:
+    """Existing files named by string literals in the cell."""
+    try:
+        tree = ast.parse(_code(source))
+    except SyntaxError:
+        return []
+    files = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) \
+                and 0 < len(node.value) < 256 and "\n" not in node.value:
+            path = directory / node.value
+            try:
+                if path.is_file():
+                    files.add(path)
+            except OSError:
+                pass
+    return sorted(files)
+
+
+def _no_replay(cell: dict) -> bool:
+    return NO_REPLAY_TAG in cell.get("metadata", {}).get("tags", ())
+
+
+def _names_used(source: str) -> set[str]:
+    try:
+        tree = ast.parse(_code(source))
+    except SyntaxError:
+        return set()
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+
+
+def cell_keys(cells: list[dict], directory: Path) -> list[str]:
+    """Cache key of every code cell, chained through the cells above it."""
+    keys, previous = [], b""
+    for cell in cells:
+        source = _source(cell)
+        parts = [previous, source.encode("utf-8")]
+        for path in _input_files(source, directory):
+            parts.append(path.name.encode("utf-8"))
+            parts.append(path.read_bytes())
+        key = _digest(*parts)
+        keys.append(key)
+        previous = key.encode("ascii")
+    return keys
+
+
+class Cache:
+    """Outputs and variable snapshots, one JSON file per cell key."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.objects = directory / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> dict | None:
+        try:
+            return json.loads((self.directory / f"{key}.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key: str, entry: dict):
+        path = self.directory / f"{key}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def snapshot(self, namespace: dict) -> tuple[dict, list[str]]:
+        """Store the variables; return ``(snapshot, names that were lost)``."""
+        snapshot, lost = {}, []
+        for name, value in namespace.items():
+            if name.startswith("__"):
+                continue
+            if isinstance(value, types.ModuleType):
+                snapshot[name] = ["module", value.__name__]
+                continue
+            try:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                lost.append(name)
+                continue
+            blob = _digest(data)
+            path = self.objects / f"{blob}.pkl"
+            if not path.exists():
+                path.write_bytes(data)
+            snapshot[name] = ["pickle", blob]
+        return snapshot, lost
+
+    def restore(self, snapshot: dict, namespace: dict):
+        import importlib
+
+        for name, (kind, ref) in snapshot.items():
+            if kind == "module":
+                namespace[name] = importlib.import_module(ref)
+            else:
+                namespace[name] = pickle.loads((self.objects / f"{ref}.pkl").read_bytes())
+
+
+def _display(value: Any, count: int) -> dict:
+    data = {"text/plain": repr(value)}
+    html = getattr(value, "_repr_html_", None)
+    if callable(html):
+        try:
+            rendered = html()
+        except Exception:
+            rendered = None
+        if rendered:
+            data["text/html"] = rendered
+    return {"output_type": "execute_result", "execution_count": count,
+            "data": data, "metadata": {}}
+
+
+def run_cell(source: str, namespace: dict, count: int) -> tuple[list[dict], bool]:
+    """Execute one cell like IPython; return ``(outputs, ok)``."""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    outputs: list[dict] = []
+    ok = True
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            tree = ast.parse(_code(source), "<cell>", "exec")
+            last = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+            exec(compile(tree, "<cell>", "exec"), namespace)
+            if last is not None:
+                value = eval(compile(ast.Expression(last.value), "<cell>", "eval"), namespace)
+                if value is not None:
+                    outputs.append(_display(value, count))
+        except Exception as exc:
+            ok = isinstance(exc, SyntaxError)  # the same source always fails the same way
+            outputs.append({"output_type": "error", "ename": type(exc).__name__,
+                            "evalue": str(exc),
+                            "traceback": traceback.format_exception_only(type(exc), exc)})
+    streams = [{"output_type": "stream", "name": name, "text": text}
+               for name, text in (("stdout", stdout.getvalue()), ("stderr", stderr.getvalue()))
+               if text]
+    return streams + outputs, ok
+
+
+def execute(notebook: dict, directory: Path, cache: Cache,
+            allow_errors: bool = False, log=print) -> dict:
+    """Fill in the outputs of ``notebook``'s code cells; return counts."""
+    cells = [cell for cell in notebook["cells"] if cell["cell_type"] == "code"]
+    sources = [_source(cell) for cell in cells]
+    keys = cell_keys(cells, directory)
+    entries = [cache.get(key) for key in keys]
+    first_miss = next((i for i, entry in enumerate(entries) if entry is None), len(cells))
+
+    # Latest snapshot before the first miss that has every name the cells
+    # after it use (-1: start from an empty namespace), but never one that
+    # would replay a cell tagged nbcache-no-replay.
+    floor = max((i for i in range(first_miss) if _no_replay(cells[i])), default=-1)
+    start = floor
+    for j in range(first_miss - 1, max(floor, 0) - 1, -1):
+        needed = set().union(*map(_names_used, sources[j + 1:]))
+        if not needed & set(entries[j]["lost"]):
+            start = j
+            break
+    else:
+        if floor >= 0:
+            needed = set().union(*map(_names_used, sources[floor + 1:]))
+            missing = sorted(needed & set(entries[floor]["lost"]))
+            log(f"cell {floor + 1} is tagged {NO_REPLAY_TAG}, so {', '.join(missing)} "
+                f"cannot be restored; cells using them will fail (clear the cache to run "
+                f"everything again)")
+    namespace: dict = {"__name__": "__main__"}
+    if start >= 0:
+        cache.restore(entries[start]["snapshot"], namespace)
+
+    counts = {"cached": 0, "run": 0, "failed": False}
+    caching = True
+    for i, cell in enumerate(cells):
+        cell["execution_count"] = i + 1
+        if counts["failed"]:
+            cell["outputs"] = []
+        elif i < first_miss:
+            cell["outputs"] = entries[i]["outputs"]
+            counts["cached"] += 1
+            if i > start:
+                # Replayed only to rebuild the variables.
+                run_cell(sources[i], namespace, i + 1)
+        else:
+            outputs, ok = run_cell(sources[i], namespace, i + 1)
+            cell["outputs"] = outputs
+            counts["run"] += 1
+            # A failed cell (e.g. a request that timed out) is retried next
+            # time, and so is everything after it, which may depend on it.
+            caching = caching and ok
+            if caching:
+                snapshot, lost = cache.snapshot(namespace)
+                cache.put(keys[i], {"outputs": outputs, "snapshot": snapshot, "lost": lost})
+            error = next((out for out in outputs if out["output_type"] == "error"), None)
+            if error is not None and not allow_errors:
+                log(f"cell {i + 1} failed: {error['ename']}: {error['evalue']}")
+                counts["failed"] = True
+    return counts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("notebook", type=Path)
+    parser.add_argument("-o", "--output", type=Path,
+                        help="where to write the executed notebook (default: in place)")
+    parser.add_argument("--cache", type=Path,
+                        help=f"cache directory (default: {CACHE_DIR.name}/<notebook name>)")
+    parser.add_argument("--allow-errors", action="store_true",
+                        help="keep going after a cell raises an error")
+    args = parser.parse_args(argv)
+
+    path = args.notebook.resolve()
+    notebook = json.loads(path.read_text(encoding="utf-8"))
+    cache = Cache(args.cache or CACHE_DIR / path.stem)
+    os.chdir(path.parent)  # cells open files relative to the notebook
+    sys.path.insert(0, str(path.parent))
+    counts = execute(notebook, path.parent, cache, allow_errors=args.allow_errors)
+    output = args.output.resolve() if args.output else path
+    output.write_text(json.dumps(notebook, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+    print(f"{path.name}: {counts['cached']} cells from cache, {counts['run']} executed")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The build scripts are run as files, not installed; make them importable
+# however pytest is started, e.g. ``python3 -m pytest build_scripts/tests``.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,100 @@
+import os
+import zipfile
+
+import pytest
+
+import archive
+
+
+@pytest.fixture
+def workshop(tmp_path):
+    source = tmp_path / "Rintro"
+    (source / "dataSets").mkdir(parents=True)
+    (source / "Rintro.Rmd").write_text("# Intro\n" * 500)
+    (source / "Rintro.R").write_text("x <- 1\n")
+    (source / "dataSets" / "data.csv").write_text("a,b\n1,2\n" * 1000)
+    (source / "dataSets" / "büro.txt").write_text("umlaut")
+    (source / "images.bin").write_bytes(os.urandom(4096))  # does not compress
+    (source / "run.sh").write_text("#!/bin/sh\n")
+    (source / "run.sh").chmod(0o755)
+    (source / ".DS_Store").write_bytes(b"finder")
+    return source
+
+
+def touch_all(source, when):
+    for path in source.rglob("*"):
+        os.utime(path, (when, when))
+
+
+def test_same_files_same_bytes(workshop, tmp_path):
+    first, second = tmp_path / "first.zip", tmp_path / "second.zip"
+    touch_all(workshop, 1_600_000_000)
+    assert archive.write_archive(workshop, first)
+    touch_all(workshop, 1_700_000_000)
+    assert archive.write_archive(workshop, second)
+    assert first.read_bytes() == second.read_bytes()
+
+
+def test_contents(workshop, tmp_path):
+    dest = tmp_path / "Rintro.zip"
+    archive.write_archive(workshop, dest)
+    with zipfile.ZipFile(dest) as zf:
+        assert zf.testzip() is None
+        names = zf.namelist()
+        assert names == sorted(names)
+        assert names[0] == "Rintro/"
+        assert "Rintro/.DS_Store" not in names
+        assert zf.read("Rintro/dataSets/büro.txt") == b"umlaut"
+        assert zf.read("Rintro/Rintro.R") == b"x <- 1\n"
+        infos = {info.filename: info for info in zf.infolist()}
+    assert infos["Rintro/dataSets/"].is_dir()
+    assert infos["Rintro/Rintro.Rmd"].compress_type == zipfile.ZIP_DEFLATED
+    assert infos["Rintro/images.bin"].compress_type == zipfile.ZIP_STORED
+    assert infos["Rintro/run.sh"].external_attr >> 16 == 0o100755
+    assert infos["Rintro/Rintro.R"].external_attr >> 16 == 0o100644
+    assert {info.date_time for info in infos.values()} == {(1980, 1, 1, 0, 0, 0)}
+
+
+def test_source_date_epoch(workshop, tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")  # 2023-11-14 22:13:20 UTC
+    dest = tmp_path / "Rintro.zip"
+    archive.write_archive(workshop, dest, arcroot="materials")
+    with zipfile.ZipFile(dest) as zf:
+        assert {info.date_time for info in zf.infolist()} == {(2023, 11, 14, 22, 13, 20)}
+        assert zf.namelist()[0] == "materials/"
+
+
+def test_unchanged_archive_is_left_alone(workshop, tmp_path):
+    dest = tmp_path / "Rintro.zip"
+    assert archive.write_archive(workshop, dest)
+    os.utime(dest, (1_000_000_000, 1_000_000_000))
+    assert not archive.write_archive(workshop, dest)
+    assert dest.stat().st_mtime == 1_000_000_000
+
+
+def test_update_reuses_unchanged_entries(workshop, tmp_path, monkeypatch):
+    dest, fresh = tmp_path / "Rintro.zip", tmp_path / "fresh.zip"
+    archive.write_archive(workshop, dest)
+    (workshop / "Rintro.R").write_text("x <- 2\n")
+    (workshop / "new.txt").write_text("new")
+    deflated = []
+    deflate = archive._deflate
+    monkeypatch.setattr(archive, "_deflate",
+                        lambda path, out, level: deflated.append(path.name) or deflate(path, out, level))
+    assert archive.write_archive(workshop, dest)
+    assert sorted(deflated) == ["Rintro.R", "new.txt"]
+    # Copying old entries gives the same bytes as compressing from scratch.
+    archive.write_archive(workshop, fresh, arcroot="Rintro")
+    assert dest.read_bytes() == fresh.read_bytes()
+    with zipfile.ZipFile(dest) as zf:
+        assert zf.testzip() is None
+        assert zf.read("Rintro/Rintro.R") == b"x <- 2\n"
+
+
+def test_broken_previous_archive(workshop, tmp_path):
+    dest = tmp_path / "Rintro.zip"
+    dest.write_bytes(b"not a zip")
+    assert archive.write_archive(workshop, dest)
+    with zipfile.ZipFile(dest) as zf:
+        assert zf.testzip() is None
+    assert not (tmp_path / "Rintro.zip.tmp").exists()
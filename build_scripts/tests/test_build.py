@@ -0,0 +1,188 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+import build
+
+BOOKDOWN = """book_filename: 'Workshops'
+rmd_files:
+  - "index.Rmd"
+  - "R/Rinstall/Rinstall.Rmd"
+  - "R/Rintro/Rintro.Rmd"
+  - "Python/PythonIntro/PythonIntro.Rmd"
+  - "Stata/StataIntro/StataIntro.Rmd"
+"""
+
+
+def job(name, run=lambda: None, after=()):
+    return build.Job(name, run, tuple(after))
+
+
+def test_find_workshops(tmp_path):
+    (tmp_path / "_bookdown.yml").write_text(BOOKDOWN)
+    workshops = build.find_workshops(tmp_path)
+    assert [(w.name, w.language) for w in workshops] == [
+        ("Rintro", "R"), ("PythonIntro", "Python"), ("StataIntro", "Stata")]
+    assert workshops[0].path == tmp_path / "R" / "Rintro"
+    assert workshops[0].rmd == tmp_path / "R" / "Rintro" / "Rintro.Rmd"
+
+
+def test_job_names_and_order():
+    python = build.Workshop("PythonIntro", Path("Python/PythonIntro"), "Python")
+    stata = build.Workshop("StataIntro", Path("Stata/StataIntro"), "Stata")
+    jobs = {j.name: j for j in build.jobs_for(python, execute=True, book=True)}
+    assert set(jobs) == {"PythonIntro:script", "PythonIntro:notebook",
+                         "PythonIntro:execute", "PythonIntro:zip"}
+    assert jobs["PythonIntro:execute"].after == ("PythonIntro:notebook",)
+    assert set(jobs["PythonIntro:zip"].after) == {
+        "PythonIntro:script", "PythonIntro:notebook", "PythonIntro:execute", "book"}
+    jobs = {j.name: j for j in build.jobs_for(stata)}
+    assert set(jobs) == {"StataIntro:script", "StataIntro:zip"}
+    assert jobs["StataIntro:zip"].after == ("StataIntro:script",)
+
+
+def test_dependencies_run_first():
+    finished = []
+    lock = threading.Lock()
+
+    def record(name):
+        def run():
+            with lock:
+                finished.append(name)
+        return run
+
+    jobs = [job("zip", record("zip"), after=("script", "notebook")),
+            job("script", record("script")),
+            job("notebook", record("notebook"), after=("book",)),
+            job("book", record("book"))]
+    assert build.run_graph(jobs, workers=4, log=lambda message: None) == []
+    assert sorted(finished) == ["book", "notebook", "script", "zip"]
+    assert finished.index("book") < finished.index("notebook") < finished.index("zip")
+    assert finished.index("script") < finished.index("zip")
+
+
+def test_independent_jobs_run_at_once():
+    # Each job waits for the other: with one worker at a time this would
+    # time out.
+    barrier = threading.Barrier(2, timeout=5)
+    jobs = [job("Rintro:script", barrier.wait), job("StataIntro:script", barrier.wait)]
+    assert build.run_graph(jobs, workers=2, log=lambda message: None) == []
+
+
+def test_failure_skips_later_jobs():
+    def fail():
+        raise RuntimeError("jupytext missing")
+
+    ran = []
+    logs = []
+    jobs = [job("a:script", fail),
+            job("a:notebook", lambda: ran.append("a:notebook")),
+            job("a:zip", lambda: ran.append("a:zip"), after=("a:script", "a:notebook")),
+            job("b:script", lambda: ran.append("b:script"))]
+    failed = build.run_graph(jobs, workers=2, log=logs.append)
+    assert sorted(failed) == ["a:script", "a:zip"]
+    assert sorted(ran) == ["a:notebook", "b:script"]
+    assert "FAILED a:script: jupytext missing" in logs
+    assert "skip   a:zip" in logs
+
+
+def test_unknown_workshop(capsys):
+    with pytest.raises(SystemExit):
+        build.main(["NoSuchWorkshop"])
+    assert "unknown workshops: NoSuchWorkshop" in capsys.readouterr().err
+
+
+def test_content_hash(tmp_path):
+    (tmp_path / "a.Rmd").write_text("one")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "data.csv").write_text("1,2")
+    paths = lambda: tmp_path.rglob("*")
+    first = build.content_hash(paths(), tmp_path)
+    assert build.content_hash(reversed(list(paths())), tmp_path) == first
+    (tmp_path / ".DS_Store").write_text("noise")
+    (tmp_path / "empty").mkdir()
+    assert build.content_hash(paths(), tmp_path) == first
+    (tmp_path / "a.Rmd").write_text("two")
+    assert build.content_hash(paths(), tmp_path) != first
+    (tmp_path / "a.Rmd").write_text("one")
+    (tmp_path / "sub" / "data.csv").rename(tmp_path / "sub" / "other.csv")
+    assert build.content_hash(paths(), tmp_path) != first
+
+
+def test_state_file(tmp_path):
+    path = tmp_path / "state.json"
+    assert build.load_state(path) == {}
+    build.save_state({"Rintro:zip": "abc"}, path)
+    assert build.load_state(path) == {"Rintro:zip": "abc"}
+    path.write_text("{not json")
+    assert build.load_state(path) == {}
+
+
+def test_incremental_skips_unchanged_jobs(tmp_path):
+    source = tmp_path / "Rintro.Rmd"
+    output = tmp_path / "Rintro.R"
+    source.write_text("x <- 1")
+    runs = []
+
+    def convert():
+        runs.append(source.read_text())
+        output.write_text(source.read_text())
+
+    jobs = [build.Job("Rintro:script", convert, inputs=lambda: [source], outputs=(output,))]
+    state = {}
+    logs = []
+    for _ in range(2):
+        assert build.run_graph(jobs, 1, log=logs.append, state=state, incremental=True) == []
+    assert runs == ["x <- 1"]
+    assert logs[-1] == "fresh  Rintro:script"
+    # Without --incremental the job runs, and the hash is kept.
+    build.run_graph(jobs, 1, log=logs.append, state=state)
+    assert len(runs) == 2
+    source.write_text("x <- 2")
+    build.run_graph(jobs, 1, log=logs.append, state=state, incremental=True)
+    assert runs[-1] == "x <- 2"
+    output.unlink()
+    build.run_graph(jobs, 1, log=logs.append, state=state, incremental=True)
+    assert len(runs) == 4 and output.exists()
+
+
+def test_failed_job_is_not_recorded(tmp_path):
+    source = tmp_path / "Rintro.Rmd"
+    source.write_text("x")
+    state = {"Rintro:script": "stale"}
+
+    def fail():
+        raise RuntimeError
+
+    jobs = [build.Job("Rintro:script", fail, inputs=lambda: [source])]
+    assert build.run_graph(jobs, 1, log=lambda m: None, state=state, incremental=True)
+    assert state == {}
+
+
+def test_hash_after_job_writes_into_inputs(tmp_path):
+    # The book writes plots into a workshop; the zip's hash must include
+    # them, or the next incremental build would zip again for nothing.
+    workshop = tmp_path / "Rintro"
+    workshop.mkdir()
+    (workshop / "Rintro.Rmd").write_text("plot(1)")
+    runs = []
+    jobs = [build.Job("book", lambda: (workshop / "plot.png").write_bytes(b"png")),
+            build.Job("Rintro:zip", lambda: runs.append(1), after=("book",),
+                      inputs=lambda: workshop.rglob("*"))]
+    state = {}
+    build.run_graph(jobs, 2, log=lambda m: None, state=state, incremental=True)
+    build.run_graph(jobs, 2, log=lambda m: None, state=state, incremental=True)
+    assert runs == [1]
+    assert state["Rintro:zip"] == build.content_hash(workshop.rglob("*"))
+
+
+def test_book_inputs_skip_derived_files(tmp_path):
+    (tmp_path / "_bookdown.yml").write_text(BOOKDOWN)
+    workshop = tmp_path / "R" / "Rintro"
+    workshop.mkdir(parents=True)
+    for name in ("Rintro.Rmd", "Rintro.R", "Rintro.ipynb", "data.csv"):
+        (workshop / name).write_text(name)
+    inputs = {path.name for path in build.book_job(tmp_path).inputs()}
+    assert {"Rintro.Rmd", "data.csv", "_bookdown.yml"} <= inputs
+    assert not {"Rintro.R", "Rintro.ipynb"} & inputs
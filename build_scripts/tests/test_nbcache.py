@@ -0,0 +1,113 @@
+import copy
+
+import pytest
+
+import nbcache
+
+
+def notebook(*cells, tagged=()):
+    return {"cells": [{"cell_type": "code", "source": source, "outputs": [],
+                       "metadata": {"tags": [nbcache.NO_REPLAY_TAG]} if i in tagged else {}}
+                      for i, source in enumerate(cells)],
+            "metadata": {}, "nbformat": 4, "nbformat_minor": 5}
+
+
+def run(nb, tmp_path, logs=None):
+    nb = copy.deepcopy(nb)
+    counts = nbcache.execute(nb, tmp_path, nbcache.Cache(tmp_path / "cache"),
+                             log=(logs.append if logs is not None else print))
+    return nb, counts
+
+
+def texts(nb):
+    return ["".join(out.get("text", "") or out.get("data", {}).get("text/plain", "")
+                    for out in cell["outputs"]) for cell in nb["cells"]]
+
+
+@pytest.fixture(autouse=True)
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def hits(tmp_path):
+    path = tmp_path / "hits.txt"
+    return len(path.read_text()) if path.exists() else 0
+
+
+# A "fetch" that leaves a trace and makes a value that cannot be pickled,
+# like a cell that requests a page and parses it with lxml. (The file name
+# is built so that it is not an input file of the cell.)
+FETCH = "open('hits' + '.txt', 'a').write('x')\nimport threading\nlock = threading.Lock()\nn = 2"
+
+
+def test_outputs_are_cached(tmp_path):
+    nb = notebook("x = 40", "print(x + 2)", "x * 2")
+    first, counts = run(nb, tmp_path)
+    assert counts == {"cached": 0, "run": 3, "failed": False}
+    assert texts(first) == ["", "42\n", "80"]
+    second, counts = run(nb, tmp_path)
+    assert counts["cached"] == 3 and counts["run"] == 0
+    assert texts(second) == texts(first)
+
+
+def test_edit_reruns_the_cells_below(tmp_path):
+    run(notebook("x = 1", "y = x + 1", "y"), tmp_path)
+    nb, counts = run(notebook("x = 1", "y = x + 1", "y * 10"), tmp_path)
+    assert counts == {"cached": 2, "run": 1, "failed": False}
+    assert texts(nb)[-1] == "20"
+    nb, counts = run(notebook("x = 5", "y = x + 1", "y * 10"), tmp_path)
+    assert counts["run"] == 3 and texts(nb)[-1] == "60"
+
+
+def test_input_files_are_part_of_the_key(tmp_path):
+    (tmp_path / "book.txt").write_text("Alice")
+    nb = notebook("text = open('book.txt').read()", "len(text)")
+    run(nb, tmp_path)
+    (tmp_path / "book.txt").write_text("Alice and the Dodo")
+    out, counts = run(nb, tmp_path)
+    assert counts["run"] == 2 and texts(out)[-1] == "18"
+
+
+def test_unpicklable_values_replay_earlier_cells(tmp_path):
+    run(notebook(FETCH, "m = n * 2", "print(lock.locked(), m)"), tmp_path)
+    assert hits(tmp_path) == 1
+    nb, counts = run(notebook(FETCH, "m = n * 2", "print(lock.locked(), m + 1)"), tmp_path)
+    assert texts(nb)[-1] == "False 5\n"
+    assert hits(tmp_path) == 2  # the fetch cell was replayed
+
+
+def test_tagged_cells_are_not_replayed(tmp_path):
+    run(notebook(FETCH, "m = n * 2", "print(lock.locked(), m)", tagged={0}), tmp_path)
+    logs = []
+    nb, counts = run(notebook(FETCH, "m = n * 2", "print(lock.locked(), m + 1)", tagged={0}),
+                     tmp_path, logs)
+    assert hits(tmp_path) == 1
+    assert "lock cannot be restored" in logs[0]
+    assert counts["failed"]
+    assert nb["cells"][2]["outputs"][-1]["ename"] == "NameError"
+
+
+def test_tagged_cell_with_picklable_results(tmp_path):
+    # Fetch in one cell, parse in the next: only the parse is replayed.
+    cells = ["open('hits' + '.txt', 'a').write('x')\npage = 'Alice'",
+             "import threading\nlock = threading.Lock()\nwords = page.split()",
+             "print(lock.locked(), words)"]
+    run(notebook(*cells, tagged={0}), tmp_path)
+    logs = []
+    nb, counts = run(notebook(*cells[:2], cells[2] + " ", tagged={0}), tmp_path, logs)
+    assert hits(tmp_path) == 1 and logs == [] and not counts["failed"]
+    assert texts(nb)[-1] == "False ['Alice']\n"
+
+
+def test_errors_stop_the_run_and_are_not_cached(tmp_path):
+    logs = []
+    nb, counts = run(notebook("1 / 0", "print('after')"), tmp_path, logs)
+    assert counts["failed"] and logs == ["cell 1 failed: ZeroDivisionError: division by zero"]
+    assert nb["cells"][1]["outputs"] == []
+    _, counts = run(notebook("1 / 0", "print('after')"), tmp_path, [])
+    assert counts["cached"] == 0
+
+
+def test_magics_are_skipped(tmp_path):
+    nb, counts = run(notebook("%matplotlib inline\n!ls\nx = 3", "x"), tmp_path)
+    assert texts(nb) == ["", "3"]